@@ -187,6 +187,27 @@ async def process_detections_with_alerts(detections: List[Dict], image_width: in
         'closest_object': alerts[0] if alerts else None
     }
 
+def alert_phrases(names: Optional[Dict[str, str]] = None, image_width: int = 640) -> List[str]:
+    """
+    العبارات المنطوقة (should_speak) التي قد ينتجها generate_alert_message
+    لكل فئة واتجاه ومسافة - لتوليد صوتها مسبقاً في كاش TTS
+    """
+    names = names or {}
+    third = image_width / 3
+    bboxes = [[0, 0, third / 2, 480], [third, 0, 2 * third, 480], [image_width - third / 2, 0, image_width, 480]]
+    phrases = []
+    for obj_class in PRIORITY_MAP:
+        for distance in (0.3, 0.8, 1.5, 2.5, 3.0, 4.0, 5.0):
+            for bbox in bboxes:
+                alert = generate_alert_message(
+                    {'class': obj_class, 'class_ar': names.get(obj_class, obj_class),
+                     'distance_m': distance, 'bbox': bbox},
+                    image_width
+                )
+                if alert['should_speak']:
+                    phrases.append(alert['message'])
+    return list(dict.fromkeys(phrases))
+
 def get_summary_message(alerts_data: Dict) -> str:
     """توليد رسالة ملخصة عن المشهد"""
     if not alerts_data['all_alerts']:
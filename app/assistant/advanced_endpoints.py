@@ -7,23 +7,26 @@ PHASE 4: تحليل متقدم مع جميع التحسينات
 - Ambient sound analysis
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from pydantic import BaseModel
 from typing import Optional, List, Dict
 import time
 
-from .router import router, learning_system, context_manager, alert_manager
+from .router import router
 from app.vision.model import detector
-from app.utils.caching import cache_manager, perf_monitor, timed
+from app.utils.caching import perceptual_cache, perf_monitor, timed
 from app.utils.advanced_features import (
-    ambient_sound_detector, dynamic_alert_system, location_awareness
+    ambient_sound_detector, location_awareness
 )
 from app.audio.transcribe import transcribe_audio_bytes
+from app.utils.ingest import read_image_payload
+from app.utils.sessions import session_registry, session_id_from
+from app.vision.frame import Frame
+from app.vision.tracker import object_tracker  # noqa: F401 (registers the per-session 'tracker' component)
 import base64
 
 class AdvancedAnalysisRequest(BaseModel):
-    """طلب تحليل متقدم"""
-    image_b64: str
+    """طلب تحليل متقدم (الصورة: image/jpeg خام أو multipart أو image_b64)"""
     audio_b64: Optional[str] = None
     user_id: str = "default"
     enable_sound_analysis: bool = True
@@ -40,38 +43,53 @@ class AdvancedAnalysisResponse(BaseModel):
 
 @router.post('/advanced_analyze', response_model=AdvancedAnalysisResponse)
 @timed("advanced_analyze")
-async def advanced_scene_analysis(request: AdvancedAnalysisRequest):
+async def advanced_scene_analysis(http_request: Request):
     """
     PHASE 4: تحليل متقدم للمشهد
     يتضمن جميع التحسينات الأربعة
     """
     
+    payload = await read_image_payload(http_request)
+    request = payload.parse(AdvancedAnalysisRequest)
+    # جلسة المستخدم: حالة التنبيهات الديناميكية وملف التعلم خاصة به
+    session = session_registry.get(session_id_from(http_request) or request.user_id)
+    learning_system = session.learning
     start_time = time.time()
     
     # ============ PHASE 2: Check Cache ============
-    image_bytes = base64.b64decode(request.image_b64.split(',')[1] if ',' in request.image_b64 else request.image_b64)
-    cached_result = cache_manager.get(image_bytes, prefix='advanced_analyze')
+    # بصمة إدراكية: فريمات المشهد الثابت تتطابق رغم اختلاف بايتات JPEG
+    # (الكاش لكل جلسة - التخصيص يختلف بين المستخدمين؛ والصوت يغير النتيجة فلا كاش معه)
+    frame = Frame.from_bytes(payload.image)
+    cache_hash = frame.dhash if frame is not None and not request.audio_b64 else None
+    cache_prefix = f"advanced_analyze:{session.id}"
+    cached_result = perceptual_cache.get(cache_hash, prefix=cache_prefix)
     
     if cached_result:
-        return cached_result
+        return {
+            **cached_result,
+            'performance_stats': {**cached_result['performance_stats'], 'cache_hit': True}
+        }
     
     # ============ PHASE 1: Detect Objects ============
-    objects = detector.detect(image_bytes)
+    objects = detector.detect(frame, session=session)  # يحدّث session.tracker (track_id لكل كائن)
     
     # ============ PHASE 4.2: Dynamic Alerts ============
     dynamic_alerts = []
     if request.enable_dynamic_alerts:
         for obj in objects:
             # تتبع الكائن وحدد ما إذا كان يقترب
-            alert = dynamic_alert_system.track_object(
+            alert = session.dynamic_alerts.track_object(
                 obj['class'],
-                obj['distance_m']
+                obj['distance_m'],
+                track_id=obj.get('track_id'),
+                track_hits=obj.get('track_hits')
             )
             
             if alert and alert.urgency_level >= 3:
                 dynamic_alerts.append({
                     'object': obj['class'],
                     'object_ar': obj['class_ar'],
+                    'track_id': alert.track_id,
                     'distance': alert.distance,
                     'trend': alert.distance_trend,
                     'urgency': alert.urgency_level,
@@ -96,10 +114,6 @@ async def advanced_scene_analysis(request: AdvancedAnalysisRequest):
     
     # ============ PHASE 3: Apply Personalization ============
     personalization_adjustments = {}
-    if request.user_id != "default":
-        learning_system.user_id = request.user_id
-        learning_system.profile = learning_system._load_profile()
-    
     # اضبط الكائنات بناءً على التفضيلات الشخصية
     filtered_objects = []
     for obj in objects:
@@ -157,7 +171,7 @@ async def advanced_scene_analysis(request: AdvancedAnalysisRequest):
     )
     
     # ============ PHASE 2: Cache Result ============
-    cache_manager.set(image_bytes, response.dict(), prefix='advanced_analyze')
+    perceptual_cache.set(cache_hash, response.dict(), prefix=cache_prefix)
     
     return response
 
@@ -7,12 +7,14 @@
 """
 
 from typing import Dict, List, Optional, Set
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timedelta
 from enum import Enum
 import json
 from pathlib import Path
 
+from app.utils.sessions import session_registry
+
 
 class AlertMode(Enum):
     """أوضاع التنبيه"""
@@ -125,6 +127,12 @@ class SmartAlertManager:
         """
         obj_class = obj.get('class', 'unknown').lower()
         distance = obj.get('distance_m', 999)
+        # التهدئة لكل مسار (شخصان = تنبيهان) - أو لكل فئة بدون تتبع.
+        # مسار جديد (track_hits == 1) قد يكون نفس الكائن بمسار أُعيد إنشاؤه
+        # (فريمات متباعدة، كشف فائت): يرث تهدئة الفئة
+        cooldown_key = self._cooldown_key(obj_class, obj.get('track_id'))
+        if obj.get('track_hits') == 1 and cooldown_key != obj_class and obj_class in self.last_alerts:
+            self.last_alerts.setdefault(cooldown_key, replace(self.last_alerts[obj_class]))
         
         # 1. فحص الإغراق - لا نريد أكثر من 5 تنبيهات في الدقيقة
         self._cleanup_old_alerts()
@@ -164,8 +172,8 @@ class SmartAlertManager:
         # 4. فحص التهدئة (cooldown)
         cooldown_secs = self.cooldowns.get(obj_class, self.cooldowns['default'])
         
-        if obj_class in self.last_alerts:
-            last = self.last_alerts[obj_class]
+        if cooldown_key in self.last_alerts:
+            last = self.last_alerts[cooldown_key]
             elapsed = (datetime.now() - last.last_alert_time).total_seconds()
             
             if elapsed < cooldown_secs:
@@ -201,7 +209,7 @@ class SmartAlertManager:
         priority = self._calculate_priority(obj_class, distance)
         
         # تسجيل التنبيه
-        self._record_alert(obj_class)
+        self._record_alert(obj_class, cooldown_key)
         
         # توليد الرسالة
         message = self._generate_message(obj, priority)
@@ -250,19 +258,39 @@ class SmartAlertManager:
         else:
             return f"{obj_class}"
     
-    def _record_alert(self, obj_class: str):
+    def alert_phrases(self, names: Optional[Dict[str, str]] = None) -> List[str]:
+        """
+        كل العبارات التي قد ينتجها _generate_message للأشياء المهمة
+        (لتوليد صوتها مسبقاً في كاش TTS)
+        """
+        names = names or {}
+        phrases = []
+        for obj_class in sorted(ALWAYS_ALERT | ALERT_WHEN_CLOSE):
+            class_ar = names.get(obj_class, obj_class)
+            for distance in (0.3, 0.8, 1.5, 2.0, 3.0, 4.0, 5.0):
+                priority = self._calculate_priority(obj_class, distance)
+                obj = {'class': obj_class, 'class_ar': class_ar, 'distance_m': distance}
+                phrases.append(self._generate_message(obj, priority))
+        return list(dict.fromkeys(phrases))
+
+    @staticmethod
+    def _cooldown_key(obj_class: str, track_id: Optional[int] = None) -> str:
+        return f"{obj_class}#{track_id}" if track_id is not None else obj_class
+
+    def _record_alert(self, obj_class: str, cooldown_key: Optional[str] = None):
         """تسجيل التنبيه"""
         now = datetime.now()
-        
-        if obj_class in self.last_alerts:
-            self.last_alerts[obj_class].last_alert_time = now
-            self.last_alerts[obj_class].alert_count += 1
-        else:
-            self.last_alerts[obj_class] = AlertCooldown(
-                object_class=obj_class,
-                last_alert_time=now,
-                alert_count=1
-            )
+        # مفتاح الفئة يُحدّث دائماً أيضاً - منه ترث المسارات الجديدة
+        for key in dict.fromkeys((cooldown_key or obj_class, obj_class)):
+            if key in self.last_alerts:
+                self.last_alerts[key].last_alert_time = now
+                self.last_alerts[key].alert_count += 1
+            else:
+                self.last_alerts[key] = AlertCooldown(
+                    object_class=obj_class,
+                    last_alert_time=now,
+                    alert_count=1
+                )
         
         self.alerts_last_minute.append(now)
     
@@ -273,6 +301,10 @@ class SmartAlertManager:
             t for t in self.alerts_last_minute 
             if t > one_minute_ago
         ]
+        # تهدئة المسارات المنتهية (مفتاح لكل track_id - لا تنمو بلا حد)
+        expired = datetime.now() - timedelta(seconds=max(self.cooldowns.values()))
+        for key in [k for k, v in self.last_alerts.items() if '#' in k and v.last_alert_time < expired]:
+            del self.last_alerts[key]
     
     def filter_objects(self, objects: List[Dict]) -> List[Dict]:
         """
@@ -335,3 +367,4 @@ class SmartAlertManager:
 
 # Instance عام
 alert_manager = SmartAlertManager()
+session_registry.register('alerts', lambda session_id: SmartAlertManager(), default=alert_manager)
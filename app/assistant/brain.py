@@ -11,7 +11,7 @@
 - "دور حولي" → مسح 360°
 """
 
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import re
@@ -271,19 +271,7 @@ class AssistantBrain:
         objects = objects or []
         
         if command.command_type == CommandType.CHAT:
-            if image_b64:
-                 system_prompt = (
-                    "أنت مساعد بصري ذكي. "
-                    "أجب على سؤال المستخدم بناءً على الصورة التي أمامك. "
-                    "كن دقيقاً ومختصراً."
-                )
-            else:
-                system_prompt = (
-                    "أنت مساعد مفيد لشخص كفيف. "
-                    "تحدث بلهجة ودودة ومختصرة. "
-                    f"معلومات السياق الحالي: {context.get('summary', 'لا يوجد')}. "
-                    f"الأشياء التي أمامك الآن: {[obj.get('class_ar', obj.get('class')) for obj in objects]}."
-                )
+            system_prompt = self._chat_system_prompt(context, objects, image_b64)
             # نحاول الاتصال بالموديل
             response = self.llm_client.chat(command.target, system_prompt, image_b64=image_b64)
             return response
@@ -322,6 +310,53 @@ class AssistantBrain:
         else:
             return "لم أفهم. قل 'مساعدة' لمعرفة الأوامر"
     
+    async def agenerate_response(self,
+                                 command: ParsedCommand,
+                                 context: Dict,
+                                 objects: List[Dict] = None,
+                                 image_b64: str = None) -> str:
+        """
+        نفس generate_response لكن async - أوامر CHAT لا تحجز thread
+        أثناء انتظار النموذج (الباقي ردود محلية فورية)
+        """
+        objects = objects or []
+        if command.command_type == CommandType.CHAT:
+            system_prompt = self._chat_system_prompt(context, objects, image_b64)
+            return await self.llm_client.achat(command.target, system_prompt, image_b64=image_b64)
+        return self.generate_response(command, context, objects, image_b64)
+
+    async def astream_response(self,
+                               command: ParsedCommand,
+                               context: Dict,
+                               objects: List[Dict] = None,
+                               image_b64: str = None) -> AsyncIterator[str]:
+        """
+        بث الرد جملة بجملة - ليبدأ TTS قبل أن ينتهي النموذج
+        الردود المحلية تُرسل كجملة واحدة
+        """
+        objects = objects or []
+        if command.command_type == CommandType.CHAT:
+            system_prompt = self._chat_system_prompt(context, objects, image_b64)
+            async for sentence in self.llm_client.astream_sentences(command.target, system_prompt, image_b64=image_b64):
+                yield sentence
+        else:
+            yield self.generate_response(command, context, objects, image_b64)
+
+    def _chat_system_prompt(self, context: Dict, objects: List[Dict], image_b64: str = None) -> str:
+        """تعليمات النظام لأوامر المحادثة"""
+        if image_b64:
+            return (
+                "أنت مساعد بصري ذكي. "
+                "أجب على سؤال المستخدم بناءً على الصورة التي أمامك. "
+                "كن دقيقاً ومختصراً."
+            )
+        return (
+            "أنت مساعد مفيد لشخص كفيف. "
+            "تحدث بلهجة ودودة ومختصرة. "
+            f"معلومات السياق الحالي: {context.get('summary', 'لا يوجد')}. "
+            f"الأشياء التي أمامك الآن: {[obj.get('class_ar', obj.get('class')) for obj in objects]}."
+        )
+
     def _generate_describe_response(self, 
                                     objects: List[Dict], 
                                     direction: Optional[str] = None) -> str:
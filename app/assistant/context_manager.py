@@ -14,6 +14,8 @@ from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from collections import deque
 
+from app.utils.sessions import session_registry
+
 
 @dataclass
 class ConversationTurn:
@@ -193,3 +195,4 @@ class ContextManager:
 
 # Instance عام
 context_manager = ContextManager()
+session_registry.register('context', lambda session_id: ContextManager(), default=context_manager)
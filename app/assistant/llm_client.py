@@ -1,6 +1,20 @@
 import requests
+import httpx
 import json
+import os
+import re
 import time
+from typing import AsyncIterator, Dict, Optional
+
+from app.utils.metrics import timed
+
+# مهلات صريحة - لا ننتظر Ollama للأبد
+LLM_CONNECT_TIMEOUT = float(os.environ.get('LLM_CONNECT_TIMEOUT', '3'))
+LLM_READ_TIMEOUT = float(os.environ.get('LLM_READ_TIMEOUT', '60'))
+
+# نهاية جملة: . ! ? ؟ أو سطر جديد (متبوعة بمسافة أو نهاية النص)
+SENTENCE_END = re.compile(r'[.!?؟\n]+(?=\s|$)')
+MIN_SENTENCE_CHARS = 12  # لا نرسل أجزاء قصيرة جداً للـ TTS
 
 class LLMClient:
     def __init__(self, host="http://ollama:11434", model="llama3.2:1b", vision_model="moondream"):
@@ -9,11 +23,33 @@ class LLMClient:
         self.vision_model = vision_model
         self.is_ready = False
 
+        # اتصال مستمر (keep-alive) بدل اتصال جديد لكل طلب
+        self.session = requests.Session()
+        self.timeout = httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+        self._async_client: Optional[httpx.AsyncClient] = None
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """عميل async مشترك (connection pool) - يُنشأ عند أول استخدام"""
+        if self._async_client is None or self._async_client.is_closed:
+            self._async_client = httpx.AsyncClient(
+                base_url=self.host,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=8, max_keepalive_connections=4, keepalive_expiry=60.0)
+            )
+        return self._async_client
+
+    async def aclose(self):
+        """إغلاق الاتصالات (عند إيقاف التطبيق)"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        self.session.close()
+
     def check_connection(self) -> bool:
         """التحقق من اتصال Ollama"""
         try:
             print(f"⏳ Connecting to AI Brain ({self.host})...")
-            response = requests.get(f"{self.host}/")
+            response = self.session.get(f"{self.host}/", timeout=LLM_CONNECT_TIMEOUT)
             if response.status_code == 200:
                 print("✅ AI Brain Connected")
                 self.is_ready = True
@@ -22,43 +58,49 @@ class LLMClient:
             print("❌ AI Brain not reachable (Ollama down?)")
         return False
 
+    async def acheck_connection(self) -> bool:
+        """التحقق من اتصال Ollama (async)"""
+        try:
+            response = await self._get_async_client().get("/", timeout=LLM_CONNECT_TIMEOUT)
+            if response.status_code == 200:
+                self.is_ready = True
+                return True
+        except Exception:
+            print("❌ AI Brain not reachable (Ollama down?)")
+        return False
+
     def ensure_model(self):
         """التأكد من وجود الموديلات (Text + Vision)"""
         if not self.check_connection():
             return False
-            
+
         try:
             # Check installed models
-            response = requests.get(f"{self.host}/api/tags")
+            response = self.session.get(f"{self.host}/api/tags", timeout=LLM_CONNECT_TIMEOUT)
             models = [m['name'] for m in response.json()['models']]
-            
+
             # Check Text Model
             if self.model not in models and f"{self.model}:latest" not in models:
                 print(f"📥 Pulling text model {self.model}...")
-                requests.post(f"{self.host}/api/pull", json={"name": self.model})
-            
+                self.session.post(f"{self.host}/api/pull", json={"name": self.model})
+
             # Check Vision Model
             if self.vision_model not in models and f"{self.vision_model}:latest" not in models:
                 print(f"📥 Pulling vision model {self.vision_model}...")
-                requests.post(f"{self.host}/api/pull", json={"name": self.vision_model})
-                
+                self.session.post(f"{self.host}/api/pull", json={"name": self.vision_model})
+
             print(f"✅ Models ({self.model}, {self.vision_model}) check initiated")
             return True
         except Exception as e:
             print(f"⚠️ Model check failed: {e}")
             return False
 
-    def chat(self, prompt: str, system_prompt: str = None, image_b64: str = None) -> str:
-        """محادثة ذكية (نص أو صور)"""
-        if not self.is_ready:
-            if not self.check_connection():
-                return "عذراً، عقلي الذكي غير متصل حالياً."
-
-        url = f"{self.host}/api/generate"
-        
+    def _build_payload(self, prompt: str, system_prompt: str = None,
+                       image_b64: str = None, stream: bool = False) -> Dict:
+        """بناء طلب /api/generate"""
         # Determine model
         target_model = self.vision_model if image_b64 else self.model
-        
+
         full_prompt = prompt
         # Note: LLaVA and Llama sometimes behave differently with system prompts.
         # usually simpler is better for VLM.
@@ -68,23 +110,106 @@ class LLMClient:
         payload = {
             "model": target_model,
             "prompt": full_prompt,
-            "stream": False,
+            "stream": stream,
             "options": {
                 "temperature": 0.7
             }
         }
-        
+
         if image_b64:
             # Clean base64 if needed
             if "," in image_b64:
                 image_b64 = image_b64.split(",", 1)[1]
             payload["images"] = [image_b64]
-        
+
+        return payload
+
+    @timed('llm')
+    def chat(self, prompt: str, system_prompt: str = None, image_b64: str = None) -> str:
+        """محادثة ذكية (نص أو صور)"""
+        if not self.is_ready:
+            if not self.check_connection():
+                return "عذراً، عقلي الذكي غير متصل حالياً."
+
+        url = f"{self.host}/api/generate"
+        payload = self._build_payload(prompt, system_prompt, image_b64)
+
+        try:
+            response = self.session.post(url, json=payload, timeout=(LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT))
+            if response.status_code == 200:
+                return response.json()['response']
+            else:
+                return f"Error: {response.text}"
+        except Exception as e:
+            return f"Thinking Error: {e}"
+
+    @timed('llm')
+    async def achat(self, prompt: str, system_prompt: str = None, image_b64: str = None) -> str:
+        """محادثة ذكية (async) - لا تحجز thread أثناء انتظار النموذج"""
+        if not self.is_ready:
+            if not await self.acheck_connection():
+                return "عذراً، عقلي الذكي غير متصل حالياً."
+
+        payload = self._build_payload(prompt, system_prompt, image_b64)
+
         try:
-            response = requests.post(url, json=payload)
+            response = await self._get_async_client().post("/api/generate", json=payload)
             if response.status_code == 200:
                 return response.json()['response']
             else:
                 return f"Error: {response.text}"
         except Exception as e:
             return f"Thinking Error: {e}"
+
+    @timed('llm_stream')
+    async def astream(self, prompt: str, system_prompt: str = None,
+                      image_b64: str = None) -> AsyncIterator[str]:
+        """بث الكلمات (tokens) فور توليدها"""
+        if not self.is_ready:
+            if not await self.acheck_connection():
+                yield "عذراً، عقلي الذكي غير متصل حالياً."
+                return
+
+        payload = self._build_payload(prompt, system_prompt, image_b64, stream=True)
+
+        try:
+            async with self._get_async_client().stream("POST", "/api/generate", json=payload) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    yield f"Error: {body.decode('utf-8', 'ignore')}"
+                    return
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    token = data.get('response', '')
+                    if token:
+                        yield token
+                    if data.get('done'):
+                        break
+        except Exception as e:
+            yield f"Thinking Error: {e}"
+
+    async def astream_sentences(self, prompt: str, system_prompt: str = None,
+                                image_b64: str = None) -> AsyncIterator[str]:
+        """
+        بث الرد جملة بجملة - الـ TTS يبدأ بنطق الجملة الأولى
+        بينما النموذج ما زال يولّد الباقي
+        """
+        buffer = ""
+        async for token in self.astream(prompt, system_prompt, image_b64):
+            buffer += token
+            while True:
+                match = None
+                for m in SENTENCE_END.finditer(buffer):
+                    if m.end() >= MIN_SENTENCE_CHARS:
+                        match = m
+                        break
+                if match is None:
+                    break
+                sentence, buffer = buffer[:match.end()].strip(), buffer[match.end():]
+                if sentence:
+                    yield sentence
+
+        if buffer.strip():
+            yield buffer.strip()
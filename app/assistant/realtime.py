@@ -0,0 +1,91 @@
+"""
+بث التنبيهات اللحظي - Realtime Hazard Stream over WebSocket
+
+بدلاً من أن يرسل العميل صورة base64 كل 4 ثوانٍ عبر HTTP:
+- العميل يدفع فريمات JPEG ثنائية بأي معدل يستطيعه
+- الخادم يحتفظ بآخر فريم فقط (latest-wins): إذا وصل فريم جديد قبل تحليل
+  السابق، يُستبدل السابق ويُحسب كـ dropped - لا طابور يتراكم
+- نتيجة كل فريم (تنبيهات SmartAlertManager) تُدفع للعميل فور إنتاجها
+
+رسائل الخادم:
+    {"type": "ready"}
+    {"type": "alerts", "frame_id": n, "latency_ms": .., "dropped": .., ...نتيجة /analyze}
+    {"type": "error", "message": ...}
+
+رسائل التحكم من العميل (نص JSON):
+    {"type": "config", "check_motion": false}
+"""
+
+import asyncio
+import time
+from typing import Callable, Dict, Optional
+
+from fastapi import WebSocket
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
+
+from app.vision.frame import Frame
+
+
+class RealtimeHazardSession:
+    """جلسة بث واحدة: مستقبل فريمات + عامل تحليل واحد"""
+
+    def __init__(self, websocket: WebSocket, analyze: Callable[[Optional[Frame], bool], Dict]):
+        self.ws = websocket
+        self.analyze = analyze
+        self.check_motion = True
+
+        self._latest: Optional[bytes] = None
+        self._latest_id = 0
+        self._latest_at = 0.0
+        self._frame_ready = asyncio.Event()
+        self._closed = False
+
+        self.received = 0
+        self.dropped = 0
+        self.processed = 0
+
+    def on_frame(self, data: bytes):
+        """فريم جديد - يستبدل أي فريم لم يُحلل بعد"""
+        self.received += 1
+        if self._latest is not None:
+            self.dropped += 1
+        self._latest = data
+        self._latest_id = self.received
+        self._latest_at = time.perf_counter()
+        self._frame_ready.set()
+
+    def on_control(self, message: Dict):
+        if message.get('type') == 'config' and 'check_motion' in message:
+            self.check_motion = bool(message['check_motion'])
+
+    def close(self):
+        self._closed = True
+        self._frame_ready.set()
+
+    async def run(self):
+        """حلقة التحليل: دائماً أحدث فريم متاح"""
+        while not self._closed:
+            await self._frame_ready.wait()
+            self._frame_ready.clear()
+            if self._closed or self._latest is None:
+                continue
+
+            data, frame_id, received_at = self._latest, self._latest_id, self._latest_at
+            self._latest = None
+
+            try:
+                frame = await run_in_threadpool(Frame.from_bytes, data)
+                result = await run_in_threadpool(self.analyze, frame, self.check_motion)
+            except Exception as e:
+                await self.ws.send_json({'type': 'error', 'message': str(e)})
+                continue
+
+            self.processed += 1
+            await self.ws.send_json(jsonable_encoder({
+                'type': 'alerts',
+                'frame_id': frame_id,
+                'latency_ms': round((time.perf_counter() - received_at) * 1000, 1),
+                'dropped': self.dropped,
+                **result,
+            }))
@@ -6,14 +6,15 @@ Endpoints:
 - POST /chat - محادثة صوتية (صوت + صورة → رد صوتي)
 - POST /analyze - تحليل صامت (صورة → تنبيهات فقط)
 - POST /command - أمر نصي (نص → رد)
+- WS /ws/analyze - بث فريمات → تنبيهات لحظية
 """
 
-from fastapi import APIRouter, File, UploadFile, Form, HTTPException
+from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict
-import base64
 import io
+import json
 import urllib.parse
 import asyncio
 import time
@@ -23,17 +24,24 @@ from .context_manager import context_manager
 from .alert_manager import alert_manager, AlertMode
 
 # Import vision and audio
-from app.vision.model import detector
+from app.vision.model import CUSTOM_CLASSES, detector, face_recognizer
+from app.vision.localization import localizer
 from app.audio.transcribe import transcribe_audio_bytes
-from app.audio.tts import synthesize_text
+from app.audio.tts import tts_engine, stream_chunk
 from app.spatial_awareness.stationary_detector import stationary_detector
 from app.vision.ocr_reader import ocr_reader
+from app.vision.ocr_session import OCRPage
+from app.vision.tracker import object_tracker  # noqa: F401 (registers the per-session 'tracker' component)
+from app.vision.frame import Frame
+from app.utils.pipeline import StageGraph
+from app.utils.ingest import read_image_payload
+from app.utils.sessions import Session, get_session, session_registry
 
 # PHASE 2: Import caching
 from app.utils.caching import cache_manager, perf_monitor, timed
 
-# PHASE 3: Import adaptive learning
-from app.learning.adaptive_system import AdaptiveLearning
+# PHASE 3: Import adaptive learning (registers the per-session 'learning' component)
+from app.learning import adaptive_system
 
 # PHASE 4: Import advanced features
 from app.utils.advanced_features import (
@@ -45,21 +53,16 @@ import cv2
 
 router = APIRouter()
 
-# PHASE 3: Initialize adaptive learning
-learning_system = AdaptiveLearning(user_id="default")
-
 
 # ======== Models ========
 
 class TextCommand(BaseModel):
-    """أمر نصي"""
+    """أمر نصي (الصورة اختيارية: image/jpeg خام أو multipart أو image_b64)"""
     text: str
-    image_b64: Optional[str] = None
 
 
 class AnalyzeRequest(BaseModel):
-    """طلب تحليل صامت"""
-    image_b64: str
+    """طلب تحليل صامت (الصورة: image/jpeg خام أو multipart أو image_b64)"""
     check_motion: Optional[bool] = True
 
 
@@ -70,35 +73,49 @@ class ModeChange(BaseModel):
 
 # ======== Helper Functions ========
 
-def decode_image(image_b64: str) -> bytes:
-    """فك تشفير صورة base64"""
-    if "," in image_b64:
-        _, encoded = image_b64.split(",", 1)
-    else:
-        encoded = image_b64
-    return base64.b64decode(encoded)
-
-
-def detect_objects(image_bytes: bytes) -> List[Dict]:
-    """كشف الأشياء في الصورة"""
+def search_vocabulary(command) -> Optional[List[str]]:
+    """فئة إضافية للكاشف عند البحث عن شيء غير موجود في المفردات الأساسية"""
+    if command.command_type != CommandType.FIND or not command.target:
+        return None
+    # الكاشف يفهم الإنجليزية فقط: الأهداف العربية/الدنماركية تمر بجداول الترجمة
+    target = localizer.to_class(command.target)
+    if target is None and command.target.isascii():
+        target = command.target.strip().lower()
+    # هدف ضمن المفردات الأساسية: الكشف العادي يكفي (بدون كشف ثانٍ في /chat)
+    if not target or target in CUSTOM_CLASSES:
+        return None
+    return [target]
+
+
+def detect_objects(frame: Frame, extra_classes: Optional[List[str]] = None,
+                   session: Optional[Session] = None, use_cache: bool = True) -> List[Dict]:
+    """كشف الأشياء في الصورة (session: حالة الكاشف بين فريمات نفس المستخدم)"""
     try:
-        detections = detector.detect(image_bytes, target_lang='ar')
+        detections = detector.detect(frame, target_lang='ar', extra_classes=extra_classes,
+                                     session=session, use_cache=use_cache)
         return detections
     except Exception as e:
         print(f"⚠️ Detection error: {e}")
         return []
 
 
-def read_text_from_image(image_bytes: bytes) -> str:
-    """قراءة النصوص من الصورة"""
+def register_face(name: str, image) -> Optional[bool]:
+    """حفظ وجه جديد (blocking: أول استدعاء يحمّل نموذج الوجوه) - None = النظام غير مفعل"""
+    if not face_recognizer:
+        return None
+    return face_recognizer.register_face(name, image)
+
+
+def read_text_from_image(frame: Frame, page: Optional[OCRPage] = None) -> str:
+    """قراءة النصوص من الصورة - سطر لكل سطر بترتيب القراءة"""
     try:
         # استخدام دالة الغلاف التي تدعم لغات متعددة (عربي + دنماركي)
-        results = ocr_reader.read_text(image_bytes)
+        # page: ذاكرة الجلسة - المناطق المقروءة سابقاً لا تُعاد قراءتها
+        results = ocr_reader.read_text(frame, page=page)
         if not results:
             return ""
             
-        texts = [res['text'] for res in results]
-        return " ".join(texts)
+        return "\n".join(ocr_reader.get_text_lines(results))
     except Exception as e:
         print(f"⚠️ OCR error: {e}")
         return ""
@@ -110,43 +127,62 @@ from starlette.concurrency import run_in_threadpool
 
 @router.post('/chat')
 async def chat_with_assistant(
-    audio: UploadFile = File(...),
-    image: Optional[str] = Form(None)
+    request: Request,
+    audio: UploadFile = File(...)
 ):
     """
     محادثة صوتية كاملة
     
-    يستقبل: صوت المستخدم + صورة (اختياري)
-    يرجع: صوت الرد
+    يستقبل: صوت المستخدم + صورة (اختياري: ملف image أو base64 في حقل image)
+    يرجع: صوت الرد (يُبث جملة بجملة)
+
+    المراحل تعمل كرسم متوازي: فك الصورة والكشف وتحليل الحركة تبدأ فور وصول
+    الطلب بالتوازي مع ASR، وتلتقي عند توليد الرد. زمن كل مرحلة في Server-Timing
     """
+    graph = StageGraph()
+    session = get_session(request)
     try:
-        # 1. تحويل الصوت لنص (Blocking - Run in threadpool)
+        # 1. كل المراحل المستقلة تبدأ الآن
         audio_bytes = await audio.read()
-        user_text = await run_in_threadpool(transcribe_audio_bytes, audio_bytes)
+        graph.stage('asr', transcribe_audio_bytes, audio_bytes)
+        payload = await read_image_payload(request, b64_field='image', file_fields=('image',), required=False)
+        image = payload.image
+        if image is not None:
+            # فك JPEG مرة واحدة - كل المكونات تستخدم نفس الـ Frame
+            graph.stage('frame', Frame.from_bytes, image)
+            graph.stage('detect', detect_objects, None, session, after=('frame',))
+            graph.stage('motion', session.motion.analyze_frame, after=('frame',))
+
+        user_text = await graph.result('asr')
+        response_text = None
         
         if not user_text or "[" in user_text:
-            # فشل التعرف
+            # فشل التعرف - مراحل الرؤية التي بدأت لم تعد مطلوبة
+            graph.cancel()
             response_text = "لم أسمعك جيداً، أعد من فضلك"
             command = assistant_brain.parse_command("") # Dummy
         else:
             # 2. فهم الأمر
             command = assistant_brain.parse_command(user_text)
             
-            # 3. تحليل الصورة إذا موجودة
+            # 3. نقطة الالتقاء: نتائج الرؤية
             objects = []
-            if image:
-                image_bytes = await run_in_threadpool(decode_image, image)
-                objects = await run_in_threadpool(detect_objects, image_bytes)
-                context_manager.update_objects(objects)
+            if image is not None:
+                frame, objects = await graph.results('frame', 'detect')
+                extra_classes = search_vocabulary(command)
+                if extra_classes:
+                    # الكشف بدأ قبل معرفة الأمر - نعيده بمفردات البحث
+                    objects = await graph.stage('detect_vocab', detect_objects, frame, extra_classes, session)
+                session.context.update_objects(objects)
                 
                 # تحليل الحركة
-                motion_state = await run_in_threadpool(stationary_detector.analyze_frame, image_bytes)
-                context_manager.update_user_state(is_stationary=motion_state.is_stationary)
-                alert_manager.set_stationary(motion_state.is_stationary)
+                motion_state = await graph.result('motion')
+                session.context.update_user_state(is_stationary=motion_state.is_stationary)
+                session.alerts.set_stationary(motion_state.is_stationary)
                 
                 # إذا أمر قراءة
                 if command.command_type == CommandType.READ:
-                    text = await run_in_threadpool(read_text_from_image, image_bytes)
+                    text = await graph.stage('ocr', read_text_from_image, frame, session.ocr)
                     if text:
                         response_text = f"مكتوب: {text}"
                     else:
@@ -154,109 +190,190 @@ async def chat_with_assistant(
                 
                 # إذا أمر حفظ وجه
                 elif command.command_type == CommandType.LEARN_FACE:
-                    if hasattr(detector, 'face_recognizer') and detector.face_recognizer:
-                        name = command.target
-                        if name:
-                            # face register depends on detector state, run in threadpool
-                            success = await run_in_threadpool(detector.face_recognizer.register_face, name, image_bytes)
-                            if success:
-                                response_text = f"تم حفظ وجه {name} بنجاح"
-                            else:
-                                response_text = "لم أتمكن من حفظ الوجه، حاول مرة أخرى بصورة أوضح"
+                    name = command.target
+                    if name:
+                        # التحميل (dlib + المعرض) إن لزم يحدث داخل الـ threadpool وليس على الـ event loop
+                        success = await graph.stage('face_register', register_face, name, image)
+                        if success is None:
+                            response_text = "نظام التعرف على الوجوه غير مفعل"
+                        elif success:
+                            response_text = f"تم حفظ وجه {name} بنجاح"
                         else:
-                            response_text = "ما هو الاسم؟ قل 'هذا أحمد' مثلاً"
+                            response_text = "لم أتمكن من حفظ الوجه، حاول مرة أخرى بصورة أوضح"
                     else:
-                        response_text = "نظام التعرف على الوجوه غير مفعل"
+                        response_text = "ما هو الاسم؟ قل 'هذا أحمد' مثلاً"
 
-                else:
-                    # توليد الرد (May call LLM - Blocking)
-                    context = context_manager.get_context_summary()
-                    response_text = await run_in_threadpool(assistant_brain.generate_response, command, context, objects, image)
-            else:
-                context = context_manager.get_context_summary()
-                response_text = await run_in_threadpool(assistant_brain.generate_response, command, context, [], None)
+            if response_text is None:
+                # توليد الرد - جملة بجملة (LLM يبث بينما TTS ينطق)
+                context = session.context.get_context_summary()
+                image_b64 = payload.as_b64() if command.command_type == CommandType.CHAT else None
+                sentences = assistant_brain.astream_response(command, context, objects, image_b64)
             
             # تنفيذ الأوامر الخاصة
             if command.command_type == CommandType.QUIET:
-                alert_manager.set_mode(AlertMode.QUIET)
-                context_manager.set_quiet_mode(True)
+                session.alerts.set_mode(AlertMode.QUIET)
+                session.context.set_quiet_mode(True)
             elif command.command_type == CommandType.TALK:
-                alert_manager.set_mode(AlertMode.NORMAL)
-                context_manager.set_quiet_mode(False)
-        
-        # 4. حفظ في السياق
-        context_manager.add_conversation_turn(
-            user_input=user_text,
-            assistant_response=response_text
-        )
-        
-        # 5. تحويل الرد لصوت (Blocking - Run in threadpool)
-        audio_response = await run_in_threadpool(synthesize_text, response_text)
-        
-        if audio_response:
-            return StreamingResponse(
-                io.BytesIO(audio_response),
-                media_type="audio/wav",
-                headers={
-                    "X-Response-Text": urllib.parse.quote(response_text),
-                    "X-Command-Type": command.command_type.value if command else "unknown"
-                }
-            )
-        else:
-            # إرجاع نص إذا فشل TTS
-            return {
-                "text": response_text,
-                "audio": None,
-                "command": command.command_type.value if command else "unknown"
-            }
+                session.alerts.set_mode(AlertMode.NORMAL)
+                session.context.set_quiet_mode(False)
+
+        if response_text is not None:
+            sentences = single_sentence(response_text)
+
+        # 4. تحويل الرد لصوت وبثه + حفظ في السياق
+        return await speak_response(session, graph, sentences, user_text, command)
             
+    except HTTPException:
+        graph.cancel()
+        raise
     except Exception as e:
+        graph.cancel()
         import traceback
         traceback.print_exc()
         print(f"CRITICAL ERROR IN CHAT: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def single_sentence(text: str):
+    """جملة لكل سطر (نص مقروء متعدد الأسطر يُنطق سطراً بسطر)"""
+    for line in text.split("\n"):
+        if line.strip():
+            yield line
+
+
+async def speak_response(session: Session, graph: StageGraph, sentences, user_text: str, command):
+    """
+    بث صوت الرد جملة بجملة:
+    الجمل تُجمع في الخلفية (من LLM) بينما الجملة الحالية تُحول لصوت،
+    والاستجابة تبدأ فور جاهزية صوت الجملة الأولى
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def produce():
+        try:
+            async for sentence in sentences:
+                await queue.put(sentence)
+        finally:
+            await queue.put(None)
+
+    producer = asyncio.ensure_future(produce())
+    spoken = []
+
+    def save_turn():
+        session.context.add_conversation_turn(
+            user_input=user_text,
+            assistant_response=" ".join(spoken)
+        )
+
+    start = time.perf_counter()
+    first = await queue.get()
+    graph.record('respond', start)
+    command_type = command.command_type.value if command else "unknown"
+
+    if first is None:
+        # رد فارغ (مثلاً done من Ollama بدون response): المنتج انتهى، لا شيء في الطابور
+        save_turn()
+        return {"text": "", "audio": None, "command": command_type}
+
+    start = time.perf_counter()
+    audio_response, media_type = await run_in_threadpool(tts_engine.synthesize, first)
+    graph.record('tts_first', start)
+    spoken.append(first)
+
+    if not audio_response:
+        # إرجاع نص إذا فشل TTS
+        while True:
+            sentence = await queue.get()
+            if sentence is None:
+                break
+            spoken.append(sentence)
+        save_turn()
+        return {
+            "text": " ".join(spoken),
+            "audio": None,
+            "command": command_type
+        }
+
+    async def body():
+        try:
+            yield stream_chunk(audio_response, media_type, first=True)
+            while True:
+                sentence = await queue.get()
+                if sentence is None:
+                    break
+                # البث بصيغة واحدة: جملة بصيغة أخرى (محرك مختلف) تُولد بصيغة البث
+                audio_chunk, chunk_type = await run_in_threadpool(
+                    tts_engine.synthesize, sentence, 'ar', None, media_type
+                )
+                if audio_chunk and chunk_type == media_type:
+                    spoken.append(sentence)
+                    yield stream_chunk(audio_chunk, chunk_type, first=False)
+                else:
+                    print(f"⚠️ TTS could not voice sentence as {media_type}, skipped")
+        finally:
+            if not producer.done():
+                producer.cancel()
+            save_turn()
+
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={
+            # الجملة الأولى فقط (الهيدر يُرسل قبل توليد الباقي) - النص الكامل
+            # المنطوق يُحفظ في السياق قبل نهاية البث: GET /assistant/history?n=1
+            "X-Response-Text": urllib.parse.quote(first),
+            "X-Response-Full": "/assistant/history?n=1",
+            "X-Command-Type": command_type,
+            "Server-Timing": graph.server_timing()
+        }
+    )
+
+
 @router.post('/command')
-async def process_text_command(request: TextCommand):
+async def process_text_command(http_request: Request):
     """
     معالجة أمر نصي
+    (JSON {text, image_b64} أو multipart: text + ملف image أو image/jpeg خام مع ?text=)
     """
+    payload = await read_image_payload(http_request, required=False)
+    request = payload.parse(TextCommand)
+    session = get_session(http_request)
     try:
         # فهم الأمر
         command = assistant_brain.parse_command(request.text)
         
         # تحليل الصورة إذا موجودة
         objects = []
-        if request.image_b64:
-            image_bytes = await run_in_threadpool(decode_image, request.image_b64)
-            objects = await run_in_threadpool(detect_objects, image_bytes)
-            context_manager.update_objects(objects)
+        if payload.image is not None:
+            frame = await run_in_threadpool(Frame.from_bytes, payload.image)
+            objects = await run_in_threadpool(detect_objects, frame, search_vocabulary(command), session)
+            session.context.update_objects(objects)
             
             # إذا أمر قراءة
             if command.command_type == CommandType.READ:
-                text = await run_in_threadpool(read_text_from_image, image_bytes)
+                text = await run_in_threadpool(read_text_from_image, frame, session.ocr)
                 if text:
                     response_text = f"مكتوب: {text}"
                 else:
                     response_text = "لم أجد نصاً واضحاً"
             else:
-                context = context_manager.get_context_summary()
-                response_text = await run_in_threadpool(assistant_brain.generate_response, command, context, objects, request.image_b64)
+                context = session.context.get_context_summary()
+                image_b64 = payload.as_b64() if command.command_type == CommandType.CHAT else None
+                response_text = await assistant_brain.agenerate_response(command, context, objects, image_b64)
         else:
-            context = context_manager.get_context_summary()
-            response_text = await run_in_threadpool(assistant_brain.generate_response, command, context, context_manager.last_objects, None)
+            context = session.context.get_context_summary()
+            response_text = await assistant_brain.agenerate_response(command, context, session.context.last_objects, None)
         
         # تنفيذ الأوامر الخاصة
         if command.command_type == CommandType.QUIET:
-            alert_manager.set_mode(AlertMode.QUIET)
-            context_manager.set_quiet_mode(True)
+            session.alerts.set_mode(AlertMode.QUIET)
+            session.context.set_quiet_mode(True)
         elif command.command_type == CommandType.TALK:
-            alert_manager.set_mode(AlertMode.NORMAL)
-            context_manager.set_quiet_mode(False)
+            session.alerts.set_mode(AlertMode.NORMAL)
+            session.context.set_quiet_mode(False)
         
         # حفظ في السياق
-        context_manager.add_conversation_turn(
+        session.context.add_conversation_turn(
             user_input=request.text,
             assistant_response=response_text,
             action=command.command_type.value
@@ -272,47 +389,96 @@ async def process_text_command(request: TextCommand):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def analyze_frame_alerts(session: Session, frame: Optional[Frame], check_motion: bool = True) -> Dict:
+    """
+    تحليل صامت لفريم واحد - فقط تنبيهات مهمة
+    (مشترك بين POST /analyze و WebSocket /ws/analyze)
+    """
+    # تحليل الحركة
+    if check_motion:
+        motion_state = session.motion.analyze_frame(frame)
+        session.alerts.set_stationary(motion_state.is_stationary)
+        session.context.update_user_state(is_stationary=motion_state.is_stationary)
+    
+    # كشف الأشياء + التتبع (الكاشف يحدّث session.tracker: track_id ثابت لكل كائن)
+    # مسار الأمان: بدون كاش الفريمات - كل فريم مكشوف فعلاً يمر بالكاشف
+    # TRACKER_DETECT_INTERVAL > 1: الفريمات البينية تستخدم المسارات المتوقعة بدون كاشف
+    if session.tracker.should_detect():
+        objects = detect_objects(frame, session=session, use_cache=False)
+    else:
+        objects = session.tracker.predict()
+    session.context.update_objects(objects)
+    
+    # فلترة التنبيهات الذكية
+    filtered = session.alerts.filter_objects(objects)
+    
+    # توليد رسالة صوتية واحدة (إذا يوجد تنبيهات)
+    speak_message = session.alerts.get_speak_message(filtered)
+    
+    return {
+        "objects_count": len(objects),
+        "alerts_count": len(filtered),
+        "alerts": filtered,
+        "speak_message": speak_message,
+        "should_speak": len(speak_message) > 0,
+        "is_stationary": session.alerts.is_stationary,
+        "mode": session.alerts.current_mode.value
+    }
+
+
 @router.post('/analyze')
-def analyze_scene_silently(request: AnalyzeRequest):
+async def analyze_scene_silently(http_request: Request):
     """
     تحليل صامت - فقط تنبيهات مهمة
-    RUNS AS SYNC DEF to prevent blocking event loop
+    الصورة: image/jpeg خام (الأخف) أو multipart أو JSON image_b64
+    التحليل يعمل في threadpool حتى لا يحجز الـ event loop
+    (للتحليل المستمر استخدم WebSocket /ws/analyze)
     """
+    payload = await read_image_payload(http_request)
+    request = payload.parse(AnalyzeRequest)
+    session = get_session(http_request)
     try:
-        image_bytes = decode_image(request.image_b64)
-        
-        # تحليل الحركة
-        if request.check_motion:
-            motion_state = stationary_detector.analyze_frame(image_bytes)
-            alert_manager.set_stationary(motion_state.is_stationary)
-            context_manager.update_user_state(is_stationary=motion_state.is_stationary)
-        
-        # كشف الأشياء
-        objects = detect_objects(image_bytes)
-        context_manager.update_objects(objects)
-        
-        # فلترة التنبيهات الذكية
-        filtered = alert_manager.filter_objects(objects)
-        
-        # توليد رسالة صوتية واحدة (إذا يوجد تنبيهات)
-        speak_message = alert_manager.get_speak_message(filtered)
-        
-        return {
-            "objects_count": len(objects),
-            "alerts_count": len(filtered),
-            "alerts": filtered,
-            "speak_message": speak_message,
-            "should_speak": len(speak_message) > 0,
-            "is_stationary": alert_manager.is_stationary,
-            "mode": alert_manager.current_mode.value
-        }
+        frame = await run_in_threadpool(Frame.from_bytes, payload.image)
+        return await run_in_threadpool(analyze_frame_alerts, session, frame, request.check_motion)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.websocket('/ws/analyze')
+async def realtime_hazard_stream(websocket: WebSocket):
+    """
+    بث التنبيهات اللحظي: العميل يدفع فريمات JPEG ثنائية، الخادم يحلل
+    أحدث فريم فقط (الفريمات القديمة تُسقط) ويدفع التنبيهات فور إنتاجها
+    """
+    from .realtime import RealtimeHazardSession
+
+    await websocket.accept()
+    session = get_session(websocket)
+    stream = RealtimeHazardSession(websocket, lambda frame, check_motion: analyze_frame_alerts(session, frame, check_motion))
+    worker = asyncio.ensure_future(stream.run())
+    await websocket.send_json({'type': 'ready'})
+    try:
+        while True:
+            message = await websocket.receive()
+            if message.get('type') == 'websocket.disconnect':
+                break
+            if message.get('bytes') is not None:
+                stream.on_frame(message['bytes'])
+            elif message.get('text'):
+                try:
+                    stream.on_control(json.loads(message['text']))
+                except ValueError:
+                    await websocket.send_json({'type': 'error', 'message': 'invalid control message'})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        stream.close()
+        worker.cancel()
+
+
 @router.post('/mode')
-async def change_mode(request: ModeChange):
+async def change_mode(request: ModeChange, http_request: Request):
     """تغيير وضع التنبيهات"""
     mode_map = {
         'quiet': AlertMode.QUIET,
@@ -320,35 +486,38 @@ async def change_mode(request: ModeChange):
         'walking': AlertMode.WALKING,
         'scanning': AlertMode.SCANNING
     }
+    session = get_session(http_request)
     
     if request.mode not in mode_map:
         raise HTTPException(status_code=400, detail="Invalid mode")
     
-    result = alert_manager.set_mode(mode_map[request.mode])
+    result = session.alerts.set_mode(mode_map[request.mode])
     
     if request.mode == 'quiet':
-        context_manager.set_quiet_mode(True)
+        session.context.set_quiet_mode(True)
     else:
-        context_manager.set_quiet_mode(False)
+        session.context.set_quiet_mode(False)
     
     return result
 
 
 @router.get('/status')
-async def get_assistant_status():
+async def get_assistant_status(request: Request):
     """حالة المساعد"""
+    session = get_session(request)
     return {
-        **alert_manager.get_status(),
-        **context_manager.get_context_summary()
+        **session.alerts.get_status(),
+        **session.context.get_context_summary()
     }
 
 
 @router.post('/reset')
-async def reset_assistant():
+async def reset_assistant(request: Request):
     """إعادة تعيين المساعد"""
-    alert_manager.reset_cooldowns()
-    alert_manager.set_mode(AlertMode.NORMAL)
-    context_manager.clear_context()
+    session = get_session(request)
+    session.alerts.reset_cooldowns()
+    session.alerts.set_mode(AlertMode.NORMAL)
+    session.context.clear_context()
     
     return {
         "message": "تم إعادة تعيين المساعد",
@@ -357,8 +526,18 @@ async def reset_assistant():
 
 
 @router.get('/history')
-async def get_conversation_history(n: int = 5):
+async def get_conversation_history(request: Request, n: int = 5):
     """تاريخ المحادثة"""
+    session = get_session(request)
+    return {
+        "history": session.context.get_last_conversation(n)
+    }
+
+
+@router.get('/sessions/stats')
+async def get_sessions_stats(request: Request):
+    """إحصائيات سجل الجلسات + جلسة الطلب الحالية"""
     return {
-        "history": context_manager.get_last_conversation(n)
+        **session_registry.get_stats(),
+        'current': get_session(request).get_stats()
     }
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, File, UploadFile, HTTPException
-from .transcribe import transcribe_audio_bytes
-from .tts import synthesize_text
+from .transcribe import transcribe_audio_bytes, asr_engine
+from .tts import tts_engine
 from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 import io
 
 router = APIRouter()
@@ -12,8 +13,18 @@ async def asr(file: UploadFile = File(...)):
     text = transcribe_audio_bytes(content)
     return {'text': text}
 
+@router.get('/asr/stats')
+async def asr_stats():
+    """ASR engine pool state, queue depth and decode latency."""
+    return asr_engine.get_stats()
+
 @router.post('/tts')
 async def tts(payload: dict):
     text = payload.get('text','')
-    audio_bytes = synthesize_text(text)
-    return StreamingResponse(io.BytesIO(audio_bytes), media_type='audio/wav')
+    audio_bytes, media_type = await run_in_threadpool(tts_engine.synthesize, text, payload.get('lang', 'ar'))
+    return StreamingResponse(io.BytesIO(audio_bytes), media_type=media_type)
+
+@router.get('/tts/stats')
+async def tts_stats():
+    """TTS engine and phrase audio cache statistics."""
+    return tts_engine.get_stats()
@@ -1,26 +1,175 @@
 # ASR using faster-whisper (whisper-base) with fallback to mock transcription.
+#
+# The Whisper model is loaded ONCE per process into a small pool of warm
+# instances (sized to the CPU cores) instead of being rebuilt on every request.
+# Audio is decoded straight from memory - no temp files.
+import io
 import os
+import queue
+import threading
+import time
+from collections import deque
 from pathlib import Path
+from typing import Dict, Optional
+
+from app.utils.metrics import timed
+from app.utils.model_registry import model_registry
+
 MODELDIR = Path('/code/models')
 
+ASR_MODEL_NAME = os.environ.get('ASR_MODEL', 'base')
+ASR_CPU_THREADS = int(os.environ.get('ASR_CPU_THREADS', '2'))  # threads لكل نموذج
+ASR_POOL_SIZE = int(os.environ.get('ASR_POOL_SIZE', '0'))      # 0 = حسب عدد الأنوية
+ASR_MAX_POOL_SIZE = 4                                           # حد أعلى للحجم التلقائي (ذاكرة)
+ASR_BEAM_SIZE = int(os.environ.get('ASR_BEAM_SIZE', '5'))
+
+
+def _default_pool_size(cpu_threads: int) -> int:
+    """عدد النسخ الدافئة: الأنوية المتاحة ÷ threads كل نموذج"""
+    cores = os.cpu_count() or 1
+    return max(1, min(ASR_MAX_POOL_SIZE, cores // max(1, cpu_threads)))
+
+
+class ASREngine:
+    """
+    محرك التعرف على الكلام - مشترك على مستوى العملية
+    يحمّل النموذج مرة واحدة ويحتفظ بمجموعة نسخ جاهزة (pool)
+    """
+
+    def __init__(self,
+                 model_name: str = ASR_MODEL_NAME,
+                 pool_size: int = ASR_POOL_SIZE,
+                 cpu_threads: int = ASR_CPU_THREADS,
+                 download_root: Path = MODELDIR):
+        self.model_name = model_name
+        self.cpu_threads = cpu_threads
+        self.pool_size = pool_size or _default_pool_size(cpu_threads)
+        self.download_root = download_root
+
+        self._pool: "queue.Queue" = queue.Queue()
+        self._load_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.is_loaded = False
+        self.load_error: Optional[str] = None
+        self.load_time_s: float = 0.0
+
+        # إحصائيات
+        self._waiting = 0
+        self._in_flight = 0
+        self._requests = 0
+        self._failures = 0
+        self._decode_latencies: deque = deque(maxlen=100)
+        self._wait_latencies: deque = deque(maxlen=100)
+
+    def load(self) -> bool:
+        """تحميل النماذج (مرة واحدة فقط - آمن مع الـ threads)"""
+        if self.is_loaded:
+            return True
+
+        with self._load_lock:
+            if self.is_loaded:
+                return True
+            try:
+                from faster_whisper import WhisperModel
+
+                start = time.perf_counter()
+                print(f"⏳ Loading Whisper '{self.model_name}' x{self.pool_size} "
+                      f"({self.cpu_threads} threads each)...")
+                for _ in range(self.pool_size):
+                    self._pool.put(WhisperModel(
+                        self.model_name,
+                        device='cpu',
+                        compute_type='int8',
+                        cpu_threads=self.cpu_threads,
+                        download_root=str(self.download_root)
+                    ))
+                self.load_time_s = time.perf_counter() - start
+                self.load_error = None
+                self.is_loaded = True
+                print(f"✅ ASR engine ready in {self.load_time_s:.1f}s")
+            except Exception as e:
+                self.load_error = str(e)
+                print(f"⚠️ ASR engine unavailable: {e}")
+
+        return self.is_loaded
+
+    @timed('asr')
+    def transcribe(self, audio, beam_size: int = ASR_BEAM_SIZE,
+                   language: Optional[str] = None) -> str:
+        """
+        تحويل الصوت لنص
+
+        Args:
+            audio: bytes / memoryview لملف صوتي (wav, webm, ...)
+                   أو numpy float32 mono 16kHz
+        """
+        if not self.load():
+            raise RuntimeError(self.load_error or "ASR engine not loaded")
+
+        if isinstance(audio, (bytes, bytearray, memoryview)):
+            audio = io.BytesIO(audio)
+
+        wait_start = time.perf_counter()
+        with self._stats_lock:
+            self._waiting += 1
+        model = self._pool.get()
+        with self._stats_lock:
+            self._waiting -= 1
+            self._in_flight += 1
+
+        decode_start = time.perf_counter()
+        try:
+            segments, _info = model.transcribe(audio, beam_size=beam_size, language=language)
+            # segments عبارة عن generator - يجب استهلاكه قبل إعادة النموذج للـ pool
+            text = " ".join(s.text for s in segments)
+        except Exception:
+            with self._stats_lock:
+                self._failures += 1
+            raise
+        finally:
+            self._pool.put(model)
+            decode_time = time.perf_counter() - decode_start
+            with self._stats_lock:
+                self._in_flight -= 1
+                self._requests += 1
+                self._decode_latencies.append(decode_time)
+                self._wait_latencies.append(decode_start - wait_start)
+
+        return text
+
+    def get_stats(self) -> Dict:
+        """إحصائيات المحرك: عمق الطابور وزمن فك التشفير"""
+        with self._stats_lock:
+            decode = list(self._decode_latencies)
+            wait = list(self._wait_latencies)
+            return {
+                'model': self.model_name,
+                'loaded': self.is_loaded,
+                'load_error': self.load_error,
+                'load_time_s': round(self.load_time_s, 3),
+                'pool_size': self.pool_size,
+                'idle_instances': self._pool.qsize(),
+                'queue_depth': self._waiting,
+                'in_flight': self._in_flight,
+                'requests': self._requests,
+                'failures': self._failures,
+                'decode_ms': {
+                    'last': round(decode[-1] * 1000, 1) if decode else 0.0,
+                    'avg': round(sum(decode) / len(decode) * 1000, 1) if decode else 0.0,
+                    'max': round(max(decode) * 1000, 1) if decode else 0.0,
+                },
+                'queue_wait_ms_avg': round(sum(wait) / len(wait) * 1000, 1) if wait else 0.0,
+            }
+
+
+# Instance عام
+asr_engine = ASREngine()
+model_registry.register('asr', lambda: asr_engine if asr_engine.load() else None)
+
+
 def transcribe_audio_bytes(b: bytes) -> str:
-    # Try faster-whisper if model available
     try:
-        from faster_whisper import WhisperModel
-        # Use model name "base" with download_root pointing to our models dir
-        model = WhisperModel("base", device='cpu', compute_type='int8', download_root=str(MODELDIR))
-        
-        # write bytes to temp file
-        import tempfile
-        tf = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
-        tf.write(b)
-        tf.flush()
-        tf.close()
-        
-        result = model.transcribe(tf.name, beam_size=5)
-        segments = [s.text for s in result[0]]
-        
-        os.unlink(tf.name)
-        return " ".join(segments) if segments else "[empty]"
+        text = asr_engine.transcribe(b)
+        return text if text else "[empty]"
     except Exception as e:
         return f"[mock transcription: faster-whisper unavailable: {e}]"
@@ -1,73 +1,290 @@
 # TTS - Text to Speech
 # تحويل النص لصوت
-# يدعم العربية عبر gTTS
+# محرك محلي (pyttsx3) يبقى في الذاكرة + كاش صوتي للعبارات المتكررة
+# gTTS اختياري (شبكة) كبديل أو عند طلبه صراحة
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.utils.metrics import timed
+
+# local = pyttsx3 فقط (بدون شبكة)، gtts = gTTS فقط، auto = محلي ثم gTTS
+TTS_BACKEND = os.environ.get('TTS_BACKEND', 'auto')
+TTS_VOICE = os.environ.get('TTS_VOICE', '')          # voice id (فارغ = اختيار تلقائي حسب اللغة)
+TTS_RATE = int(os.environ.get('TTS_RATE', '170'))    # كلمة/دقيقة
+TTS_CACHE_MB = float(os.environ.get('TTS_CACHE_MB', '64'))  # ~450 عبارة تنبيه WAV
+MEDIA_TYPES = {'local': 'audio/wav', 'gtts': 'audio/mpeg'}
+
+
+class AudioCache:
+    """
+    كاش صوتي معنون بالمحتوى: sha1(text, lang, voice, speed) → (bytes, media_type)
+    LRU محدود بالحجم (بايت) - العبارات المتكررة تخرج من الذاكرة مباشرة
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text: str, lang: str, voice: str, speed: int) -> str:
+        raw = f"{lang}|{voice}|{speed}|{text.strip()}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, audio: bytes, media_type: str):
+        if not audio or len(audio) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[0])
+            self._entries[key] = (audio, media_type)
+            self._size += len(audio)
+            while self._size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get_stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._size,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+class TTSEngine:
+    """
+    محرك TTS دائم:
+    - pyttsx3 يُهيأ مرة واحدة (بدل init لكل رد) ويُستخدم تحت قفل (ليس thread-safe)
+    - كل نتيجة تُخزن في AudioCache
+    - prewarm() يولد صوت عبارات التنبيه مسبقاً في الخلفية
+    """
+
+    def __init__(self, backend: str = TTS_BACKEND, voice: str = TTS_VOICE, rate: int = TTS_RATE,
+                 cache_mb: float = TTS_CACHE_MB):
+        self.backend = backend
+        self.voice = voice
+        self.rate = rate
+        self.cache = AudioCache(int(cache_mb * 1024 * 1024))
+        self._engine = None
+        self._engine_failed = False
+        self._voices: Dict[str, str] = {}
+        self._engine_lock = threading.Lock()
+        self.synth_count = 0
+        self.synth_ms = 0.0
+        self.prewarmed = 0
+
+    # ======== Backends ========
+
+    def _get_local_engine(self):
+        """تهيئة pyttsx3 مرة واحدة"""
+        if self._engine is None and not self._engine_failed:
+            try:
+                import pyttsx3
+                self._engine = pyttsx3.init()
+                self._engine.setProperty('rate', self.rate)
+            except Exception as e:
+                print(f"⚠️ pyttsx3 unavailable: {e}")
+                self._engine_failed = True
+        return self._engine
+
+    def _voice_for(self, engine, lang: str) -> Optional[str]:
+        """اختيار صوت مناسب للغة (محفوظ بعد أول بحث)"""
+        if self.voice:
+            return self.voice
+        if lang not in self._voices:
+            chosen = ''
+            language = {'ar': 'arabic', 'en': 'english', 'da': 'danish'}.get(lang, lang)
+            for voice in engine.getProperty('voices'):
+                if language in voice.name.lower() or f"/{lang}" in voice.id.lower():
+                    chosen = voice.id
+                    break
+            self._voices[lang] = chosen
+        return self._voices[lang] or None
+
+    def _local_voice_ok(self, engine, lang: str) -> bool:
+        """
+        auto: لغة بدون صوت محلي = فشل المحرك المحلي (وإلا نُطق العربي بالصوت
+        الإنجليزي الافتراضي ولم يصل أبداً لـ gTTS). local: الصوت الافتراضي أفضل من الصمت
+        """
+        return self.backend == 'local' or self._voice_for(engine, lang) is not None
+
+    def _synthesize_local(self, text: str, lang: str, speed: int, require_voice: bool = True) -> bytes:
+        with self._engine_lock:
+            engine = self._get_local_engine()
+            if engine is None or (require_voice and not self._local_voice_ok(engine, lang)):
+                return b''
+
+            voice_id = self._voice_for(engine, lang)
+            if voice_id:
+                engine.setProperty('voice', voice_id)
+            engine.setProperty('rate', speed)
+
+            fd, path = tempfile.mkstemp(suffix='.wav')
+            os.close(fd)
+            try:
+                engine.save_to_file(text, path)
+                engine.runAndWait()
+                with open(path, 'rb') as f:
+                    return f.read()
+            finally:
+                os.remove(path)
+
+    @staticmethod
+    def _synthesize_gtts(text: str, lang: str) -> bytes:
+        import io
+        from gtts import gTTS
+
+        buf = io.BytesIO()
+        gTTS(text=text, lang=lang, slow=False).write_to_fp(buf)  # بدون ملف مؤقت
+        return buf.getvalue()
+
+    @timed('tts')
+    def _synthesize(self, text: str, lang: str, speed: int, media_type: Optional[str] = None) -> Tuple[bytes, str]:
+        order = {'local': ('local',), 'gtts': ('gtts',)}.get(self.backend, ('local', 'gtts'))
+        if media_type:
+            # صيغة مفروضة (بث بدأ بها): المحرك المنتج لها فقط، ولو بالصوت الافتراضي
+            order = [name for name in order if MEDIA_TYPES[name] == media_type]
+        for name in order:
+            try:
+                if name == 'local':
+                    audio = self._synthesize_local(text, lang, speed, require_voice=media_type is None)
+                    if audio:
+                        return audio, MEDIA_TYPES['local']
+                else:
+                    audio = self._synthesize_gtts(text, lang)
+                    if audio:
+                        return audio, MEDIA_TYPES['gtts']
+            except Exception as e:
+                print(f"⚠️ {name} TTS error: {e}")
+        return b'', media_type or 'audio/wav'
+
+    # ======== Public API ========
+
+    def synthesize(self, text: str, lang: str = 'ar', speed: Optional[int] = None,
+                   media_type: Optional[str] = None) -> Tuple[bytes, str]:
+        """
+        تحويل النص لصوت (من الكاش إن أمكن)
+
+        media_type: صيغة مطلوبة ('audio/wav' / 'audio/mpeg') - لجمل بث بدأ بصيغة معينة
+
+        Returns:
+            (audio_bytes, media_type) - bytes فارغة إذا تعذرت الصيغة المطلوبة
+        """
+        if not text or not text.strip():
+            return b'', media_type or 'audio/wav'
+
+        speed = speed or self.rate
+        key = AudioCache.key(text, lang, self.voice, speed)
+        cached = self.cache.get(key)
+        if cached is not None and media_type in (None, cached[1]):
+            return cached
+        if media_type:
+            key = AudioCache.key(text, f"{lang}:{media_type}", self.voice, speed)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        start = time.perf_counter()
+        audio, media_type = self._synthesize(text.strip(), lang, speed, media_type)
+        self.synth_ms += (time.perf_counter() - start) * 1000
+        self.synth_count += 1
+
+        self.cache.put(key, audio, media_type)
+        return audio, media_type
+
+    def prewarm(self, phrases: Iterable[str], lang: str = 'ar'):
+        """توليد صوت العبارات مسبقاً (يُستدعى في thread خلفي عند البدء)"""
+        if self.backend == 'auto':
+            with self._engine_lock:
+                engine = self._get_local_engine()
+                local_ok = engine is not None and self._local_voice_ok(engine, lang)
+            if not local_ok:
+                print(f"⚠️ TTS prewarm skipped - no local '{lang}' voice (not hammering gTTS at startup)")
+                return
+        start = time.perf_counter()
+        for phrase in dict.fromkeys(phrases):
+            if AudioCache.key(phrase, lang, self.voice, self.rate) in self.cache:
+                continue
+            audio, _ = self.synthesize(phrase, lang)
+            if audio:
+                self.prewarmed += 1
+        print(f"✅ TTS prewarmed {self.prewarmed} phrases in {time.perf_counter() - start:.1f}s")
+
+    def get_stats(self) -> Dict:
+        return {
+            'backend': self.backend,
+            'local_engine': self._engine is not None,
+            'synth_count': self.synth_count,
+            'avg_synth_ms': round(self.synth_ms / self.synth_count, 1) if self.synth_count else 0.0,
+            'prewarmed': self.prewarmed,
+            'cache': self.cache.get_stats(),
+        }
+
+
+def stream_chunk(audio: bytes, media_type: str, first: bool) -> bytes:
+    """
+    تحويل صوت جملة واحدة لجزء قابل للوصل في بث واحد:
+    - MP3: الإطارات تُوصل كما هي
+    - WAV: الجزء الأول بهيدر طوله مفتوح (0xFFFFFFFF)، والباقي PCM فقط
+    """
+    if media_type != 'audio/wav':
+        return audio
+    idx = audio.find(b'data', 12)
+    if idx < 0:
+        return audio if first else b''
+    size = int.from_bytes(audio[idx + 4:idx + 8], 'little')
+    pcm = audio[idx + 8:idx + 8 + size]
+    if not first:
+        return pcm
+    header = bytearray(audio[:idx + 8])
+    header[4:8] = b'\xff\xff\xff\xff'
+    header[idx + 4:idx + 8] = b'\xff\xff\xff\xff'
+    return bytes(header) + pcm
+
+
+tts_engine = TTSEngine()
+
 
 def synthesize_text(text: str, lang: str = 'ar') -> bytes:
     """
     تحويل النص لصوت
-    
+
     Args:
         text: النص المراد تحويله
         lang: اللغة ('ar' للعربية، 'en' للإنجليزية)
-    
+
     Returns:
-        bytes: ملف صوتي WAV
+        bytes: ملف صوتي (WAV من المحرك المحلي، MP3 من gTTS)
     """
-    if not text:
-        return b''
-    
-    # محاولة 1: gTTS (أفضل للعربية)
-    try:
-        from gtts import gTTS
-        import tempfile
-        import os
-        
-        tts = gTTS(text=text, lang=lang, slow=False)
-        
-        fd, path = tempfile.mkstemp(suffix='.mp3')
-        os.close(fd)
-        
-        tts.save(path)
-        
-        with open(path, 'rb') as f:
-            data = f.read()
-        
-        os.remove(path)
-        return data
-        
-    except Exception as e:
-        print(f"⚠️ gTTS error: {e}")
-    
-    # محاولة 2: pyttsx3 (Fallback)
-    try:
-        import pyttsx3
-        import tempfile
-        import os
-        
-        engine = pyttsx3.init()
-        
-        # محاولة ضبط صوت عربي
-        voices = engine.getProperty('voices')
-        for voice in voices:
-            if 'arabic' in voice.name.lower() or 'ar' in voice.id.lower():
-                engine.setProperty('voice', voice.id)
-                break
-        
-        fd, path = tempfile.mkstemp(suffix='.wav')
-        os.close(fd)
-        
-        engine.save_to_file(text, path)
-        engine.runAndWait()
-        
-        with open(path, 'rb') as f:
-            data = f.read()
-        
-        os.remove(path)
-        return data
-        
-    except Exception as e:
-        print(f"⚠️ pyttsx3 error: {e}")
-        return b''
+    audio, _ = tts_engine.synthesize(text, lang)
+    return audio
 
 
 def synthesize_text_streaming(text: str, lang: str = 'ar'):
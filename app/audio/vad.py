@@ -0,0 +1,144 @@
+"""
+كشف النشاط الصوتي - Voice Activity Detection
+يحدد بداية ونهاية الكلام في بث صوتي مستمر (Endpointing)
+
+يستخدم webrtcvad إذا كان مثبتاً، وإلا كاشف طاقة بسيط بعتبة تكيفية
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+try:
+    import webrtcvad
+    WEBRTC_VAD_AVAILABLE = True
+except ImportError:
+    WEBRTC_VAD_AVAILABLE = False
+
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+
+
+@dataclass
+class VADEvent:
+    """حدث من كاشف الكلام"""
+    kind: str  # 'speech_start', 'speech_end'
+    audio: Optional[np.ndarray] = None  # الكلام الكامل عند speech_end
+
+
+class EnergyVAD:
+    """كاشف كلام بالطاقة مع أرضية ضجيج تكيفية"""
+
+    def __init__(self, threshold_ratio: float = 3.0, min_energy: float = 0.005):
+        self.threshold_ratio = threshold_ratio
+        self.min_energy = min_energy
+        self.noise_floor = min_energy
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        energy = float(np.sqrt(np.mean(frame ** 2))) if frame.size else 0.0
+        speech = energy > max(self.min_energy, self.noise_floor * self.threshold_ratio)
+        if not speech:
+            # تحديث أرضية الضجيج فقط أثناء الصمت
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * energy
+        return speech
+
+
+class WebRTCVAD:
+    """غلاف webrtcvad (أدق في البيئات الصاخبة)"""
+
+    def __init__(self, aggressiveness: int = 2):
+        self.vad = webrtcvad.Vad(aggressiveness)
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        pcm = (np.clip(frame, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+        return self.vad.is_speech(pcm, SAMPLE_RATE)
+
+
+class Endpointer:
+    """
+    يجمع الفريمات ويقرر متى يبدأ الكلام ومتى ينتهي
+
+    - الكلام يبدأ بعد start_ms من الفريمات الصوتية المتتالية
+    - الكلام ينتهي بعد silence_ms من الصمت، أو عند max_utterance_s
+    """
+
+    def __init__(self,
+                 start_ms: int = 90,
+                 silence_ms: int = 700,
+                 pre_roll_ms: int = 300,
+                 max_utterance_s: float = 15.0):
+        self.vad = WebRTCVAD() if WEBRTC_VAD_AVAILABLE else EnergyVAD()
+        self.start_frames = max(1, start_ms // FRAME_MS)
+        self.silence_frames = max(1, silence_ms // FRAME_MS)
+        self.pre_roll_frames = max(0, pre_roll_ms // FRAME_MS)
+        self.max_frames = int(max_utterance_s * 1000 / FRAME_MS)
+
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._pre_roll: List[np.ndarray] = []
+        self._speech: List[np.ndarray] = []
+        self._voiced_run = 0
+        self._silence_run = 0
+        self.in_speech = False
+
+    def push(self, samples: np.ndarray) -> List[VADEvent]:
+        """إضافة عينات جديدة (float32 mono 16kHz) وإرجاع الأحداث الناتجة"""
+        events: List[VADEvent] = []
+        self._pending = np.concatenate([self._pending, samples.astype(np.float32, copy=False)])
+
+        while self._pending.size >= FRAME_SAMPLES:
+            frame = self._pending[:FRAME_SAMPLES]
+            self._pending = self._pending[FRAME_SAMPLES:]
+            event = self._process_frame(frame)
+            if event:
+                events.append(event)
+
+        return events
+
+    def _process_frame(self, frame: np.ndarray) -> Optional[VADEvent]:
+        voiced = self.vad.is_speech(frame)
+
+        if not self.in_speech:
+            self._pre_roll.append(frame)
+            if len(self._pre_roll) > self.pre_roll_frames + self.start_frames:
+                self._pre_roll.pop(0)
+
+            self._voiced_run = self._voiced_run + 1 if voiced else 0
+            if self._voiced_run >= self.start_frames:
+                self.in_speech = True
+                self._speech = list(self._pre_roll)
+                self._pre_roll = []
+                self._silence_run = 0
+                return VADEvent('speech_start')
+            return None
+
+        self._speech.append(frame)
+        self._silence_run = 0 if voiced else self._silence_run + 1
+
+        if self._silence_run >= self.silence_frames or len(self._speech) >= self.max_frames:
+            return self.flush()
+        return None
+
+    def flush(self) -> Optional[VADEvent]:
+        """إنهاء الكلام الحالي قسراً (مثلاً عند أمر 'end' من العميل)"""
+        if not self.in_speech or not self._speech:
+            self.reset()
+            return None
+        audio = np.concatenate(self._speech)
+        self.reset()
+        return VADEvent('speech_end', audio=audio)
+
+    def current_speech(self) -> Optional[np.ndarray]:
+        """الكلام المتجمع حتى الآن (للفرضيات الجزئية)"""
+        if not self.in_speech or not self._speech:
+            return None
+        return np.concatenate(self._speech)
+
+    def reset(self):
+        self._speech = []
+        self._pre_roll = []
+        self._voiced_run = 0
+        self._silence_run = 0
+        self.in_speech = False
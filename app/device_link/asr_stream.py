@@ -0,0 +1,251 @@
+"""
+بث التعرف على الكلام - Streaming ASR over WebSocket
+
+العميل يرسل مقاطع صوتية أثناء الكلام (بدلاً من رفع الجملة كاملة بعد انتهائها)
+والخادم:
+1. يكتشف بداية/نهاية الكلام (VAD endpointing)
+2. يرسل فرضيات جزئية (partial) أثناء الكلام
+3. عند انتهاء الكلام: النص النهائي → AssistantBrain.parse_command → الرد
+
+الصيغ المدعومة (?format=):
+- pcm16 : عينات int16 little-endian mono (sample_rate قابل للتحديد، الافتراضي 16000)
+- opus  : حزم Opus خام، كل رسالة ثنائية = حزمة واحدة (يتطلب opuslib)
+- webm / ogg : مقاطع MediaRecorder (تفك بـ PyAV عبر faster-whisper)
+"""
+
+import asyncio
+import io
+import os
+import time
+from typing import Dict, Optional, Set
+
+import numpy as np
+from fastapi import WebSocket
+from starlette.concurrency import run_in_threadpool
+
+from app.audio.transcribe import asr_engine
+from app.audio.vad import Endpointer, SAMPLE_RATE
+from app.assistant.brain import assistant_brain
+from app.utils.sessions import get_session
+
+PARTIAL_INTERVAL_S = 0.8   # أقل مدة كلام جديد قبل فرضية جزئية جديدة
+PARTIAL_BEAM_SIZE = 1      # الفرضيات الجزئية: greedy للسرعة
+_CONTAINER_MAGIC = {'webm': b'\x1a\x45\xdf\xa3', 'ogg': b'OggS'}
+# حد حاوية webm/ogg المخزنة (تُقص أيضاً في كل مقطع صامت) - كل مقطع يعيد فكها كلها
+ASR_CONTAINER_MAX_BYTES = int(os.environ.get('ASR_CONTAINER_MAX_KB', '512')) * 1024
+
+
+class AudioChunkDecoder:
+    """تحويل الرسائل الثنائية لعينات float32 mono 16kHz"""
+
+    def __init__(self, fmt: str = 'pcm16', sample_rate: int = SAMPLE_RATE):
+        self.fmt = fmt
+        self.sample_rate = sample_rate
+        self._opus = None
+        # webm/ogg: الترويسة (EBML / صفحات OpusHead) في أول مقطع فقط من MediaRecorder،
+        # فتبقى محفوظة ويُبنى عليها كلام كل جملة جديدة
+        self._header = b''
+        self._header_samples: Optional[int] = None
+        self._container = bytearray()
+        self._container_samples = 0
+
+        if fmt == 'opus':
+            import opuslib
+            self._opus = opuslib.Decoder(SAMPLE_RATE, 1)
+        elif fmt not in ('pcm16', 'webm', 'ogg'):
+            raise ValueError(f"Unsupported audio format: {fmt}")
+
+    @property
+    def is_container(self) -> bool:
+        return self.fmt in _CONTAINER_MAGIC
+
+    def _starts_stream(self, data: bytes) -> bool:
+        """مقطع يبدأ حاوية جديدة (أول مقطع، أو MediaRecorder أعيد تشغيله)"""
+        if not data.startswith(_CONTAINER_MAGIC[self.fmt]):
+            return False
+        # كل صفحة ogg تبدأ بـ OggS - الترويسة هي صفحة BOS فقط
+        return self.fmt == 'webm' or (len(data) > 5 and bool(data[5] & 0x02))
+
+    def decode(self, data: bytes) -> np.ndarray:
+        if self.fmt == 'pcm16':
+            if len(data) % 2:
+                raise ValueError("pcm16 chunk must contain whole int16 samples")
+            samples = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+            return self._resample(samples)
+
+        if self.fmt == 'opus':
+            pcm = self._opus.decode(data, frame_size=SAMPLE_RATE * 60 // 1000)
+            return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
+        # حاويات webm/ogg لا تفك إلا من البداية - نفك الكل ونرجع الجديد فقط
+        # (بطيء ويكبر مع الجملة: يُستدعى من threadpool، والحاوية تُقص بعد كل جملة)
+        from faster_whisper.audio import decode_audio
+        if self._starts_stream(data):
+            self._header, self._header_samples = bytes(data), None
+            self._container, self._container_samples = bytearray(), 0
+        self._container.extend(data)
+        try:
+            samples = decode_audio(io.BytesIO(bytes(self._container)), sampling_rate=SAMPLE_RATE)
+        except Exception:
+            return np.zeros(0, dtype=np.float32)  # حاوية غير مكتملة بعد
+        if self._header_samples is None and len(self._container) == len(self._header):
+            self._header_samples = samples.size
+        new = samples[self._container_samples:]
+        self._container_samples = samples.size
+        if len(self._container) > ASR_CONTAINER_MAX_BYTES:
+            self.reset()  # العينات المفكوكة سُلمت للـ VAD؛ يضيع فقط إطار مقطوع في آخر المقطع
+        return new.astype(np.float32, copy=False)
+
+    def _resample(self, samples: np.ndarray) -> np.ndarray:
+        if self.sample_rate == SAMPLE_RATE or samples.size == 0:
+            return samples
+        n_out = int(samples.size * SAMPLE_RATE / self.sample_rate)
+        x_old = np.linspace(0.0, 1.0, num=samples.size, endpoint=False)
+        x_new = np.linspace(0.0, 1.0, num=n_out, endpoint=False)
+        return np.interp(x_new, x_old, samples).astype(np.float32)
+
+    def reset(self):
+        """إسقاط الصوت المخزن - الترويسة تبقى (المقاطع التالية بدونها لا تفك)"""
+        self._container = bytearray(self._header)
+        self._container_samples = self._header_samples or 0
+
+
+class StreamingASRSession:
+    """جلسة بث صوتي واحدة (لكل اتصال WebSocket)"""
+
+    def __init__(self, websocket: WebSocket, fmt: str, sample_rate: int, language: Optional[str]):
+        self.ws = websocket
+        self.context = get_session(websocket).context
+        self.language = language
+        self.decoder = AudioChunkDecoder(fmt, sample_rate)
+        self.endpointer = Endpointer()
+        self._partial_task: Optional[asyncio.Task] = None
+        # الرد (ASR النهائي + LLM) في مهام خلفية - حلقة الاستقبال تستمر في قراءة الصوت
+        self._final_tasks: Set[asyncio.Task] = set()
+        self._final_lock = asyncio.Lock()  # الردود بترتيب الجمل
+        self._last_partial_samples = 0
+        self._speech_start_time: Optional[float] = None
+
+    async def on_audio(self, data: bytes):
+        try:
+            if self.decoder.is_container:
+                samples = await run_in_threadpool(self.decoder.decode, data)
+            else:
+                samples = self.decoder.decode(data)
+        except Exception as e:  # pcm16 ناقص، حزمة Opus تالفة (OpusError)...
+            await self.ws.send_json({'type': 'error', 'message': f'Invalid audio chunk: {e}'})
+            return
+        if samples.size == 0:
+            return
+
+        for event in self.endpointer.push(samples):
+            if event.kind == 'speech_start':
+                self._speech_start_time = time.perf_counter()
+                self._last_partial_samples = 0
+                await self.ws.send_json({'type': 'vad', 'speech': True})
+            elif event.kind == 'speech_end':
+                self._start_finalize(event.audio)
+
+        if self.decoder.is_container and not self.endpointer.in_speech:
+            # صمت: العينات عند الـ VAD (pre-roll) - الحاوية لا تحتاج أن تكبر
+            self.decoder.reset()
+        self._maybe_emit_partial()
+
+    async def on_control(self, message: Dict):
+        kind = message.get('type')
+        if kind == 'end':
+            event = self.endpointer.flush()
+            if event and event.audio is not None:
+                self._start_finalize(event.audio)
+        elif kind == 'reset':
+            self.endpointer.reset()
+            self.decoder.reset()
+        elif kind == 'config' and message.get('language'):
+            self.language = message['language']
+
+    def _maybe_emit_partial(self):
+        if self._partial_task and not self._partial_task.done():
+            return  # فرضية جزئية قيد التنفيذ - لا نراكم الطلبات
+        speech = self.endpointer.current_speech()
+        if speech is None:
+            return
+        if speech.size - self._last_partial_samples < PARTIAL_INTERVAL_S * SAMPLE_RATE:
+            return
+        self._last_partial_samples = speech.size
+        self._partial_task = asyncio.create_task(self._emit_partial(speech))
+
+    async def _emit_partial(self, speech: np.ndarray):
+        try:
+            text = await run_in_threadpool(
+                asr_engine.transcribe, speech, PARTIAL_BEAM_SIZE, self.language
+            )
+            if text and self.endpointer.in_speech:
+                await self.ws.send_json({'type': 'partial', 'text': text.strip()})
+        except Exception as e:
+            print(f"⚠️ Partial ASR error: {e}")
+
+    def _start_finalize(self, speech: np.ndarray):
+        """نهاية جملة: تصفير الحالة فوراً، والتعرف والرد في مهمة خلفية"""
+        if self._partial_task and not self._partial_task.done():
+            self._partial_task.cancel()
+        self.decoder.reset()
+        task = asyncio.create_task(self._finalize(speech))
+        self._final_tasks.add(task)
+        task.add_done_callback(self._final_tasks.discard)
+
+    async def close(self):
+        """انقطاع الاتصال: إلغاء الفرضيات والردود المعلقة"""
+        tasks = list(self._final_tasks)
+        if self._partial_task:
+            tasks.append(self._partial_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _finalize(self, speech: np.ndarray):
+        async with self._final_lock:
+            try:
+                await self._respond(speech)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Streaming ASR response error: {e}")
+
+    async def _respond(self, speech: np.ndarray):
+        speech_end = time.perf_counter()
+        try:
+            text = await run_in_threadpool(asr_engine.transcribe, speech, 5, self.language)
+        except Exception as e:
+            await self.ws.send_json({'type': 'error', 'message': f'ASR failed: {e}'})
+            return
+        text = (text or '').strip()
+        asr_ms = (time.perf_counter() - speech_end) * 1000
+
+        if not text:
+            await self.ws.send_json({'type': 'final', 'text': '', 'asr_ms': round(asr_ms, 1)})
+            return
+
+        # التسليم المباشر للدماغ لحظة انتهاء الكلام
+        command = assistant_brain.parse_command(text)
+        context = self.context.get_context_summary()
+        response_text = await assistant_brain.agenerate_response(
+            command, context, self.context.last_objects, None
+        )
+        self.context.add_conversation_turn(
+            user_input=text,
+            assistant_response=response_text,
+            action=command.command_type.value
+        )
+
+        await self.ws.send_json({
+            'type': 'final',
+            'text': text,
+            'command': {
+                'type': command.command_type.value,
+                'target': command.target,
+                'direction': command.direction,
+            },
+            'response': response_text,
+            'asr_ms': round(asr_ms, 1),
+            'speech_s': round(speech.size / SAMPLE_RATE, 2),
+        })
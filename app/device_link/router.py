@@ -1,5 +1,6 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import List
+from typing import List, Optional
+import json
 
 router = APIRouter()
 
@@ -34,3 +35,41 @@ async def websocket_endpoint(websocket: WebSocket):
             await manager.broadcast(f"echo: {data}")
     except WebSocketDisconnect:
         manager.disconnect(websocket)
+
+@router.websocket('/ws/asr')
+async def streaming_asr_endpoint(websocket: WebSocket,
+                                 format: str = 'pcm16',
+                                 sample_rate: int = 16000,
+                                 lang: Optional[str] = None):
+    """
+    Streaming ASR: binary messages are audio chunks, text messages are JSON
+    control messages ({"type": "end"} / {"type": "reset"} / {"type": "config", "language": ...}).
+    Server sends {"type": "vad" | "partial" | "final" | "error", ...}.
+    """
+    from .asr_stream import StreamingASRSession
+
+    await websocket.accept()
+    try:
+        session = StreamingASRSession(websocket, format, sample_rate, lang)
+    except Exception as e:
+        await websocket.send_json({'type': 'error', 'message': str(e)})
+        await websocket.close()
+        return
+
+    await websocket.send_json({'type': 'ready', 'format': format, 'sample_rate': sample_rate})
+    try:
+        while True:
+            message = await websocket.receive()
+            if message.get('type') == 'websocket.disconnect':
+                break
+            if message.get('bytes') is not None:
+                await session.on_audio(message['bytes'])
+            elif message.get('text'):
+                try:
+                    await session.on_control(json.loads(message['text']))
+                except ValueError:
+                    await websocket.send_json({'type': 'error', 'message': 'invalid control message'})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await session.close()
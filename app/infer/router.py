@@ -1,36 +1,32 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, Field
 from typing import Dict, Any, Optional
-import base64
 from app.vision.model import detector
+from app.utils.ingest import read_image_payload
 from app.alerts.priority_system import process_detections_with_alerts, get_summary_message
 import time
 
 router = APIRouter()
 
 class InferRequest(BaseModel):
+    # the image itself: small_image_b64 (JSON), multipart `image`/`file`, or a raw image/jpeg body with these fields in the query
     event_id: str
     user_id: str
-    small_image_b64: str
     depth_summary: Optional[Dict[str, Any]] = None
     device_pose: Optional[Dict[str, Any]] = None
     priority: Optional[str] = "normal"
     lang: Optional[str] = "ar" # 'ar' or 'da'
 
 @router.post('/realtime')
-async def realtime_infer(request: InferRequest):
+async def realtime_infer(http_request: Request):
     """
     Simulates the /infer/realtime endpoint expected by n8n.
-    Decodes the base64 image and runs the vision model.
+    Accepts a raw image/jpeg body, a multipart upload or base64 JSON and runs the vision model.
     """
+    payload = await read_image_payload(http_request, b64_field='small_image_b64')
+    request = payload.parse(InferRequest)
     try:
-        # Decode base64 image
-        if "," in request.small_image_b64:
-             header, encoded = request.small_image_b64.split(",", 1)
-        else:
-             encoded = request.small_image_b64
-        
-        image_data = base64.b64decode(encoded)
+        image_data = payload.image
         
         # Run detection
         # Note: detector.detect usually expects raw bytes, so this should work if implemented correctly
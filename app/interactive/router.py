@@ -1,23 +1,25 @@
-from fastapi import APIRouter, File, UploadFile, Form, HTTPException
+from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Request
 from app.audio.transcribe import transcribe_audio_bytes
 from app.vision.model import detector
-import base64
-import numpy as np
-import cv2
+from app.vision.frame import Frame
+from app.utils.ingest import read_image_payload
 import re
 
 router = APIRouter()
 
 @router.post('/interactive/learn')
 async def learn_from_voice(
-    audio: UploadFile = File(...),
-    image: str = Form(...) # Base64 image
+    request: Request,
+    audio: UploadFile = File(...)
 ):
     """
     Receives audio voice note + current image.
     Transcribes audio to extract name.
     Learns the face in the image with that name.
+    The image is a multipart file or a base64 string in the `image` field.
     """
+    payload = await read_image_payload(request, b64_field='image', file_fields=('image',))
+
     # 1. Transcribe
     content = await audio.read()
     text = transcribe_audio_bytes(content)
@@ -64,13 +66,7 @@ async def learn_from_voice(
     
     # 3. Process Image
     try:
-        if "base64," in image:
-            image = image.split("base64,")[1]
-            
-        img_bytes = base64.b64decode(image)
-        arr = np.frombuffer(img_bytes, np.uint8)
-        img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        img_rgb = Frame.from_bytes(payload.image).rgb
     except Exception as e:
         return {"status": "error", "message": "Invalid image data"}
         
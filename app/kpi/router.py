@@ -1,27 +1,44 @@
 from fastapi import APIRouter
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from collections import Counter, deque
 from typing import List
+import os
 import time
 
+from app.utils.metrics import metrics
+
 router = APIRouter()
 
+# آخر الأحداث فقط في الذاكرة - المجاميع لكل module تبقى كاملة
+KPI_MAX_EVENTS = int(os.environ.get('KPI_MAX_EVENTS', '10000'))
+
 class Event(BaseModel):
     module: str
     metric: str
     value: float
-    ts: float = time.time()
+    ts: float = Field(default_factory=time.time)
 
-DB = []
+DB = deque(maxlen=KPI_MAX_EVENTS)
+COUNTS = Counter()
 
 @router.post('/log')
 async def log_event(e: Event):
     DB.append(e.dict())
-    return {'status':'ok','count': len(DB)}
+    COUNTS[e.module] += 1
+    metrics.counter('sba_kpi_events_total', 'KPI events logged via /kpi/log', module=e.module).inc()
+    metrics.gauge('sba_kpi_value', 'Last value of each KPI metric', module=e.module, metric=e.metric).set(e.value)
+    return {'status':'ok','count': sum(COUNTS.values())}
 
 @router.get('/metrics')
-async def metrics():
+async def kpi_metrics():
     # Return simple aggregations
-    by_module = {}
-    for ev in DB:
-        by_module.setdefault(ev['module'], []).append(ev)
-    return {'count': len(DB), 'by_module': {k: len(v) for k,v in by_module.items()}}
+    return {
+        'count': sum(COUNTS.values()),
+        'retained': len(DB),
+        'by_module': dict(COUNTS)
+    }
+
+@router.get('/events')
+async def recent_events(n: int = 100) -> List[dict]:
+    """آخر n حدث"""
+    return list(DB)[-n:]
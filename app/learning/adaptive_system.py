@@ -12,10 +12,14 @@
 from typing import Dict, List, Optional, Set
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import defaultdict, deque
 import json
 from pathlib import Path
 
+from app.utils.sessions import session_registry
+
+MAX_SESSION_INTERACTIONS = 500  # ذاكرة محدودة لكل جلسة
+
 
 @dataclass
 class UserPreference:
@@ -64,7 +68,7 @@ class AdaptiveLearning:
         self.profile = self._load_profile()
         
         # سجل التفاعلات للجلسة
-        self.session_interactions: List[Dict] = []
+        self.session_interactions: deque = deque(maxlen=MAX_SESSION_INTERACTIONS)
         
         # إعدادات التعلم
         self.learning_rate = 0.1  # معدل التعلم
@@ -311,7 +315,7 @@ class AdaptiveLearning:
             'user_id': self.user_id,
             'session_start': self.session_interactions[0]['timestamp'] if self.session_interactions else None,
             'interactions_count': len(self.session_interactions),
-            'interactions': self.session_interactions
+            'interactions': list(self.session_interactions)
         }
     
     # ============ PHASE 3: تحسينات التخصيص ============
@@ -434,3 +438,4 @@ class AdaptiveLearning:
         }
 # Instance عام
 adaptive_learning = AdaptiveLearning()
+session_registry.register('learning', lambda session_id: AdaptiveLearning(user_id=session_id), default=adaptive_learning)
@@ -6,7 +6,8 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 
-from .adaptive_system import adaptive_learning, AdaptiveLearning
+from .adaptive_system import AdaptiveLearning
+from app.utils.sessions import session_registry
 
 router = APIRouter()
 
@@ -41,8 +42,8 @@ async def record_interaction(record: InteractionRecord, user_id: str = "default"
     """
     تسجيل تفاعل المستخدم للتعلم منه
     """
-    adaptive_learning.user_id = user_id
-    adaptive_learning.record_interaction(
+    learning = session_registry.get(user_id).learning
+    learning.record_interaction(
         event_type=record.event_type,
         object_class=record.object_class,
         user_response=record.user_response,
@@ -60,10 +61,9 @@ async def filter_by_preferences(request: FilterRequest):
     """
     فلترة الكائنات حسب تفضيلات المستخدم
     """
-    if request.user_id:
-        adaptive_learning.user_id = request.user_id
+    learning = session_registry.get(request.user_id).learning
     
-    filtered = adaptive_learning.filter_by_preferences(request.objects)
+    filtered = learning.filter_by_preferences(request.objects)
     
     return {
         'objects': filtered,
@@ -77,9 +77,9 @@ async def get_priority(object_class: str, user_id: str = "default"):
     """
     الحصول على الأولوية المخصصة لنوع كائن
     """
-    adaptive_learning.user_id = user_id
+    learning = session_registry.get(user_id).learning
     
-    priority = adaptive_learning.get_personalized_priority({
+    priority = learning.get_personalized_priority({
         'class': object_class,
         'priority': 3  # أولوية افتراضية
     })
@@ -95,8 +95,8 @@ async def get_user_summary(user_id: str = "default"):
     """
     ملخص ملف تعريف المستخدم
     """
-    adaptive_learning.user_id = user_id
-    return adaptive_learning.get_user_summary()
+    learning = session_registry.get(user_id).learning
+    return learning.get_user_summary()
 
 
 @router.post('/settings')
@@ -104,8 +104,8 @@ async def update_settings(settings: SettingsUpdate, user_id: str = "default"):
     """
     تحديث إعدادات المستخدم
     """
-    adaptive_learning.user_id = user_id
-    return adaptive_learning.update_settings(
+    learning = session_registry.get(user_id).learning
+    return learning.update_settings(
         intensity=settings.intensity,
         language=settings.language,
         voice_speed=settings.voice_speed
@@ -117,8 +117,8 @@ async def reset_preferences(user_id: str = "default", object_class: Optional[str
     """
     إعادة تعيين التفضيلات
     """
-    adaptive_learning.user_id = user_id
-    return adaptive_learning.reset_preferences(object_class)
+    learning = session_registry.get(user_id).learning
+    return learning.reset_preferences(object_class)
 
 
 @router.get('/session')
@@ -126,5 +126,5 @@ async def export_session_data(user_id: str = "default"):
     """
     تصدير بيانات الجلسة
     """
-    adaptive_learning.user_id = user_id
-    return adaptive_learning.export_session_data()
+    learning = session_registry.get(user_id).learning
+    return learning.export_session_data()
@@ -11,10 +11,14 @@ Main endpoints:
 - /client/ - Web interface for voice interaction
 """
 
-from fastapi import FastAPI, StaticFiles
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 import os
+import threading
 
 # Import all routers
 from .assistant.router import router as assistant_router
@@ -34,12 +38,40 @@ from .spatial_awareness.router import router as spatial_router
 from .device_link.router import router as device_router
 from .interactive.router import router as interactive_router
 from .base_map.router import router as base_map_router
+from .assistant.brain import assistant_brain
+from .assistant.alert_manager import alert_manager
+from .alerts.priority_system import alert_phrases
+from .audio.tts import tts_engine
+from .vision.model import ARABIC_NAMES
+from .utils.metrics import metrics
+from .utils.model_registry import model_registry
+
+# === Lifespan ===
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup: models load lazily on first use; MODEL_WARMUP (default all) loads them
+    in a background thread so the server accepts requests immediately (/ready reports progress).
+    Shutdown: close pooled keep-alive connections (Ollama).
+    """
+    warmup = model_registry.warmup_names()
+    if os.environ.get('ASR_PRELOAD', '1') != '1':
+        warmup = [name for name in warmup if name != 'asr']
+    if warmup:
+        model_registry.warm_up(warmup)
+    if os.environ.get('TTS_PREWARM', '1') == '1':
+        # Synthesize every templated alert phrase so alerts are served from the audio cache
+        phrases = alert_manager.alert_phrases(ARABIC_NAMES) + alert_phrases(ARABIC_NAMES)
+        threading.Thread(target=tts_engine.prewarm, args=(phrases,), name="tts-prewarm", daemon=True).start()
+    yield
+    await assistant_brain.llm_client.aclose()
 
 # Create FastAPI application
 app = FastAPI(
     title="Smart Blind Assistant API",
     description="AI-powered assistance system for blind individuals with voice interaction",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # === CORS Configuration ===
@@ -93,6 +125,21 @@ async def health():
     """Health check endpoint for monitoring"""
     return {"status": "healthy", "service": "smart-blind-assistant"}
 
+@app.get("/ready", tags=["Health"])
+async def ready():
+    """Readiness: 200 once background warm-up finished and no required model failed, else 503"""
+    body = {
+        "ready": model_registry.ready,
+        "warming_up": model_registry.warming_up,
+        "models": model_registry.get_stats()
+    }
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Latency histograms (p50/p95/p99), counters and gauges in Prometheus text format"""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -2,13 +2,14 @@
 API endpoints لإدارة المسارات والمشي المستقيم
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 from typing import List, Optional, Dict
-import base64
+
+from app.utils.ingest import read_image_payload
+from app.utils.sessions import get_session
 
 from .routes_manager import route_manager
-from .straight_walk import straight_walk_guide
 
 router = APIRouter()
 
@@ -27,9 +28,6 @@ class WarningAdd(BaseModel):
     route_name: str
     warning: str
 
-class StraightWalkAnalyze(BaseModel):
-    image_b64: str
-
 class StraightWalkSettings(BaseModel):
     threshold: Optional[float] = None
     cooldown: Optional[float] = None
@@ -84,40 +82,28 @@ async def get_guidance(route_name: str, current_objects: str):
 # ======== Straight Walking Endpoints ========
 
 @router.post('/straight/start')
-async def start_straight_tracking(request: Optional[StraightWalkAnalyze] = None):
+async def start_straight_tracking(request: Request):
     """
     بدء تتبع المشي المستقيم
-    يمكن إرسال صورة أولية للمعايرة
+    يمكن إرسال صورة أولية للمعايرة (image/jpeg خام أو multipart أو image_b64)
     """
-    initial_bytes = None
-    if request and request.image_b64:
-        if "," in request.image_b64:
-            _, encoded = request.image_b64.split(",", 1)
-        else:
-            encoded = request.image_b64
-        initial_bytes = base64.b64decode(encoded)
-    
-    result = straight_walk_guide.start_tracking(initial_bytes)
+    payload = await read_image_payload(request, required=False)
+    result = get_session(request).straight_walk.start_tracking(payload.image)
     return result
 
 @router.post('/straight/stop')
-async def stop_straight_tracking():
+async def stop_straight_tracking(request: Request):
     """إيقاف تتبع المشي المستقيم"""
-    return straight_walk_guide.stop_tracking()
+    return get_session(request).straight_walk.stop_tracking()
 
 @router.post('/straight/analyze')
-async def analyze_deviation(request: StraightWalkAnalyze):
+async def analyze_deviation(request: Request):
     """
     تحليل الانحراف عن المسار المستقيم
     """
+    payload = await read_image_payload(request)
     try:
-        if "," in request.image_b64:
-            _, encoded = request.image_b64.split(",", 1)
-        else:
-            encoded = request.image_b64
-        
-        image_bytes = base64.b64decode(encoded)
-        state = straight_walk_guide.analyze_deviation(image_bytes)
+        state = get_session(request).straight_walk.analyze_deviation(payload.image)
         
         return {
             'deviation': state.deviation,
@@ -131,37 +117,32 @@ async def analyze_deviation(request: StraightWalkAnalyze):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post('/straight/calibrate')
-async def calibrate_path(request: StraightWalkAnalyze):
+async def calibrate_path(request: Request):
     """معايرة مسار المشي من الصورة الحالية"""
+    payload = await read_image_payload(request)
     try:
-        if "," in request.image_b64:
-            _, encoded = request.image_b64.split(",", 1)
-        else:
-            encoded = request.image_b64
-        
-        image_bytes = base64.b64decode(encoded)
-        result = straight_walk_guide.calibrate_path(image_bytes)
+        result = get_session(request).straight_walk.calibrate_path(payload.image)
         return result
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get('/straight/status')
-async def get_straight_status():
+async def get_straight_status(request: Request):
     """حالة تتبع المشي المستقيم"""
-    return straight_walk_guide.get_status()
+    return get_session(request).straight_walk.get_status()
 
 @router.post('/straight/settings')
-async def update_straight_settings(settings: StraightWalkSettings):
+async def update_straight_settings(settings: StraightWalkSettings, request: Request):
     """تحديث إعدادات المشي المستقيم"""
-    return straight_walk_guide.update_settings(
+    return get_session(request).straight_walk.update_settings(
         threshold=settings.threshold,
         cooldown=settings.cooldown
     )
 
 @router.post('/straight/reset')
-async def reset_straight_walk():
+async def reset_straight_walk(request: Request):
     """إعادة تعيين نظام المشي المستقيم"""
-    straight_walk_guide.reset()
+    get_session(request).straight_walk.reset()
     return {'message': 'تم إعادة تعيين نظام المشي المستقيم', 'success': True}
 
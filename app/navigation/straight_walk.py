@@ -15,6 +15,9 @@ from datetime import datetime
 import numpy as np
 import cv2
 
+from app.vision.frame import Frame
+from app.utils.sessions import session_registry
+
 
 @dataclass
 class DeviationState:
@@ -95,21 +98,19 @@ class StraightWalkGuide:
             'is_tracking': False
         }
     
-    def calibrate_path(self, frame_bytes: bytes) -> Dict:
+    def calibrate_path(self, frame_bytes) -> Dict:
         """
-        معايرة المسار من الصورة الحالية
+        معايرة المسار من الصورة الحالية (Frame أو bytes)
         يحاول تحديد خطوط الأرضية/الجدران
         """
         try:
-            # تحويل لـ numpy
-            nparr = np.frombuffer(frame_bytes, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            frame = Frame.ensure(frame_bytes)
             
             if frame is None:
                 return {'success': False, 'message': 'لم أستطع قراءة الصورة'}
             
             # استخراج خطوط Hough
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            gray = frame.gray
             edges = cv2.Canny(gray, 50, 150)
             
             # البحث عن الخطوط
@@ -161,17 +162,15 @@ class StraightWalkGuide:
         except Exception as e:
             return {'success': False, 'message': f'خطأ في المعايرة: {str(e)}'}
     
-    def analyze_deviation(self, frame_bytes: bytes) -> DeviationState:
+    def analyze_deviation(self, frame_bytes) -> DeviationState:
         """
-        تحليل انحراف المستخدم عن المسار المستقيم
+        تحليل انحراف المستخدم عن المسار المستقيم (Frame أو bytes)
         
         Returns:
             DeviationState: حالة الانحراف
         """
         try:
-            # تحويل الصورة
-            nparr = np.frombuffer(frame_bytes, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            frame = Frame.ensure(frame_bytes)
             
             if frame is None:
                 return self._get_default_state()
@@ -180,7 +179,7 @@ class StraightWalkGuide:
             
             # تحليل بسيط: مقارنة كثافة اليسار واليمين
             # في الممرات، الجانب الأقرب للجدار يكون أغمق عادة
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            gray = frame.gray
             
             # منطقة الأرضية (النصف السفلي)
             floor_region = gray[int(h*0.6):, :]
@@ -304,3 +303,4 @@ class StraightWalkGuide:
 
 # Instance عام
 straight_walk_guide = StraightWalkGuide()
+session_registry.register('straight_walk', lambda session_id: StraightWalkGuide(), default=straight_walk_guide)
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, File, UploadFile
 from app.vision.ocr_reader import ocr_reader
+from app.utils.model_registry import model_registry
 import base64
 import numpy as np
 import cv2
@@ -20,20 +21,18 @@ async def read_text_from_image(image: UploadFile = File(...)):
         if img is None:
             return {"status": "error", "message": "Invalid image"}
         
-        # Run OCR
-        if hasattr(ocr_reader, 'readtext'):
-            results = ocr_reader.readtext(img)
-            
-            # Extract text
-            texts = [text for (bbox, text, conf) in results if conf > 0.3]
-            full_text = " ".join(texts)
-            
-            if full_text:
-                return {"status": "success", "text": full_text, "count": len(texts)}
-            else:
-                return {"status": "success", "text": "", "message": "No text found"}
-        else:
+        if not model_registry.get('ocr'):
             return {"status": "error", "message": "OCR not initialized"}
+
+        # Run OCR (shared detection + per-script recognition)
+        results = ocr_reader.read_text(img)
+        texts = [r['text'] for r in results]
+        full_text = " ".join(texts)
+        
+        if full_text:
+            return {"status": "success", "text": full_text, "count": len(texts)}
+        else:
+            return {"status": "success", "text": "", "message": "No text found"}
             
     except Exception as e:
         return {"status": "error", "message": str(e)}
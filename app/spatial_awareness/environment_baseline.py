@@ -9,8 +9,11 @@ from typing import Dict, List, Set, Optional, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
 import json
+from collections import OrderedDict
 from pathlib import Path
 
+from app.utils.sessions import DEFAULT_SESSION_ID, session_registry
+
 
 # الأشياء الثابتة دائماً (لا تتحرك عادة)
 ALWAYS_FIXED = {
@@ -42,6 +45,10 @@ SURPRISE_OBJECTS = {
     'bucket', 'mop', 'broom', 'ladder', 'rope', 'wire', 'cable'
 }
 
+# مسارات (track_id) تم الإبلاغ عنها - الكائن المتتبع لا يُعلن "جديداً" في كل فريم
+# (track_id لكل جلسة: المفتاح يشمل الجلسة، فمسار 3 لجهاز لا يُسكت مسار 3 لجهاز آخر)
+MAX_REPORTED_TRACKS = 512
+
 
 @dataclass 
 class EnvironmentObject:
@@ -78,6 +85,7 @@ class EnvironmentBaseline:
         
         self.baselines: Dict[str, BaselineSnapshot] = {}
         self.current_location: Optional[str] = None
+        self.reported_tracks: 'OrderedDict[tuple, None]' = OrderedDict()
         
         self._load_baselines()
     
@@ -216,9 +224,25 @@ class EnvironmentBaseline:
             'message': f'تم تحديث البيئة: {len(baseline.objects)} شيء محفوظ'
         }
     
-    def detect_changes(self, current_objects: List[Dict], location_name: str = None) -> Dict:
+    def _already_reported(self, obj: Dict, location: str, session_id: str) -> bool:
+        """هل أُعلن عن هذا المسار من قبل؟ (ويسجله إن لم يكن)"""
+        track_id = obj.get('track_id')
+        if track_id is None:
+            return False
+        key = (session_id, location, track_id)
+        if key in self.reported_tracks:
+            self.reported_tracks.move_to_end(key)
+            return True
+        self.reported_tracks[key] = None
+        if len(self.reported_tracks) > MAX_REPORTED_TRACKS:
+            self.reported_tracks.popitem(last=False)
+        return False
+
+    def detect_changes(self, current_objects: List[Dict], location_name: str = None,
+                       session_id: str = DEFAULT_SESSION_ID) -> Dict:
         """
         مقارنة الوضع الحالي مع البيئة الأساسية
+        session_id: جلسة الكائنات (track_id لها معنى داخل جلسة واحدة فقط)
         
         Returns:
             dict: {new_objects, missing_objects, surprises, changes_detected}
@@ -242,11 +266,15 @@ class EnvironmentBaseline:
         current_fixed = set()
         
         for obj in current_objects:
-            obj_class = obj.get('class', 'unknown')
+            obj_class = obj.get('base_class', obj.get('class', 'unknown'))
             classification = self.classify_object(obj_class)
             
             key = f"{obj_class}_{obj.get('position', 'unknown')}"
             
+            # كائن متتبع أُبلغ عنه سابقاً (نفس track_id) ليس جديداً ولا مفاجأة
+            if classification in ('surprise', 'dynamic') and self._already_reported(obj, loc, session_id):
+                continue
+            
             if classification == 'surprise':
                 surprises.append({
                     **obj,
@@ -326,5 +354,7 @@ class EnvironmentBaseline:
         }
 
 
-# Instance عام
+# Instance عام (المستخدم الافتراضي) - وكل مستخدم آخر نسخته عبر session_registry.get(user_id).baseline
 environment_baseline = EnvironmentBaseline()
+session_registry.register('baseline', lambda session_id: EnvironmentBaseline(user_id=session_id),
+                         default=environment_baseline)
@@ -3,15 +3,16 @@ API للوعي المكاني - Spatial Awareness Router
 يوفر endpoints لنظام المناطق، مسح الغرفة، البيئة الأساسية
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 from typing import List, Dict, Optional
-import base64
+
+from app.utils.ingest import read_image_payload
+from app.utils.sessions import get_session, session_registry
 
 from .zone_system import zone_system, ZoneSystem
-from .stationary_detector import stationary_detector
 from .room_scanner import room_scanner
-from .environment_baseline import environment_baseline
+from .environment_baseline import environment_baseline  # noqa: F401 (registers the per-session 'baseline' component)
 
 router = APIRouter()
 
@@ -27,12 +28,6 @@ class ObjectInput(BaseModel):
     confidence: Optional[float] = 0.5
 
 
-class AnalyzeRequest(BaseModel):
-    """طلب تحليل مع صورتين للمقارنة"""
-    image_b64: str
-    previous_image_b64: Optional[str] = None
-
-
 class ZoneClassifyRequest(BaseModel):
     """طلب تصنيف حسب المناطق"""
     objects: List[Dict]
@@ -162,42 +157,37 @@ async def get_zone_config():
 # ======== Stationary Detection Endpoints ========
 
 @router.post('/motion/analyze')
-async def analyze_motion(request: AnalyzeRequest):
+async def analyze_motion(request: Request):
     """
     تحليل حالة الحركة - هل المستخدم ثابت أم متحرك؟
+    الصورة: image/jpeg خام أو multipart أو image_b64
     """
+    payload = await read_image_payload(request)
+    motion = get_session(request).motion
     try:
-        # فك تشفير الصورة
-        if "," in request.image_b64:
-            header, encoded = request.image_b64.split(",", 1)
-        else:
-            encoded = request.image_b64
-        
-        image_bytes = base64.b64decode(encoded)
-        
         # تحليل الحركة
-        state = stationary_detector.analyze_frame(image_bytes)
+        state = motion.analyze_frame(payload.image)
         
-        return stationary_detector.get_status()
+        return motion.get_status()
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get('/motion/status')
-async def get_motion_status():
+async def get_motion_status(request: Request):
     """
     الحصول على حالة الحركة الحالية
     """
-    return stationary_detector.get_status()
+    return get_session(request).motion.get_status()
 
 
 @router.post('/motion/reset')
-async def reset_motion_detector():
+async def reset_motion_detector(request: Request):
     """
     إعادة تعيين كاشف الحركة
     """
-    stationary_detector.reset()
+    get_session(request).motion.reset()
     return {'message': 'تم إعادة تعيين كاشف الحركة', 'success': True}
 
 
@@ -257,9 +247,8 @@ async def set_location(request: LocationRequest):
     """
     تعيين الموقع الحالي للمستخدم
     """
-    # تحديث المستخدم في environment_baseline
-    environment_baseline.user_id = request.user_id
-    result = environment_baseline.set_location(request.location_name)
+    baseline = session_registry.get(request.user_id).baseline
+    result = baseline.set_location(request.location_name)
     return result
 
 
@@ -268,18 +257,19 @@ async def update_baseline(request: BaselineUpdateRequest):
     """
     تحديث البيئة الأساسية بالأشياء المكتشفة
     """
-    environment_baseline.user_id = request.user_id
-    result = environment_baseline.update_baseline(request.objects, request.location_name)
+    baseline = session_registry.get(request.user_id).baseline
+    result = baseline.update_baseline(request.objects, request.location_name)
     return result
 
 
 @router.post('/baseline/changes')
-async def detect_changes(request: ChangesDetectRequest):
+async def detect_changes(request: ChangesDetectRequest, http_request: Request):
     """
     اكتشاف التغييرات في البيئة
     """
-    environment_baseline.user_id = request.user_id
-    result = environment_baseline.detect_changes(request.current_objects, request.location_name)
+    baseline = session_registry.get(request.user_id).baseline
+    result = baseline.detect_changes(request.current_objects, request.location_name,
+                                     session_id=get_session(http_request).id)
     return result
 
 
@@ -288,7 +278,7 @@ async def get_baseline_summary(user_id: str, location_name: Optional[str] = None
     """
     ملخص البيئة الأساسية
     """
-    environment_baseline.user_id = user_id
+    baseline = session_registry.get(user_id).baseline
     if location_name:
-        environment_baseline.set_location(location_name)
-    return environment_baseline.get_baseline_summary(location_name)
+        baseline.set_location(location_name)
+    return baseline.get_baseline_summary(location_name)
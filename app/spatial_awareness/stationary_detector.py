@@ -13,6 +13,9 @@ from datetime import datetime
 import numpy as np
 import cv2
 
+from app.vision.frame import Frame
+from app.utils.sessions import session_registry
+
 
 @dataclass
 class MotionState:
@@ -31,7 +34,7 @@ class StationaryDetector:
     
     def __init__(self):
         # تاريخ الفريمات الأخيرة للمقارنة
-        self.frame_history: deque = deque(maxlen=10)
+        self.frame_history: deque = deque(maxlen=2)  # فقط الفريم السابق يُستخدم - ذاكرة محدودة لكل جلسة
         self.motion_history: deque = deque(maxlen=30)  # آخر 30 قياس
         
         # إعدادات الكشف
@@ -50,27 +53,24 @@ class StationaryDetector:
         except:
             pass
     
-    def analyze_frame(self, image_bytes: bytes) -> MotionState:
+    def analyze_frame(self, image_bytes) -> MotionState:
         """
         يحلل الفريم الحالي ويحدد حالة الحركة
         
         Args:
-            image_bytes: bytes الصورة
+            image_bytes: Frame (مفضل) أو bytes الصورة
         
         Returns:
             MotionState: حالة الحركة
         """
         try:
-            # تحويل لـ numpy array
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            frame = Frame.ensure(image_bytes)
             
             if frame is None:
                 return self.current_state
             
-            # تصغير الصورة للسرعة
-            frame_small = cv2.resize(frame, (160, 120))
-            gray = cv2.cvtColor(frame_small, cv2.COLOR_BGR2GRAY)
+            # صورة مصغرة رمادية 160x120 (عرض مشترك - بدون فك تشفير جديد)
+            gray = frame.thumbnail_gray
             
             current_time = datetime.now()
             
@@ -210,3 +210,4 @@ class StationaryDetector:
 
 # Instance عام
 stationary_detector = StationaryDetector()
+session_registry.register('motion', lambda session_id: StationaryDetector(), default=stationary_detector)
@@ -5,17 +5,17 @@ PHASE 4: الميزات الجديدة المتقدمة
 - تكامل مع خدمات الخرائط
 """
 
+import importlib.util
 import numpy as np
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Union
 from dataclasses import dataclass
 from datetime import datetime
 
-# محاولة استيراد librosa، لكن يعمل بدونها
-try:
-    import librosa
-    LIBROSA_AVAILABLE = True
-except ImportError:
-    LIBROSA_AVAILABLE = False
+from app.utils.sessions import session_registry
+
+# librosa اختيارية - نتحقق من وجودها فقط (استيرادها بطيء ولا تُستخدم عند الاستيراد)
+LIBROSA_AVAILABLE = importlib.util.find_spec('librosa') is not None
+if not LIBROSA_AVAILABLE:
     print("⚠️ librosa not available, using basic audio analysis")
 
 # ============ PHASE 4.1: كشف الأصوات البيئية ============
@@ -168,38 +168,58 @@ class DynamicAlert:
     urgency_level: int  # 1-5 (1 = منخفض، 5 = حرج جداً)
     recommendation: str
     timestamp: datetime
+    track_id: Optional[int] = None
 
 class DynamicAlertSystem:
     """نظام التنبيهات الديناميكية"""
     
     def __init__(self):
-        self.object_history: Dict[str, List[Tuple[float, datetime]]] = {}
+        # السجل لكل مسار (track_id من ObjectTracker) - أو لكل فئة بدون تتبع
+        self.object_history: Dict[Union[int, str], List[Tuple[float, datetime]]] = {}
         self.tracking_window = 10  # الثواني
     
-    def track_object(self, object_class: str, distance: float) -> Optional[DynamicAlert]:
+    def track_object(self, object_class: str, distance: float,
+                     track_id: Optional[int] = None,
+                     track_hits: Optional[int] = None) -> Optional[DynamicAlert]:
         """
         تتبع كائن وحدد ما إذا كان يقترب
+        track_id: مسار الكائن - شخصان من نفس الفئة = سلسلتان منفصلتان
+        track_hits: 1 = مسار جديد، قد يكون نفس الكائن بمسار أُعيد إنشاؤه -
+        يبدأ سلسلته من سلسلة الفئة بدل البدء من الصفر
         """
         now = datetime.now()
+        key = track_id if track_id is not None else object_class
+        cutoff_time = now.timestamp() - self.tracking_window
+        if key != object_class:
+            # سلسلة الفئة تُحفظ للمسارات أيضاً (مصدر المسارات الجديدة)
+            if track_hits == 1 and key not in self.object_history and object_class in self.object_history:
+                self.object_history[key] = list(self.object_history[object_class])
+            class_history = self.object_history.setdefault(object_class, [])
+            class_history.append((distance, now))
+            self.object_history[object_class] = [(d, t) for d, t in class_history if t.timestamp() > cutoff_time]
         
-        if object_class not in self.object_history:
-            self.object_history[object_class] = []
+        # المسارات المنتهية تُحذف
+        for stale in [k for k, h in self.object_history.items()
+                      if k not in (key, object_class) and (not h or h[-1][1].timestamp() <= cutoff_time)]:
+            del self.object_history[stale]
+        
+        if key not in self.object_history:
+            self.object_history[key] = []
         
         # أضف القياس الجديد
-        self.object_history[object_class].append((distance, now))
+        self.object_history[key].append((distance, now))
         
         # احتفظ فقط بالقياسات في الفترة الزمنية
-        cutoff_time = now.timestamp() - self.tracking_window
-        self.object_history[object_class] = [
-            (d, t) for d, t in self.object_history[object_class]
+        self.object_history[key] = [
+            (d, t) for d, t in self.object_history[key]
             if t.timestamp() > cutoff_time
         ]
         
-        if len(self.object_history[object_class]) < 2:
+        if len(self.object_history[key]) < 2:
             return None
         
         # احسب الاتجاه
-        distances = [d for d, _ in self.object_history[object_class]]
+        distances = [d for d, _ in self.object_history[key]]
         distance_trend = self._calculate_trend(distances)
         
         # احسب مستوى الإلحاح
@@ -214,7 +234,8 @@ class DynamicAlertSystem:
             distance_trend=distance_trend,
             urgency_level=urgency,
             recommendation=recommendation,
-            timestamp=now
+            timestamp=now,
+            track_id=track_id
         )
     
     def _calculate_trend(self, distances: List[float]) -> str:
@@ -352,4 +373,5 @@ class LocationAwareness:
 # إنشاء مثيلات عامة
 ambient_sound_detector = AmbientSoundDetector()
 dynamic_alert_system = DynamicAlertSystem()
+session_registry.register('dynamic_alerts', lambda session_id: DynamicAlertSystem(), default=dynamic_alert_system)
 location_awareness = LocationAwareness()
@@ -3,234 +3,383 @@ PHASE 2: نظام التخزين المؤقت (Caching System)
 تسريع المعالجة بحفظ النتائج المتطابقة
 """
 
+import functools
 import hashlib
+import inspect
 import json
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+import os
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
 from pathlib import Path
 import time
 
+from .metrics import metrics, operation_histogram, operation_stats, timed  # noqa: F401 (timed: re-export)
+
+CACHE_MAX_MB = float(os.environ.get('CACHE_MAX_MB', '64'))
+CACHE_DB_NAME = 'cache.sqlite3'
+
+
+def _entry_size(data: Any) -> int:
+    """حجم تقريبي للمدخل (بايت) - حجم تمثيل JSON، وإلا sys.getsizeof"""
+    try:
+        return len(json.dumps(data, default=str))
+    except (TypeError, ValueError):
+        return sys.getsizeof(data)
+
+
+class DiskTier:
+    """طبقة القرص: ملف SQLite واحد مفهرس بتاريخ الانتهاء (بدلاً من ملف JSON لكل مفتاح)"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, expires_at REAL NOT NULL, data TEXT NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires_at)')
+
+    def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        """(الوقت المتبقي بالثواني, البيانات) أو None"""
+        with self._lock:
+            row = self._conn.execute('SELECT expires_at, data FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            remaining = row[0] - time.time()
+            if remaining <= 0:
+                self._conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                return None
+        return remaining, json.loads(row[1])
+
+    def set(self, key: str, data: Any, ttl: float) -> None:
+        payload = json.dumps(data, default=str)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO entries (key, expires_at, data) VALUES (?, ?, ?)',
+                (key, time.time() + ttl, payload)
+            )
+
+    def clear_expired(self) -> int:
+        with self._lock:
+            return self._conn.execute('DELETE FROM entries WHERE expires_at < ?', (time.time(),)).rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+
 class CacheManager:
-    """مدير التخزين المؤقت"""
+    """
+    مدير التخزين المؤقت
+
+    - الذاكرة: LRU بترتيب الاستخدام (OrderedDict - O(1)) مع TTL بوقت monotonic
+      وميزانية بايتات؛ الأقدم استخداماً يُحذف عند تجاوزها
+    - القرص (اختياري): ملف SQLite واحد - المدخلات تبقى بعد إعادة التشغيل
+    """
     
-    def __init__(self, ttl: int = 30, cache_dir: Optional[Path] = None):
+    def __init__(self, ttl: int = 30, cache_dir: Optional[Path] = None,
+                 max_bytes: int = int(CACHE_MAX_MB * 1024 * 1024)):
         """
         ttl: عمر الكاش (بالثواني)
         cache_dir: مجلد التخزين (None = الذاكرة فقط)
+        max_bytes: ميزانية الذاكرة (بايت)
         """
         self.ttl = ttl
-        self.cache_dir = cache_dir or Path('/tmp/vision_cache')
-        self.memory_cache: Dict[str, Dict[str, Any]] = {}
+        self.max_bytes = max_bytes
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        # key → (expires_at monotonic, size, data)
+        self.memory_cache: 'OrderedDict[str, Tuple[float, int, Any]]' = OrderedDict()
+        self.current_bytes = 0
+        self._lock = threading.Lock()
         
-        if cache_dir:
+        self.disk: Optional[DiskTier] = None
+        if self.cache_dir:
             self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self.disk = DiskTier(self.cache_dir / CACHE_DB_NAME)
+        
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
     
     def _hash_image(self, image_bytes: bytes) -> str:
         """حساب بصمة الصورة"""
         return hashlib.md5(image_bytes).hexdigest()
     
-    def get(self, image_bytes: bytes, prefix: str = 'img') -> Optional[Dict]:
-        """استرجع من الكاش"""
-        image_hash = self._hash_image(image_bytes)
-        cache_key = f"{prefix}_{image_hash}"
-        
-        # تحقق من الذاكرة أولاً
-        if cache_key in self.memory_cache:
-            entry = self.memory_cache[cache_key]
-            if datetime.now() < entry['expires_at']:
-                return entry['data']
-            else:
+    def _drop(self, key: str) -> None:
+        _, size, _ = self.memory_cache.pop(key)
+        self.current_bytes -= size
+    
+    def _store(self, key: str, data: Any, ttl: float) -> None:
+        """إدخال في الذاكرة + حذف الأقدم استخداماً حتى الميزانية (تحت القفل)"""
+        size = _entry_size(data)
+        if size > self.max_bytes:
+            return
+        if key in self.memory_cache:
+            self._drop(key)
+        self.memory_cache[key] = (time.monotonic() + ttl, size, data)
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            self._drop(next(iter(self.memory_cache)))
+            self.evictions += 1
+    
+    def get_key(self, cache_key: str) -> Optional[Any]:
+        """استرجع بالمفتاح مباشرة"""
+        with self._lock:
+            entry = self.memory_cache.get(cache_key)
+            if entry is not None:
+                if time.monotonic() < entry[0]:
+                    self.memory_cache.move_to_end(cache_key)
+                    self.hits += 1
+                    return entry[2]
                 # انتهت مدة الكاش
-                del self.memory_cache[cache_key]
+                self._drop(cache_key)
+                self.expirations += 1
         
-        # جرب ملف الكاش إذا كان موجوداً
-        if self.cache_dir:
-            cache_file = self.cache_dir / f"{cache_key}.json"
-            if cache_file.exists():
-                try:
-                    with open(cache_file, 'r') as f:
-                        entry = json.load(f)
-                        if datetime.fromisoformat(entry['expires_at']) > datetime.now():
-                            return entry['data']
-                        else:
-                            cache_file.unlink()  # احذف الملف المنتهي
-                except:
-                    pass
+        # جرب القرص (ويُرفع للذاكرة لبقية عمره)
+        if self.disk is not None:
+            found = self.disk.get(cache_key)
+            if found is not None:
+                remaining, data = found
+                with self._lock:
+                    self._store(cache_key, data, remaining)
+                    self.disk_hits += 1
+                return data
         
+        with self._lock:
+            self.misses += 1
         return None
     
-    def set(self, image_bytes: bytes, data: Dict, prefix: str = 'img') -> None:
-        """احفظ في الكاش"""
-        image_hash = self._hash_image(image_bytes)
-        cache_key = f"{prefix}_{image_hash}"
-        
-        entry = {
-            'data': data,
-            'expires_at': (datetime.now() + timedelta(seconds=self.ttl)).isoformat(),
-            'created_at': datetime.now().isoformat()
-        }
-        
-        # احفظ في الذاكرة
-        self.memory_cache[cache_key] = {
-            'data': data,
-            'expires_at': datetime.now() + timedelta(seconds=self.ttl)
-        }
-        
-        # احفظ في ملف
-        if self.cache_dir:
-            cache_file = self.cache_dir / f"{cache_key}.json"
+    def set_key(self, cache_key: str, data: Any, ttl: Optional[float] = None) -> None:
+        """احفظ بالمفتاح مباشرة"""
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._store(cache_key, data, ttl)
+        if self.disk is not None:
             try:
-                with open(cache_file, 'w') as f:
-                    json.dump(entry, f)
-            except:
+                self.disk.set(cache_key, data, ttl)
+            except (TypeError, ValueError, sqlite3.Error):
                 pass
     
+    def get(self, image_bytes: bytes, prefix: str = 'img') -> Optional[Dict]:
+        """استرجع من الكاش"""
+        return self.get_key(f"{prefix}_{self._hash_image(image_bytes)}")
+    
+    def set(self, image_bytes: bytes, data: Dict, prefix: str = 'img') -> None:
+        """احفظ في الكاش"""
+        self.set_key(f"{prefix}_{self._hash_image(image_bytes)}", data)
+    
     def clear_expired(self) -> int:
         """امسح الكاش المنتهي"""
-        now = datetime.now()
-        
-        # من الذاكرة
-        expired_keys = [
-            k for k, v in self.memory_cache.items()
-            if v['expires_at'] < now
-        ]
-        for k in expired_keys:
-            del self.memory_cache[k]
-        
-        # من الملفات
-        deleted_count = 0
-        if self.cache_dir:
-            for cache_file in self.cache_dir.glob('*.json'):
-                try:
-                    with open(cache_file, 'r') as f:
-                        entry = json.load(f)
-                        if datetime.fromisoformat(entry['expires_at']) < now:
-                            cache_file.unlink()
-                            deleted_count += 1
-                except:
-                    pass
+        now = time.monotonic()
+        with self._lock:
+            expired_keys = [k for k, (expires_at, _, _) in self.memory_cache.items() if expires_at < now]
+            for k in expired_keys:
+                self._drop(k)
+            self.expirations += len(expired_keys)
         
+        # من القرص: استعلام واحد على فهرس expires_at
+        deleted_count = self.disk.clear_expired() if self.disk is not None else 0
         return len(expired_keys) + deleted_count
+    
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        stats = {
+            'entries': len(self.memory_cache),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+        if self.disk is not None:
+            stats['disk_entries'] = len(self.disk)
+        return stats
 
 # إنشاء مدير كاش عام
 cache_manager = CacheManager(ttl=30)
 
+# ======== Perceptual Frame Cache ========
+# فريمان متتاليان لمشهد ثابت لهما بايتات JPEG مختلفة دائماً (md5 لا يتطابق أبداً)
+# لكن بصمة dHash متطابقة أو قريبة جداً → نعيد استخدام النتيجة السابقة
+
+PHASH_BITS = 64
+PHASH_MAX_DISTANCE = int(os.environ.get('PHASH_MAX_DISTANCE', '6'))  # أقصى مسافة Hamming
+PHASH_TTL_S = float(os.environ.get('PHASH_TTL_S', '2.0'))           # 0 = تعطيل
+PHASH_MAX_ENTRIES = int(os.environ.get('PHASH_MAX_ENTRIES', '512'))
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class PerceptualCache:
+    """
+    كاش شبه-التطابق بالبصمة الإدراكية (Frame.dhash)
+
+    Multi-index hashing: البصمة تُقسم إلى max_distance+1 قطعة، ولكل قطعة فهرس
+    (قيمة القطعة → المدخلات). إذا كانت المسافة <= max_distance فقطعة واحدة على الأقل
+    متطابقة تماماً (مبدأ برج الحمام)، فالبحث = بضعة قواميس بدلاً من مسح كل المدخلات.
+    """
+
+    def __init__(self, max_distance: int = PHASH_MAX_DISTANCE, ttl: float = PHASH_TTL_S,
+                 max_entries: int = PHASH_MAX_ENTRIES, bits: int = PHASH_BITS):
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.max_entries = max_entries
+        num_chunks = max(1, min(max_distance + 1, bits))
+        bounds = [i * bits // num_chunks for i in range(num_chunks + 1)]
+        # (إزاحة, قناع) لكل قطعة
+        self._chunks = [(start, (1 << (end - start)) - 1) for start, end in zip(bounds, bounds[1:])]
+        # (prefix, hash) → (expires_at, data) بترتيب الاستخدام (LRU)
+        self._entries: 'OrderedDict[Tuple[str, int], Tuple[float, Any]]' = OrderedDict()
+        self._index: Dict[Tuple[str, int, int], set] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_distance >= 0
+
+    def _index_keys(self, prefix: str, image_hash: int):
+        return [(prefix, i, (image_hash >> shift) & mask) for i, (shift, mask) in enumerate(self._chunks)]
+
+    def _remove(self, key: Tuple[str, int]):
+        self._entries.pop(key, None)
+        for index_key in self._index_keys(*key):
+            bucket = self._index.get(index_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._index[index_key]
+
+    def get(self, image_hash: Optional[int], prefix: str = 'img') -> Optional[Any]:
+        """أقرب نتيجة ضمن max_distance (None إن لم توجد)"""
+        if not self.enabled or image_hash is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            best_key, best_distance = None, self.max_distance + 1
+            for index_key in self._index_keys(prefix, image_hash):
+                for key in list(self._index.get(index_key, ())):
+                    if self._entries[key][0] < now:
+                        self._remove(key)
+                        continue
+                    distance = hamming_distance(key[1], image_hash)
+                    if distance < best_distance:
+                        best_key, best_distance = key, distance
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            if best_distance:
+                self.near_hits += 1
+            return self._entries[best_key][1]
+
+    def set(self, image_hash: Optional[int], data: Any, prefix: str = 'img') -> None:
+        if not self.enabled or image_hash is None:
+            return
+        key = (prefix, image_hash)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, data)
+            for index_key in self._index_keys(prefix, image_hash):
+                self._index.setdefault(index_key, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_distance': self.max_distance,
+            'ttl_s': self.ttl,
+            'hits': self.hits,
+            'near_hits': self.near_hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+# كاش الفريمات المشترك (الكاشف + التحليل المتقدم، كل منهما ببادئة مختلفة)
+perceptual_cache = PerceptualCache()
+metrics.counter('sba_frame_cache_lookups_total', 'Perceptual frame cache lookups',
+                func=lambda: perceptual_cache.hits, result='hit')
+metrics.counter('sba_frame_cache_lookups_total', 'Perceptual frame cache lookups',
+                func=lambda: perceptual_cache.misses, result='miss')
+
 # Decorator للكاش
-def cached(prefix: str = 'func', ttl: int = 30):
-    """ديكوريتر لتخزين مؤقت للدوال"""
+def _call_key(prefix: str, args, kwargs) -> str:
+    """مفتاح الاستدعاء: md5 للبايتات (الصورة) أو لتمثيل المعاملات"""
+    if args and isinstance(args[0], (bytes, bytearray, memoryview)):
+        digest = hashlib.md5(args[0]).hexdigest()
+        rest = repr((args[1:], sorted(kwargs.items())))
+    else:
+        digest = ''
+        rest = repr((args, sorted(kwargs.items())))
+    return f"{prefix}_{digest}_{hashlib.md5(rest.encode('utf-8')).hexdigest()}"
+
+def cached(prefix: str = 'func', ttl: int = 30, max_bytes: int = int(CACHE_MAX_MB * 1024 * 1024)):
+    """ديكوريتر لتخزين مؤقت للدوال (الكاش متاح عبر wrapper.cache)"""
     def decorator(func):
-        cache = CacheManager(ttl=ttl)
+        cache = CacheManager(ttl=ttl, max_bytes=max_bytes)
         
+        @functools.wraps(func)
         async def async_wrapper(*args, **kwargs):
-            # حاول من الكاش
-            if args and isinstance(args[0], bytes):
-                cached_result = cache.get(args[0], prefix=prefix)
-                if cached_result is not None:
-                    return cached_result
-            
-            # استدعِ الدالة الأصلية
-            result = await func(*args, **kwargs) if hasattr(func, '__await__') else func(*args, **kwargs)
-            
-            # احفظ في الكاش
-            if args and isinstance(args[0], bytes):
-                cache.set(args[0], result, prefix=prefix)
-            
+            key = _call_key(prefix, args, kwargs)
+            cached_result = cache.get_key(key)
+            if cached_result is not None:
+                return cached_result
+            result = await func(*args, **kwargs)
+            cache.set_key(key, result)
             return result
         
+        @functools.wraps(func)
         def sync_wrapper(*args, **kwargs):
-            # حاول من الكاش
-            if args and isinstance(args[0], bytes):
-                cached_result = cache.get(args[0], prefix=prefix)
-                if cached_result is not None:
-                    return cached_result
-            
-            # استدعِ الدالة الأصلية
+            key = _call_key(prefix, args, kwargs)
+            cached_result = cache.get_key(key)
+            if cached_result is not None:
+                return cached_result
             result = func(*args, **kwargs)
-            
-            # احفظ في الكاش
-            if args and isinstance(args[0], bytes):
-                cache.set(args[0], result, prefix=prefix)
-            
+            cache.set_key(key, result)
             return result
         
-        # تحديد الدالة الصحيحة
-        import asyncio
-        import inspect
-        
-        if asyncio.iscoroutinefunction(func):
-            return async_wrapper
-        else:
-            return sync_wrapper
+        wrapper = async_wrapper if inspect.iscoroutinefunction(func) else sync_wrapper
+        wrapper.cache = cache
+        return wrapper
     
     return decorator
 
 class PerformanceMonitor:
-    """مراقب الأداء"""
-    
-    def __init__(self):
-        self.metrics: Dict[str, list] = {}
+    """مراقب الأداء - واجهة متوافقة فوق هيستوغرامات app.utils.metrics"""
     
     def record(self, operation: str, duration: float) -> None:
-        """سجل مقياس أداء"""
-        if operation not in self.metrics:
-            self.metrics[operation] = []
-        
-        self.metrics[operation].append({
-            'timestamp': datetime.now().isoformat(),
-            'duration': duration
-        })
-        
-        # احتفظ بآخر 100 قياس فقط
-        if len(self.metrics[operation]) > 100:
-            self.metrics[operation] = self.metrics[operation][-100:]
+        """سجل مقياس أداء (بالثواني)"""
+        operation_histogram(operation).observe(duration)
     
     def get_average(self, operation: str) -> float:
         """احصل على متوسط المدة"""
-        if operation not in self.metrics or not self.metrics[operation]:
-            return 0.0
-        
-        durations = [m['duration'] for m in self.metrics[operation]]
-        return sum(durations) / len(durations)
+        return operation_histogram(operation).mean
     
     def get_stats(self) -> Dict[str, Dict]:
-        """احصل على إحصائيات مفصلة"""
-        stats = {}
-        for op, metrics in self.metrics.items():
-            if metrics:
-                durations = [m['duration'] for m in metrics]
-                stats[op] = {
-                    'count': len(durations),
-                    'avg': sum(durations) / len(durations),
-                    'min': min(durations),
-                    'max': max(durations),
-                    'last': durations[-1]
-                }
-        return stats
+        """احصل على إحصائيات مفصلة (count/avg/min/max/last/p50/p95/p99)"""
+        return operation_stats()
 
 # إنشاء مراقب أداء عام
 perf_monitor = PerformanceMonitor()
-
-def timed(operation: str):
-    """ديكوريتر لقياس الوقت"""
-    def decorator(func):
-        async def async_wrapper(*args, **kwargs):
-            start = time.time()
-            result = await func(*args, **kwargs)
-            duration = time.time() - start
-            perf_monitor.record(operation, duration)
-            return result
-        
-        def sync_wrapper(*args, **kwargs):
-            start = time.time()
-            result = func(*args, **kwargs)
-            duration = time.time() - start
-            perf_monitor.record(operation, duration)
-            return result
-        
-        import asyncio
-        if asyncio.iscoroutinefunction(func):
-            return async_wrapper
-        else:
-            return sync_wrapper
-    
-    return decorator
@@ -0,0 +1,115 @@
+"""
+استقبال الصور الموحد - Shared Image Ingestion
+
+كل endpoint يستهلك صورة يقبل ثلاث صيغ (نفس الـ endpoint):
+
+1. جسم ثنائي خام:   Content-Type: image/jpeg (أو image/* / application/octet-stream)
+   الحقول الأخرى عبر query string  →  POST /assistant/analyze?check_motion=false
+2. multipart/form-data: ملف في حقل image (أو file) + باقي الحقول كنص
+3. JSON (التوافق مع العملاء القدامى): الصورة base64 في image_b64
+
+الصيغتان 1 و 2 توفران ~33% من حجم الطلب وفك base64. الصورة تُرجع كـ
+memoryview على بايتات الطلب (بدون نسخ إضافي) - Frame.from_bytes يقبلها مباشرة.
+"""
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Sequence, Type
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+
+RAW_IMAGE_TYPES = ('image/', 'application/octet-stream')
+
+
+def decode_b64_image(image_b64: str) -> bytes:
+    """فك base64 (مع أو بدون بادئة data:image/...;base64,) - النص غير الصالح = 400"""
+    try:
+        if "," in image_b64:
+            _, image_b64 = image_b64.split(",", 1)
+        image = base64.b64decode(image_b64)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail='Invalid base64 image')
+    if not image:
+        raise HTTPException(status_code=400, detail='Invalid base64 image')
+    return image
+
+
+@dataclass
+class ImagePayload:
+    """صورة الطلب + باقي الحقول"""
+    image: Optional[memoryview]
+    fields: Dict[str, Any] = field(default_factory=dict)
+    source: str = 'none'  # raw | multipart | json | none
+    image_b64: Optional[str] = None  # النص الأصلي إن جاءت الصورة base64
+
+    def as_b64(self) -> Optional[str]:
+        """base64 للصورة (للنماذج التي تحتاجه مثل LLM الرؤية) - يُحسب عند الطلب فقط"""
+        if self.image_b64 is None and self.image is not None:
+            self.image_b64 = base64.b64encode(self.image).decode('ascii')
+        return self.image_b64
+
+    def parse(self, model: Type[BaseModel]) -> BaseModel:
+        """التحقق من الحقول بنموذج pydantic (422 عند الخطأ كما في FastAPI)"""
+        try:
+            return model(**self.fields)
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors())
+
+
+async def read_image_payload(request: Request,
+                             b64_field: str = 'image_b64',
+                             file_fields: Sequence[str] = ('image', 'file'),
+                             required: bool = True) -> ImagePayload:
+    """
+    قراءة الصورة من الطلب أياً كانت صيغته
+
+    Args:
+        b64_field: اسم حقل base64 في JSON/form
+        file_fields: أسماء حقول الملف في multipart
+        required: 400 إذا لم توجد صورة
+    """
+    content_type = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    fields: Dict[str, Any] = dict(request.query_params)
+
+    if content_type.startswith(RAW_IMAGE_TYPES):
+        body = await request.body()
+        payload = ImagePayload(memoryview(body) if body else None, fields, 'raw')
+
+    elif content_type == 'multipart/form-data':
+        form = await request.form()
+        image = None
+        for key, value in form.multi_items():
+            if hasattr(value, 'read'):
+                if key in file_fields and image is None:
+                    image = memoryview(await value.read())
+            else:
+                fields[key] = value
+        payload = ImagePayload(image, fields, 'multipart')
+        if image is None and fields.get(b64_field):
+            payload.image_b64 = fields.pop(b64_field)
+            payload.image = memoryview(decode_b64_image(payload.image_b64))
+
+    else:
+        body = await request.body()
+        if body:
+            try:
+                data = json.loads(body)
+            except ValueError:
+                raise HTTPException(status_code=400, detail='Invalid JSON body')
+            if not isinstance(data, dict):
+                raise HTTPException(status_code=400, detail='JSON body must be an object')
+            fields.update(data)
+        payload = ImagePayload(None, fields, 'json')
+        image_b64 = fields.pop(b64_field, None)
+        if image_b64:
+            payload.image_b64 = image_b64
+            payload.image = memoryview(decode_b64_image(image_b64))
+
+    if payload.image is None:
+        payload.source = 'none'
+        if required:
+            raise HTTPException(status_code=400, detail='No image in request (send image/jpeg, multipart or image_b64)')
+    return payload
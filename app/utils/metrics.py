@@ -0,0 +1,306 @@
+"""
+طبقة القياس - Metrics (Prometheus text format)
+
+- Histogram: دلاء ثابتة للتصدير (le) + دلاء لوغاريتمية دقيقة (~2%) لحساب
+  p50/p95/p99 بأسلوب HDR - التسجيل O(1) بدون قوائم تُمسح أو تُرتب
+- Counter / Gauge (قيمة مباشرة أو دالة تُقرأ عند السحب)
+- @timed(operation): زمن كل استدعاء في sba_operation_duration_seconds{operation=...}
+  (دوال عادية، async، و async generators)
+
+    from app.utils.metrics import metrics, timed
+
+    @timed('yolo')
+    def predict(...): ...
+
+    GET /metrics  →  metrics.render_prometheus()
+
+التسجيل = قفل غير متنازع عليه + بضع عمليات حسابية (~1µs) - آمن للإبقاء في الإنتاج
+"""
+
+import bisect
+import functools
+import inspect
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+METRICS_PREFIX = 'sba_'
+OPERATION_HISTOGRAM = f'{METRICS_PREFIX}operation_duration_seconds'
+OPERATION_SUMMARY = f'{METRICS_PREFIX}operation_latency_seconds'
+OPERATION_ERRORS = f'{METRICS_PREFIX}operation_errors_total'
+
+# دلاء Prometheus (ثواني)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+# الدلاء الدقيقة: 1µs .. ~1000s بدقة نسبية 2%
+FINE_MIN = 1e-6
+FINE_GROWTH = 1.02
+FINE_BUCKETS = int(math.log(1e9) / math.log(FINE_GROWTH)) + 1
+_LOG_GROWTH = math.log(FINE_GROWTH)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+class Histogram:
+    """هيستوغرام زمن: دلاء ثابتة + دلاء لوغاريتمية للنسب المئوية"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = tuple(buckets)
+        self.bucket_counts = [0] * (len(self.bounds) + 1)  # الأخير = +Inf
+        self.fine_counts = [0] * FINE_BUCKETS
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.last = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        fine = 0 if value <= FINE_MIN else min(int(math.log(value / FINE_MIN) / _LOG_GROWTH), FINE_BUCKETS - 1)
+        coarse = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.bucket_counts[coarse] += 1
+            self.fine_counts[fine] += 1
+            self.count += 1
+            self.sum += value
+            self.last = value
+            if value < self.min:
+                self.min = value
+            if value > self.max:
+                self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantiles(self, qs=QUANTILES) -> Dict[float, float]:
+        """النسب المئوية من الدلاء الدقيقة (منتصف الدلو الهندسي، محصور بين min/max)"""
+        with self._lock:
+            counts = list(self.fine_counts)
+            total, low, high = self.count, self.min, self.max
+        result = {q: 0.0 for q in qs}
+        if not total:
+            return result
+        targets = sorted((max(1, math.ceil(q * total)), q) for q in qs)
+        cumulative, t = 0, 0
+        for i, c in enumerate(counts):
+            cumulative += c
+            while t < len(targets) and cumulative >= targets[t][0]:
+                value = FINE_MIN * FINE_GROWTH ** (i + 0.5)
+                result[targets[t][1]] = min(max(value, low), high)
+                t += 1
+            if t == len(targets):
+                break
+        return result
+
+    def cumulative_buckets(self) -> List[Tuple[float, int]]:
+        with self._lock:
+            counts = list(self.bucket_counts)
+        cumulative, out = 0, []
+        for bound, c in zip(self.bounds + (math.inf,), counts):
+            cumulative += c
+            out.append((bound, cumulative))
+        return out
+
+    def get_stats(self) -> Dict:
+        q = self.quantiles()
+        return {
+            'count': self.count,
+            'avg': self.mean,
+            'min': self.min if self.count else 0.0,
+            'max': self.max,
+            'last': self.last,
+            'p50': q[0.5],
+            'p95': q[0.95],
+            'p99': q[0.99],
+        }
+
+
+class Counter:
+    def __init__(self, func: Optional[Callable[[], float]] = None):
+        self.value = 0.0
+        self.func = func
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def get(self) -> float:
+        return float(self.func()) if self.func else self.value
+
+
+class Gauge:
+    def __init__(self, func: Optional[Callable[[], float]] = None):
+        self.value = 0.0
+        self.func = func
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def get(self) -> float:
+        return float(self.func()) if self.func else self.value
+
+
+class MetricsRegistry:
+    """كل المقاييس: name → (type, help, {labels: metric})"""
+
+    def __init__(self):
+        self._families: Dict[str, Tuple[str, str, Dict[LabelKey, object]]] = {}
+        self._summaries: Dict[str, Tuple[str, str]] = {}  # histogram → (summary name, help)
+        self._lock = threading.Lock()
+
+    def _get(self, kind: str, name: str, help: str, labels: Dict[str, str], factory: Callable):
+        key = _label_key(labels)
+        family = self._families.get(name)
+        if family is not None and key in family[2]:
+            return family[2][key]
+        with self._lock:
+            family = self._families.setdefault(name, (kind, help, {}))
+            if family[0] != kind:
+                raise ValueError(f"Metric {name} already registered as {family[0]}")
+            if key not in family[2]:
+                family[2][key] = factory()
+            return family[2][key]
+
+    def histogram(self, name: str, help: str = '', buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+                  summary: Optional[str] = None, **labels) -> Histogram:
+        """summary: اسم عائلة summary تُصدّر فيها p50/p95/p99 لنفس القياس"""
+        if summary:
+            self._summaries[name] = (summary, help)
+        return self._get('histogram', name, help, labels, lambda: Histogram(buckets))
+
+    def counter(self, name: str, help: str = '', func: Optional[Callable[[], float]] = None, **labels) -> Counter:
+        return self._get('counter', name, help, labels, lambda: Counter(func))
+
+    def gauge(self, name: str, help: str = '', func: Optional[Callable[[], float]] = None, **labels) -> Gauge:
+        return self._get('gauge', name, help, labels, lambda: Gauge(func))
+
+    def family(self, name: str) -> Dict[LabelKey, object]:
+        family = self._families.get(name)
+        return dict(family[2]) if family else {}
+
+    def render_prometheus(self) -> str:
+        """نص Prometheus exposition format (version 0.0.4)"""
+        lines: List[str] = []
+        for name, (kind, help, members) in sorted(self._families.items()):
+            members = dict(members)
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {kind}')
+            for key, metric in members.items():
+                if kind == 'histogram':
+                    for bound, cumulative in metric.cumulative_buckets():
+                        lines.append(f'{name}_bucket{_format_labels(key, ("le", _format_value(bound)))} {cumulative}')
+                    lines.append(f'{name}_sum{_format_labels(key)} {_format_value(metric.sum)}')
+                    lines.append(f'{name}_count{_format_labels(key)} {metric.count}')
+                else:
+                    try:
+                        value = metric.get()
+                    except Exception:
+                        continue
+                    lines.append(f'{name}{_format_labels(key)} {_format_value(value)}')
+
+            if kind == 'histogram' and name in self._summaries:
+                summary, summary_help = self._summaries[name]
+                lines.append(f'# HELP {summary} {summary_help} (quantiles)')
+                lines.append(f'# TYPE {summary} summary')
+                for key, metric in members.items():
+                    for q, value in metric.quantiles().items():
+                        lines.append(f'{summary}{_format_labels(key, ("quantile", str(q)))} {_format_value(value)}')
+                    lines.append(f'{summary}_sum{_format_labels(key)} {_format_value(metric.sum)}')
+                    lines.append(f'{summary}_count{_format_labels(key)} {metric.count}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+def operation_histogram(operation: str) -> Histogram:
+    return metrics.histogram(
+        OPERATION_HISTOGRAM, 'Latency of instrumented operations (model calls, endpoints)',
+        summary=OPERATION_SUMMARY, operation=operation
+    )
+
+
+def operation_stats() -> Dict[str, Dict]:
+    """{operation: count/avg/min/max/last/p50/p95/p99} بالثواني"""
+    return {dict(key)['operation']: h.get_stats()
+            for key, h in metrics.family(OPERATION_HISTOGRAM).items() if h.count}
+
+
+def timed(operation: str):
+    """ديكوريتر لقياس الوقت (+ عداد الأخطاء) - يحافظ على توقيع الدالة (FastAPI)"""
+    def decorator(func):
+        histogram = operation_histogram(operation)
+        errors = metrics.counter(OPERATION_ERRORS, 'Exceptions raised by instrumented operations',
+                                 operation=operation)
+
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def asyncgen_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    async for item in func(*args, **kwargs):
+                        yield item
+                except Exception:
+                    errors.inc()
+                    raise
+                finally:
+                    histogram.observe(time.perf_counter() - start)
+            return asyncgen_wrapper
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    errors.inc()
+                    raise
+                finally:
+                    histogram.observe(time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return sync_wrapper
+
+    return decorator
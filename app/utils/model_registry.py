@@ -0,0 +1,146 @@
+"""
+سجل النماذج - Lazy Model Registry
+
+استيراد app.main لا يحمّل أي نموذج ثقيل (YOLO-World, MiDaS, EasyOCR,
+face_recognition, Whisper). كل نموذج يُسجل بدالة تحميل، ويُحمّل:
+- عند أول استخدام (model_registry.get / أول وصول لخاصية على LazyModel)، أو
+- مسبقاً في الخلفية عند بدء التشغيل (warm_up في lifespan - MODEL_WARMUP)
+
+    detector = model_registry.register('detector', _load_detector)   # LazyModel
+    detector.detect(frame)   # يحمّل عند أول استدعاء فقط
+
+الحالات: unloaded → loading → ready | unavailable (المكتبة/الملف غير موجود) | failed
+GET /ready يعرض حالة كل نموذج.
+"""
+
+import os
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# نماذج تُحمّل في الخلفية عند بدء التشغيل: all | none | قائمة بفواصل (detector,asr)
+MODEL_WARMUP = os.environ.get('MODEL_WARMUP', 'all')
+
+UNLOADED, LOADING, READY, UNAVAILABLE, FAILED = 'unloaded', 'loading', 'ready', 'unavailable', 'failed'
+
+
+class ModelEntry:
+    def __init__(self, name: str, loader: Callable[[], Any], required: bool):
+        self.name = name
+        self.loader = loader
+        self.required = required
+        self.state = UNLOADED
+        self.value: Any = None
+        self.error: Optional[str] = None
+        self.load_s = 0.0
+        self.lock = threading.Lock()
+
+
+class LazyModel:
+    """وكيل يحمّل النموذج عند أول وصول لأي خاصية (بديل شفاف للـ singleton القديم)"""
+
+    def __init__(self, registry: 'ModelRegistry', name: str):
+        object.__setattr__(self, '_registry', registry)
+        object.__setattr__(self, '_name', name)
+
+    def __getattr__(self, attr):
+        return getattr(self._registry.get(self._name), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._registry.get(self._name), attr, value)
+
+    def __bool__(self):
+        return self._registry.get(self._name) is not None
+
+    def __repr__(self):
+        return f"<LazyModel {self._name} ({self._registry.state(self._name)})>"
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._entries: Dict[str, ModelEntry] = {}
+        self._warmup_thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, loader: Callable[[], Any], required: bool = False) -> LazyModel:
+        """
+        loader: دالة بدون معاملات تُرجع النموذج (None = غير متاح في هذه البيئة)
+        required: فشل تحميله = الخادم غير جاهز (/ready → 503)
+        """
+        self._entries[name] = ModelEntry(name, loader, required)
+        return LazyModel(self, name)
+
+    def get(self, name: str) -> Any:
+        """النموذج (يُحمّل مرة واحدة - آمن مع الـ threads)"""
+        entry = self._entries[name]
+        if entry.state in (READY, UNAVAILABLE, FAILED):
+            return entry.value
+        with entry.lock:
+            if entry.state in (UNLOADED, LOADING):
+                entry.state = LOADING
+                start = time.perf_counter()
+                try:
+                    entry.value = entry.loader()
+                    entry.state = READY if entry.value is not None else UNAVAILABLE
+                except Exception as e:
+                    entry.error = str(e)
+                    entry.state = FAILED
+                    print(f"⚠️ Model '{name}' failed to load: {e}")
+                    traceback.print_exc()
+                entry.load_s = time.perf_counter() - start
+        return entry.value
+
+    def state(self, name: str) -> str:
+        return self._entries[name].state
+
+    def is_loaded(self, name: str) -> bool:
+        return self._entries[name].state == READY
+
+    def warm_up(self, names: Optional[Iterable[str]] = None, background: bool = True):
+        """تحميل مسبق (بالترتيب) - في thread خلفي افتراضياً"""
+        names = list(names) if names is not None else list(self._entries)
+
+        def run():
+            for name in names:
+                if name in self._entries:
+                    self.get(name)
+
+        if not background:
+            run()
+            return None
+        self._warmup_thread = threading.Thread(target=run, name='model-warmup', daemon=True)
+        self._warmup_thread.start()
+        return self._warmup_thread
+
+    def warmup_names(self, spec: str = MODEL_WARMUP) -> list:
+        spec = spec.strip().lower()
+        if spec in ('', 'none', '0'):
+            return []
+        if spec in ('all', '1'):
+            return list(self._entries)
+        return [n.strip() for n in spec.split(',') if n.strip()]
+
+    @property
+    def warming_up(self) -> bool:
+        return self._warmup_thread is not None and self._warmup_thread.is_alive()
+
+    @property
+    def ready(self) -> bool:
+        """انتهى التحميل المسبق ولم يفشل أي نموذج مطلوب (النماذج الكسولة لا تؤخر الجاهزية)"""
+        return not self.warming_up and not any(
+            e.required and e.state == FAILED for e in self._entries.values()
+        )
+
+    def get_stats(self) -> Dict:
+        return {
+            name: {
+                'state': e.state,
+                'required': e.required,
+                'load_s': round(e.load_s, 2),
+                **({'error': e.error} if e.error else {}),
+            }
+            for name, e in self._entries.items()
+        }
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,80 @@
+"""
+منفذ مراحل متوازية - Stage Graph Executor
+
+كل مرحلة تبدأ فور جاهزية المراحل التي تعتمد عليها (وليس بعد انتهاء كل ما قبلها):
+
+    graph = StageGraph()
+    graph.stage('frame', Frame.from_bytes, image_bytes)
+    graph.stage('detect', detect_objects, after=('frame',))    # detect(frame)
+    graph.stage('asr', transcribe, audio_bytes)                # بالتوازي مع الرؤية
+    text, objects = await graph.results('asr', 'detect')
+
+- الدوال العادية (blocking) تعمل في threadpool، والـ async تُنتظر مباشرة
+- نتائج مراحل after تُمرر كأول معاملات للدالة
+- زمن كل مرحلة يُسجل ويُصدّر كهيدر Server-Timing
+"""
+
+import asyncio
+import inspect
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+
+class StageGraph:
+    """رسم مراحل طلب واحد (يُنشأ لكل طلب)"""
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Future] = {}
+        self.timings: Dict[str, float] = {}  # ms
+        self.started = time.perf_counter()
+
+    def stage(self, name: str, func: Callable, *args, after: Iterable[str] = ()) -> asyncio.Future:
+        """جدولة مرحلة - تبدأ فور انتهاء مراحل after"""
+        deps = [self._tasks[d] for d in after]
+
+        async def runner():
+            dep_results = await asyncio.gather(*deps) if deps else []
+            start = time.perf_counter()
+            try:
+                if inspect.iscoroutinefunction(func):
+                    return await func(*dep_results, *args)
+                return await run_in_threadpool(func, *dep_results, *args)
+            finally:
+                self.timings[name] = (time.perf_counter() - start) * 1000
+
+        self._tasks[name] = asyncio.ensure_future(runner())
+        return self._tasks[name]
+
+    def record(self, name: str, start: float):
+        """تسجيل زمن مرحلة نُفذت خارج الرسم (مثل أول جملة TTS)"""
+        self.timings[name] = (time.perf_counter() - start) * 1000
+
+    def has(self, name: str) -> bool:
+        return name in self._tasks
+
+    async def result(self, name: str) -> Any:
+        return await self._tasks[name]
+
+    async def results(self, *names: str) -> List[Any]:
+        return list(await asyncio.gather(*(self._tasks[n] for n in names)))
+
+    def cancel(self):
+        """
+        إلغاء المراحل غير المنتهية (عند خطأ أو عند عدم الحاجة لها) - تنفيذ الـ threadpool
+        نفسه لا يُقاطع. أخطاء المراحل المنتهية تُقرأ حتى لا تبقى "never retrieved"
+        """
+        for task in self._tasks.values():
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()
+
+    def server_timing(self, extra: Optional[Dict[str, float]] = None) -> str:
+        """هيدر Server-Timing: asr;dur=812.3, detect;dur=95.1, ..., total;dur=..."""
+        timings = dict(self.timings)
+        if extra:
+            timings.update(extra)
+        timings['total'] = (time.perf_counter() - self.started) * 1000
+        return ', '.join(f"{name};dur={ms:.1f}" for name, ms in timings.items())
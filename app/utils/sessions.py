@@ -0,0 +1,186 @@
+"""
+سجل الجلسات - Sharded Session Registry
+
+كل مستخدم/جهاز له جلسة مستقلة بنسخه الخاصة من المكونات ذات الحالة
+(السياق، مهلات التنبيه، تاريخ الحركة، المشي المستقيم، التعلم...)
+بدلاً من singletons مشتركة بين كل المستخدمين.
+
+- المعرف: هيدر X-Session-Id / X-Device-Id / X-User-Id أو query session_id / device_id / user_id
+  (بدون معرف → الجلسة الافتراضية 'default' = الـ singletons القديمة، للتوافق)
+- shards بأقفال منفصلة (lock striping) - الطلبات المتزامنة لا تتنافس على قفل واحد
+- المكونات تُنشأ بشكل كسول عند أول استخدام في الجلسة
+- الجلسات الخاملة تُحذف (idle eviction) + حد أقصى لعدد الجلسات لكل shard (LRU)
+
+كل module يسجل مكونه:
+    session_registry.register('context', lambda session_id: ContextManager(), default=context_manager)
+
+والاستخدام:
+    session = get_session(request)
+    session.context.update_objects(objects)
+"""
+
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+from .metrics import metrics
+
+if TYPE_CHECKING:
+    from starlette.requests import HTTPConnection
+
+SESSION_SHARDS = int(os.environ.get('SESSION_SHARDS', '16'))
+SESSION_IDLE_S = float(os.environ.get('SESSION_IDLE_S', '1800'))   # 30 دقيقة خمول
+SESSION_MAX = int(os.environ.get('SESSION_MAX', '1000'))
+SESSION_SWEEP_S = 60.0
+MAX_SESSION_ID_LEN = 128
+
+DEFAULT_SESSION_ID = 'default'
+SESSION_HEADERS = ('x-session-id', 'x-device-id', 'x-user-id')
+SESSION_PARAMS = ('session_id', 'device_id', 'user_id')
+
+
+class Session:
+    """حالة مستخدم واحد - المكونات تُنشأ عند أول وصول (session.context, session.alerts, ...)"""
+
+    def __init__(self, session_id: str, registry: 'SessionRegistry'):
+        self.id = session_id
+        self.created_at = time.time()
+        self.last_seen = time.monotonic()
+        self._registry = registry
+        self._components: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        factory = self._registry.factories.get(name)
+        if factory is None:
+            raise AttributeError(f"Unknown session component: {name}")
+        with self._lock:
+            component = self._components.get(name)
+            if component is None:
+                component = factory(self.id)
+                self._components[name] = component
+        return component
+
+    def get_stats(self) -> Dict:
+        return {
+            'id': self.id,
+            'idle_s': round(time.monotonic() - self.last_seen, 1),
+            'components': sorted(self._components),
+        }
+
+
+class SessionRegistry:
+    """جلسات موزعة على shards، كل shard بقفله و LRU خاص"""
+
+    def __init__(self, num_shards: int = SESSION_SHARDS, idle_timeout: float = SESSION_IDLE_S,
+                 max_sessions: int = SESSION_MAX):
+        self.idle_timeout = idle_timeout
+        self.max_per_shard = max(1, max_sessions // num_shards)
+        self.factories: Dict[str, Callable[[str], Any]] = {}
+        self._shards = [(threading.Lock(), OrderedDict()) for _ in range(num_shards)]
+        self.default = Session(DEFAULT_SESSION_ID, self)
+        self._last_sweep = time.monotonic()
+        self.created = 0
+        self.evicted = 0
+
+    def register(self, name: str, factory: Callable[[str], Any], default: Any = None):
+        """تسجيل مكون لكل جلسة (default = النسخة المستخدمة للجلسة الافتراضية)"""
+        self.factories[name] = factory
+        if default is not None:
+            self.default._components[name] = default
+
+    def _shard(self, session_id: str):
+        return self._shards[zlib.crc32(session_id.encode('utf-8')) % len(self._shards)]
+
+    def get(self, session_id: Optional[str]) -> Session:
+        """جلسة المعرف (تُنشأ إذا لم توجد)"""
+        now = time.monotonic()
+        if now - self._last_sweep > SESSION_SWEEP_S:
+            self._last_sweep = now
+            self.evict_idle()
+
+        if not session_id or session_id == DEFAULT_SESSION_ID:
+            self.default.last_seen = now
+            return self.default
+
+        # المعرف يُستخدم في أسماء ملفات (ملف تعريف التعلم) - أحرف آمنة فقط
+        session_id = re.sub(r'[^\w.-]', '_', session_id)[:MAX_SESSION_ID_LEN]
+        lock, sessions = self._shard(session_id)
+        with lock:
+            session = sessions.get(session_id)
+            if session is None:
+                session = Session(session_id, self)
+                sessions[session_id] = session
+                self.created += 1
+                while len(sessions) > self.max_per_shard:
+                    sessions.popitem(last=False)
+                    self.evicted += 1
+            else:
+                sessions.move_to_end(session_id)
+            session.last_seen = now
+        return session
+
+    def evict_idle(self) -> int:
+        """حذف الجلسات الخاملة (الأقدم استخداماً في بداية كل shard)"""
+        now = time.monotonic()
+        removed = 0
+        for lock, sessions in self._shards:
+            with lock:
+                while sessions:
+                    oldest = next(iter(sessions.values()))
+                    if now - oldest.last_seen <= self.idle_timeout:
+                        break
+                    sessions.popitem(last=False)
+                    removed += 1
+        self.evicted += removed
+        return removed
+
+    def remove(self, session_id: str) -> bool:
+        lock, sessions = self._shard(session_id)
+        with lock:
+            return sessions.pop(session_id, None) is not None
+
+    def __len__(self) -> int:
+        return sum(len(sessions) for _, sessions in self._shards)
+
+    def get_stats(self) -> Dict:
+        sizes = [len(sessions) for _, sessions in self._shards]
+        return {
+            'active': sum(sizes),
+            'shards': len(sizes),
+            'largest_shard': max(sizes) if sizes else 0,
+            'max_per_shard': self.max_per_shard,
+            'idle_timeout_s': self.idle_timeout,
+            'created': self.created,
+            'evicted': self.evicted,
+            'components': sorted(self.factories),
+        }
+
+
+session_registry = SessionRegistry()
+metrics.gauge('sba_sessions_active', 'Active non-default sessions', func=lambda: len(session_registry))
+metrics.counter('sba_sessions_evicted_total', 'Sessions evicted (idle or LRU)', func=lambda: session_registry.evicted)
+
+
+def session_id_from(conn: 'HTTPConnection') -> Optional[str]:
+    """معرف الجلسة من الهيدر أو query (Request أو WebSocket)"""
+    for header in SESSION_HEADERS:
+        value = conn.headers.get(header)
+        if value:
+            return value.strip()
+    for param in SESSION_PARAMS:
+        value = conn.query_params.get(param)
+        if value:
+            return value.strip()
+    return None
+
+
+def get_session(conn: 'HTTPConnection') -> Session:
+    """جلسة الطلب (Request أو WebSocket)"""
+    return session_registry.get(session_id_from(conn))
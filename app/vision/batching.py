@@ -0,0 +1,144 @@
+"""
+تجميع الطلبات المتزامنة في دفعة واحدة - Micro-batching
+
+عدة طلبات (مستخدمين/كاميرات) تصل في نفس الوقت → تُجمع حتى max_batch_size
+أو حتى max_wait_ms → تمرير أمامي واحد (batched forward pass) → توزيع النتائج
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+
+class MicroBatcher:
+    """
+    خادم استنتاج بالدفعات
+
+    Args:
+        run_batch: دالة تأخذ قائمة مدخلات وترجع قائمة نتائج بنفس الترتيب
+        max_batch_size: أكبر عدد فريمات في الدفعة
+        max_wait_ms: أقصى انتظار لاكتمال الدفعة بعد وصول أول طلب
+        group_key: (اختياري) دالة تحدد مفتاح التجميع - المدخلات بمفاتيح مختلفة
+                   لا توضع في نفس الدفعة
+    """
+
+    def __init__(self,
+                 run_batch: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 8,
+                 max_wait_ms: float = 5.0,
+                 name: str = 'batcher',
+                 group_key: Optional[Callable[[Any], Any]] = None):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+        self.group_key = group_key
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        # عدادات الإنتاجية
+        self.batches = 0
+        self.frames = 0
+        self.errors = 0
+        self.forward_time_s = 0.0
+        self._batch_sizes: deque = deque(maxlen=200)
+        self._frame_times: deque = deque(maxlen=500)
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._loop, name=f"{self.name}-worker", daemon=True)
+                self._worker.start()
+
+    def submit(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """إرسال مدخل وانتظار نتيجته (blocking - يُستدعى من threadpool)"""
+        return self.submit_async(item).result(timeout=timeout)
+
+    def submit_async(self, item: Any) -> Future:
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self) -> List:
+        """انتظار أول طلب ثم تجميع الباقي حتى الحجم الأقصى أو انتهاء المهلة"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_s
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            pending = self._collect()
+
+            if self.group_key is None:
+                groups = [pending]
+            else:
+                by_key: Dict[Any, List] = {}
+                for entry in pending:
+                    by_key.setdefault(self.group_key(entry[0]), []).append(entry)
+                groups = list(by_key.values())
+
+            for group in groups:
+                self._run_group(group)
+
+    def _run_group(self, group: List):
+        items = [item for item, _ in group]
+        start = time.perf_counter()
+        try:
+            results = self.run_batch(items)
+            if len(results) != len(items):
+                raise RuntimeError(f"{self.name}: got {len(results)} results for {len(items)} inputs")
+        except Exception as e:
+            with self._stats_lock:
+                self.errors += 1
+            for _, future in group:
+                future.set_exception(e)
+            return
+
+        elapsed = time.perf_counter() - start
+        now = time.perf_counter()
+        with self._stats_lock:
+            self.batches += 1
+            self.frames += len(items)
+            self.forward_time_s += elapsed
+            self._batch_sizes.append(len(items))
+            self._frame_times.extend([now] * len(items))
+
+        for (_, future), result in zip(group, results):
+            future.set_result(result)
+
+    def get_stats(self) -> Dict:
+        """عدادات الإنتاجية"""
+        with self._stats_lock:
+            sizes = list(self._batch_sizes)
+            times = list(self._frame_times)
+            window = (times[-1] - times[0]) if len(times) > 1 else 0.0
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait_s * 1000,
+                'queue_depth': self._queue.qsize(),
+                'batches': self.batches,
+                'frames': self.frames,
+                'errors': self.errors,
+                'avg_batch_size': round(sum(sizes) / len(sizes), 2) if sizes else 0.0,
+                'avg_forward_ms': round(self.forward_time_s / self.batches * 1000, 1) if self.batches else 0.0,
+                'frames_per_sec': round((len(times) - 1) / window, 2) if window > 0 else 0.0,
+            }
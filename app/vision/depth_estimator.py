@@ -3,18 +3,72 @@
 يوفر دقة أعلى بكثير من الطريقة التقريبية القديمة
 """
 
+import os
+import threading
+import time
 import cv2
 import numpy as np
+from dataclasses import dataclass
 from pathlib import Path
+from typing import List, Optional
+
+from app.utils.metrics import timed
+from app.utils.model_registry import model_registry
+from app.utils.sessions import session_registry
+
+from .frame import Frame
+
+# الإبقاء على خريطة العمق بدقتها الأصلية (منخفضة) بدل التكبير bicubic لحجم الصورة
+# الصناديق تُحوّل لإحداثيات خريطة العمق عند حساب المسافة
+DEPTH_NATIVE_RES = os.environ.get('DEPTH_NATIVE_RES', '1') == '1'
+
+# عدد نقاط العينة لكل ضلع داخل كل صندوق (k×k نقطة للوسيط)
+DEPTH_BOX_SAMPLES = 8
+
+# Keyframes: MiDaS يعمل فقط عند تغير المشهد، وإلا نعيد استخدام آخر خريطة
+DEPTH_REUSE_MOTION = float(os.environ.get('DEPTH_REUSE_MOTION', '0.02'))  # نفس حد StationaryDetector
+DEPTH_MAX_AGE_S = float(os.environ.get('DEPTH_MAX_AGE_S', '2.0'))         # حد القِدم
+DEPTH_MAX_REUSE = int(os.environ.get('DEPTH_MAX_REUSE', '15'))            # أقصى إعادة استخدام متتالية
+DEPTH_MAX_KEYFRAMES = 4  # keyframes محفوظة لكل جلسة
+
+
+@dataclass
+class DepthKeyframe:
+    """آخر خريطة عمق محسوبة فعلياً لمشهد معين"""
+    depth_map: np.ndarray
+    thumbnail: np.ndarray  # 160x120 رمادي للمقارنة
+    image_shape: tuple
+    created_at: float
+    reuse_count: int = 0
+
+
+class DepthKeyframes:
+    """keyframes جلسة واحدة - خريطة عمق مستخدم لا تُعاد أبداً لفريم مستخدم آخر"""
+
+    def __init__(self, max_keyframes: int = DEPTH_MAX_KEYFRAMES):
+        self.max_keyframes = max_keyframes
+        self.items: List[DepthKeyframe] = []
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
 
 class DepthEstimator:
-    def __init__(self):
+    def __init__(self, native_resolution: bool = DEPTH_NATIVE_RES):
         self.model = None
         self.transform = None
-        self.load_model()
+        self.native_resolution = native_resolution
+        
+        # سياسة keyframes (هذه للجلسة الافتراضية؛ كل جلسة لها session.depth)
+        self.keyframes = DepthKeyframes()
+        # عدادات عامة تُزاد تحت أقفال جلسات مختلفة - قفل خاص بها
+        self.keyframe_hits = 0
+        self.keyframe_misses = 0
+        self._stats_lock = threading.Lock()
     
     def load_model(self):
-        """تحميل نموذج MiDaS Small (سريع ودقيق)"""
+        """تحميل نموذج MiDaS Small (سريع ودقيق) - عبر model_registry عند أول استخدام"""
         try:
             import torch
             
@@ -29,37 +83,37 @@ class DepthEstimator:
         except Exception as e:
             print(f"⚠️ Depth Estimator not available: {e}")
             print("   المسافات ستُحسب بالطريقة التقريبية")
+        return self.model
     
-    def estimate_depth(self, image_bytes):
-        """تقدير خريطة العمق من صورة"""
-        if self.model is None:
+    @timed('midas')
+    def estimate_depth(self, image):
+        """تقدير خريطة العمق من صورة (Frame أو bytes أو numpy BGR)"""
+        if model_registry.get('midas') is None:
             return None
         
         try:
             import torch
             
-            # تحويل bytes لصورة
-            arr = np.frombuffer(image_bytes, np.uint8)
-            img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-            
-            if img is None:
+            frame = Frame.ensure(image)
+            if frame is None:
                 return None
+            img = frame.bgr
             
-            # تحويل لـ RGB
-            img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            
-            # تحويل للنموذج
-            input_batch = self.transform(img_rgb)
+            # تحويل للنموذج (عرض RGB مشترك مع باقي المكونات)
+            input_batch = self.transform(frame.rgb)
             
             # الاستنتاج
             with torch.no_grad():
                 prediction = self.model(input_batch)
-                prediction = torch.nn.functional.interpolate(
-                    prediction.unsqueeze(1),
-                    size=img.shape[:2],
-                    mode="bicubic",
-                    align_corners=False,
-                ).squeeze()
+                if self.native_resolution:
+                    prediction = prediction.squeeze()
+                else:
+                    prediction = torch.nn.functional.interpolate(
+                        prediction.unsqueeze(1),
+                        size=img.shape[:2],
+                        mode="bicubic",
+                        align_corners=False,
+                    ).squeeze()
             
             depth_map = prediction.cpu().numpy()
             
@@ -69,8 +123,120 @@ class DepthEstimator:
             print(f"⚠️ Depth estimation error: {e}")
             return None
     
+    def estimate_depth_keyframed(self, image, keyframes: Optional[DepthKeyframes] = None):
+        """
+        تقدير العمق مع إعادة استخدام keyframe:
+        إذا الحركة منذ آخر keyframe لنفس المشهد أقل من الحد، ولم يتجاوز
+        القِدم/عدد الإعادات → نرجع الخريطة السابقة بدون تشغيل MiDaS
+
+        keyframes: keyframes الجلسة (session.depth) - الافتراضي keyframes الجلسة الافتراضية
+        """
+        keyframes = self.keyframes if keyframes is None else keyframes
+        if model_registry.get('midas') is None:
+            return None
+        
+        frame = Frame.ensure(image)
+        if frame is None:
+            return None
+        
+        thumb = frame.thumbnail_gray
+        now = time.monotonic()
+        
+        with keyframes.lock:
+            for kf in keyframes.items:
+                if kf.image_shape != frame.shape[:2]:
+                    continue
+                if now - kf.created_at > DEPTH_MAX_AGE_S or kf.reuse_count >= DEPTH_MAX_REUSE:
+                    continue
+                # مقارنة مع الـ keyframe (وليس الفريم السابق) لتجنب تراكم الانجراف
+                motion = float(np.mean(cv2.absdiff(kf.thumbnail, thumb))) / 255.0
+                if motion < DEPTH_REUSE_MOTION:
+                    kf.reuse_count += 1
+                    with self._stats_lock:
+                        self.keyframe_hits += 1
+                    return kf.depth_map
+        with self._stats_lock:
+            self.keyframe_misses += 1
+        
+        depth_map = self.estimate_depth(frame)
+        if depth_map is None:
+            return None
+        
+        with keyframes.lock:
+            # استبدال keyframes القديمة أو المنتهية لنفس المشهد
+            keyframes.items = [
+                kf for kf in keyframes.items
+                if now - kf.created_at <= DEPTH_MAX_AGE_S and kf.reuse_count < DEPTH_MAX_REUSE
+            ]
+            keyframes.items.insert(0, DepthKeyframe(
+                depth_map=depth_map,
+                thumbnail=thumb,
+                image_shape=frame.shape[:2],
+                created_at=now
+            ))
+            del keyframes.items[keyframes.max_keyframes:]
+        
+        return depth_map
+    
+    def get_stats(self) -> dict:
+        """عدادات إعادة استخدام العمق"""
+        with self._stats_lock:
+            hits, misses = self.keyframe_hits, self.keyframe_misses
+        total = hits + misses
+        return {
+            'available': self.model is not None,
+            'native_resolution': self.native_resolution,
+            'keyframe_hits': hits,
+            'keyframe_misses': misses,
+            'hit_rate': round(hits / total, 3) if total else 0.0,
+            'default_session_keyframes': len(self.keyframes),
+        }
+    
+    def get_object_distances(self, depth_map, bboxes, image_shape=None) -> np.ndarray:
+        """
+        حساب مسافات كل الصناديق دفعة واحدة (vectorized - بدون حلقة Python)
+
+        Args:
+            depth_map: خريطة العمق (بدقتها الأصلية أو بحجم الصورة)
+            bboxes: (N, 4) xyxy بإحداثيات الصورة
+            image_shape: (h, w) للصورة التي تنتمي لها الصناديق - لتحويلها لإحداثيات الخريطة
+
+        Returns:
+            np.ndarray (N,) بالأمتار، NaN للصناديق غير الصالحة
+        """
+        boxes = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+        n = boxes.shape[0]
+        if depth_map is None or n == 0:
+            return np.full(n, np.nan, dtype=np.float32)
+
+        dh, dw = depth_map.shape[:2]
+        if image_shape is not None and tuple(image_shape[:2]) != (dh, dw):
+            sy, sx = dh / image_shape[0], dw / image_shape[1]
+            boxes = boxes * np.array([sx, sy, sx, sy], dtype=np.float32)
+
+        x1 = np.clip(np.floor(boxes[:, 0]), 0, dw).astype(np.int32)
+        y1 = np.clip(np.floor(boxes[:, 1]), 0, dh).astype(np.int32)
+        x2 = np.clip(np.ceil(boxes[:, 2]), 0, dw).astype(np.int32)
+        y2 = np.clip(np.ceil(boxes[:, 3]), 0, dh).astype(np.int32)
+        valid = (x2 > x1) & (y2 > y1)
+
+        # شبكة k×k نقطة موزعة داخل كل صندوق → (N, k, k) ثم وسيط لكل صندوق
+        t = (np.arange(DEPTH_BOX_SAMPLES, dtype=np.float32) + 0.5) / DEPTH_BOX_SAMPLES
+        xs = (x1[:, None] + t[None, :] * (x2 - x1)[:, None]).astype(np.int32)
+        ys = (y1[:, None] + t[None, :] * (y2 - y1)[:, None]).astype(np.int32)
+        xs = np.clip(xs, 0, dw - 1)
+        ys = np.clip(ys, 0, dh - 1)
+        samples = depth_map[ys[:, :, None], xs[:, None, :]].reshape(n, -1)
+
+        median_depth = np.median(samples, axis=1)
+
+        # MiDaS يعطي inverse depth نسبي - نفس المعايرة التجريبية
+        distances = np.clip(10.0 / (median_depth + 0.1), 0.3, 20.0).astype(np.float32)
+        distances[~valid] = np.nan
+        return distances
+
     def get_object_distance(self, depth_map, bbox):
-        """حساب مسافة شيء من خريطة العمق"""
+        """حساب مسافة شيء من خريطة العمق (خريطة بحجم الصورة)"""
         if depth_map is None:
             return None
         
@@ -110,3 +276,5 @@ class DepthEstimator:
 
 # إنشاء instance عام
 depth_estimator = DepthEstimator()
+model_registry.register('midas', depth_estimator.load_model)
+session_registry.register('depth', lambda session_id: DepthKeyframes(), default=depth_estimator.keyframes)
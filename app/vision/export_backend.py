@@ -0,0 +1,126 @@
+"""
+تصدير YOLO-World لكاشف ثابت وتشغيله بـ ONNX Runtime / OpenVINO (CPU)
+
+بما أن CUSTOM_CLASSES ثابتة عند التشغيل، نخبز (bake) تضمينات النصوص للمفردات
+داخل نموذج ثابت، ثم نصدره:
+- onnx      → ONNX Runtime (اختيارياً INT8 dynamic quantization)
+- openvino  → OpenVINO IR (اختيارياً INT8)
+
+اسم الملف المصدر يحتوي بصمة المفردات، فأي تغيير في CUSTOM_CLASSES يؤدي
+لتصدير جديد تلقائياً بدلاً من استخدام نموذج قديم بأسماء خاطئة.
+
+الاستخدام من سطر الأوامر:
+    python -m app.vision.export_backend --backend onnx --int8
+"""
+
+import hashlib
+import shutil
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+EXPORT_BACKENDS = ('onnx', 'openvino')
+
+
+def vocabulary_hash(classes: List[str]) -> str:
+    """بصمة قصيرة للمفردات (الترتيب مهم - يحدد أرقام الفئات)"""
+    return hashlib.sha1('|'.join(classes).encode('utf-8')).hexdigest()[:10]
+
+
+def exported_model_path(pt_path: Path, classes: List[str], backend: str, int8: bool = False) -> Path:
+    """مسار النموذج المصدر لهذه المفردات"""
+    suffix = '-int8' if int8 else ''
+    stem = f"{pt_path.stem}-{vocabulary_hash(classes)}{suffix}"
+    if backend == 'onnx':
+        return pt_path.with_name(f"{stem}.onnx")
+    return pt_path.with_name(f"{stem}_openvino_model")
+
+
+def export_static_detector(pt_path: Path, classes: List[str], backend: str = 'onnx',
+                           int8: bool = False) -> Path:
+    """
+    تصدير كاشف ثابت بالمفردات المخبوزة
+
+    Returns:
+        Path: مسار النموذج المصدر
+    """
+    if backend not in EXPORT_BACKENDS:
+        raise ValueError(f"Unknown export backend: {backend}")
+
+    from ultralytics import YOLO
+
+    target = exported_model_path(pt_path, classes, backend, int8)
+    if target.exists():
+        return target
+
+    print(f"⏳ Exporting YOLO-World ({len(classes)} classes) to {backend}{' INT8' if int8 else ''}...")
+    model = YOLO(str(pt_path))
+    model.set_classes(classes)
+
+    if backend == 'onnx':
+        # dynamic=True: يسمح بالدفعات (micro-batching) وأحجام صور مختلفة
+        exported = Path(model.export(format='onnx', dynamic=True, simplify=True))
+        if int8:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            quantize_dynamic(str(exported), str(target), weight_type=QuantType.QUInt8)
+            exported.unlink(missing_ok=True)
+        else:
+            shutil.move(str(exported), str(target))
+    else:
+        exported = Path(model.export(format='openvino', dynamic=True, int8=int8))
+        if target.exists():
+            shutil.rmtree(target)
+        shutil.move(str(exported), str(target))
+
+    print(f"✅ Exported static detector: {target.name}")
+    return target
+
+
+def load_exported_detector(pt_path: Path, classes: List[str], backend: str = 'auto',
+                           int8: bool = False) -> Tuple[Optional[object], str]:
+    """
+    تحميل الكاشف المصدر إن أمكن
+
+    - auto     : يستخدم تصديراً موجوداً (onnx ثم openvino) بدون تصدير جديد
+    - onnx / openvino : يصدر عند أول تشغيل إذا لم يكن موجوداً
+
+    Returns:
+        (model, backend_name) - أو (None, 'torch') للرجوع لنموذج .pt
+    """
+    try:
+        from ultralytics import YOLO
+    except ImportError:
+        return None, 'torch'
+
+    candidates = EXPORT_BACKENDS if backend == 'auto' else (backend,)
+
+    for name in candidates:
+        try:
+            path = exported_model_path(pt_path, classes, name, int8)
+            if not path.exists():
+                if backend == 'auto':
+                    continue
+                path = export_static_detector(pt_path, classes, name, int8)
+
+            model = YOLO(str(path), task='detect')
+            names = list(model.names.values()) if isinstance(model.names, dict) else list(model.names)
+            if names != list(classes):
+                print(f"⚠️ Exported {name} model vocabulary mismatch - ignoring {path.name}")
+                continue
+            return model, name
+        except Exception as e:
+            print(f"⚠️ {name} backend unavailable, falling back: {e}")
+
+    return None, 'torch'
+
+
+if __name__ == '__main__':
+    import argparse
+    from .model import MODELDIR, CUSTOM_CLASSES
+
+    parser = argparse.ArgumentParser(description='Export YOLO-World as a static CPU detector')
+    parser.add_argument('--backend', choices=EXPORT_BACKENDS, default='onnx')
+    parser.add_argument('--int8', action='store_true', help='INT8 quantization')
+    parser.add_argument('--weights', default=str(MODELDIR / 'yolov8s-worldv2.pt'))
+    args = parser.parse_args()
+
+    export_static_detector(Path(args.weights), CUSTOM_CLASSES, args.backend, args.int8)
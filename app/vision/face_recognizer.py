@@ -1,15 +1,146 @@
 
 import face_recognition
+import io
+import json
 import os
+import threading
+import time
+from typing import Optional
+
 import cv2
 import numpy as np
 import logging
 
+from app.utils.metrics import timed
+
+FACE_ENCODING_DIM = 128
+FACE_TOLERANCE = 0.6  # نفس tolerance الخاص بـ compare_faces
+FACE_CROP_PAD = 0.1  # هامش حول صندوق الشخص قبل كشف الوجه
+FACE_MIN_CROP = 20  # قصاصة أصغر من هذا (بكسل) لا تحتوي وجهاً قابلاً للتعرف
+FACE_MAX_CROPS = int(os.environ.get('FACE_MAX_CROPS', '4'))  # حد التشفير لكل فريم
+
+FACE_IMAGE_EXTS = ('.jpg', '.jpeg', '.png')
+# الفهرس: سطر أول {'matrix': ملف المصفوفة}، ثم سطر JSON لكل وجه بترتيب الصفوف
+ENCODINGS_INDEX = 'encodings.jsonl'
+ENCODINGS_MATRIX_PREFIX = 'encodings-'  # + رقم الجيل + '.f32': صفوف float32 خام (N × 128)
+_ROW_BYTES = FACE_ENCODING_DIM * 4
+
+
+class EncodingStore:
+    """
+    encodings الوجوه المعروفة على القرص بجانب الصور:
+    - المصفوفة ملف float32 خام يُفتح mmap (بدون فك أو CNN عند بدء التشغيل)
+    - الفهرس JSONL: {name, file, mtime_ns, size} لكل صف بنفس الترتيب
+    - إضافة وجه = كتابة صف في نهاية المصفوفة ثم سطر في نهاية الفهرس (O(1))؛
+      السطر هو نقطة الالتزام - صف بدون سطر (انقطاع بين الكتابتين) يُتجاهل ويُكتب فوقه
+    - إعادة الكتابة الكاملة (بدء التشغيل، استبدال صورة موجودة) لملف مصفوفة جديد،
+      ثم استبدال الفهرس ذرياً (os.replace) ليشير إليه
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index_path = os.path.join(directory, ENCODINGS_INDEX)
+        self.matrix_file: Optional[str] = None
+        self.matrix = np.empty((0, FACE_ENCODING_DIM), dtype=np.float32)
+        self.entries: list = []
+        self._files: set = set()
+        self.lock = threading.RLock()
+
+    def _map(self, rows: int) -> np.ndarray:
+        if rows == 0:
+            return np.empty((0, FACE_ENCODING_DIM), dtype=np.float32)
+        return np.memmap(os.path.join(self.directory, self.matrix_file), dtype=np.float32,
+                         mode='r', shape=(rows, FACE_ENCODING_DIM))
+
+    def load(self) -> bool:
+        """قراءة الفهرس والمصفوفة (False = غير موجود أو تالف)"""
+        with self.lock:
+            try:
+                with open(self.index_path, 'r+b') as f:
+                    data = f.read()
+                    committed = data[:data.rfind(b'\n') + 1]
+                    if len(committed) != len(data):
+                        # آخر سطر مقطوع (انقطاع أثناء الإضافة): الوجه لم يُلتزم - يُحذف
+                        # حتى لا تلتصق به الإضافة التالية
+                        f.truncate(len(committed))
+                lines = [line for line in committed.decode('utf-8').split('\n') if line.strip()]
+                matrix_file = json.loads(lines[0])['matrix']
+                entries = [json.loads(line) for line in lines[1:]]
+                rows = os.path.getsize(os.path.join(self.directory, matrix_file)) // _ROW_BYTES
+            except FileNotFoundError:
+                return False
+            except (OSError, ValueError, KeyError, IndexError, TypeError) as e:
+                print(f"⚠️ Face encoding store unreadable ({e}), rebuilding")
+                return False
+            if rows < len(entries):
+                print("⚠️ Face encoding store out of sync, rebuilding")
+                return False
+            self.matrix_file, self.entries = matrix_file, entries
+            self._files = {e['file'] for e in entries}
+            self.matrix = self._map(len(entries))
+            return True
+
+    def replace_all(self, encodings: list, entries: list):
+        matrix = np.ascontiguousarray(np.asarray(encodings, dtype=np.float32).reshape(-1, FACE_ENCODING_DIM))
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            old = self.matrix_file
+            self.matrix_file = f"{ENCODINGS_MATRIX_PREFIX}{time.time_ns()}.f32"
+            with open(os.path.join(self.directory, self.matrix_file), 'wb') as f:
+                f.write(matrix.tobytes())
+            tmp = self.index_path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'matrix': self.matrix_file}) + '\n')
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            os.replace(tmp, self.index_path)
+            if old and old != self.matrix_file:
+                try:
+                    os.remove(os.path.join(self.directory, old))
+                except OSError:
+                    pass
+            self.entries = list(entries)
+            self._files = {e['file'] for e in self.entries}
+            self.matrix = self._map(len(self.entries))
+
+    def put(self, entry: dict, encoding: np.ndarray):
+        """
+        إضافة وجه: صف + سطر في نهاية الملفين (O(1)) - بدون إعادة كتابة الباقي.
+        استبدال صورة موجودة (نفس الملف) فقط يعيد كتابة المخزن
+        """
+        row = np.asarray(encoding, dtype=np.float32).reshape(FACE_ENCODING_DIM)
+        with self.lock:
+            if entry['file'] in self._files or self.matrix_file is None:
+                keep = [i for i, e in enumerate(self.entries) if e['file'] != entry['file']]
+                rows = np.asarray(self.matrix)[keep].tolist() + [row]
+                self.replace_all(rows, [self.entries[i] for i in keep] + [entry])
+                return
+            path = os.path.join(self.directory, self.matrix_file)
+            with open(path, 'r+b') as f:
+                f.seek(len(self.entries) * _ROW_BYTES)  # فوق أي صف غير ملتزم
+                f.write(row.tobytes())
+                f.truncate()
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self.entries.append(entry)
+            self._files.add(entry['file'])
+            self.matrix = self._map(len(self.entries))
+
+    @staticmethod
+    def signature(path: str) -> dict:
+        st = os.stat(path)
+        return {'mtime_ns': st.st_mtime_ns, 'size': st.st_size}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
 class FaceRecognizer:
     def __init__(self, faces_dir: str = "/code/app/data/faces"):
         self.faces_dir = faces_dir
-        self.known_face_encodings = []
-        self.known_face_names = []
+        # (المصفوفة، الأسماء) معاً في إسناد واحد - القارئ لا يرى مصفوفة جديدة بأسماء قديمة
+        self._index = (np.empty((0, FACE_ENCODING_DIM), dtype=np.float32), [])
+        self.store = EncodingStore(self.faces_dir)
         
         # Ensure directory exists
         if not os.path.exists(self.faces_dir):
@@ -21,90 +152,172 @@ class FaceRecognizer:
         self.load_known_faces()
 
     def load_known_faces(self):
-        """Loads all valid face images from the faces directory."""
-        self.known_face_encodings = []
-        self.known_face_names = []
-        
+        """
+        الوجوه المعروفة من مخزن الـ encodings؛ فقط الصور الجديدة/المعدلة تُشفّر
+        (والمحذوفة تُزال). بدء التشغيل لا يشغل CNN على كل المعرض.
+        """
+        with self.store.lock:
+            self._load_known_faces()
+        print(f"Total faces loaded: {len(self.known_face_names)}")
+
+    def _load_known_faces(self):
         if not os.path.exists(self.faces_dir):
             # logging.warning(f"Faces directory {self.faces_dir} not found.")
+            self._rebuild_index()
             return
 
-        print(f"Loading faces from {self.faces_dir}...")
-        for filename in os.listdir(self.faces_dir):
-            if filename.lower().endswith(('.jpg', '.jpeg', '.png')):
-                try:
-                    path = os.path.join(self.faces_dir, filename)
-                    name = os.path.splitext(filename)[0]
-                    
-                    # Load and encode
-                    image = face_recognition.load_image_file(path)
-                    encodings = face_recognition.face_encodings(image)
-                    
-                    if encodings:
-                        self.known_face_encodings.append(encodings[0])
-                        self.known_face_names.append(name)
-                        print(f"Loaded face: {name}")
-                    else:
-                        print(f"No face found in {filename}")
-                except Exception as e:
-                    print(f"Error loading face {filename}: {e}")
-        
-        print(f"Total faces loaded: {len(self.known_face_names)}")
+        self.store.load()
+        files = sorted(f for f in os.listdir(self.faces_dir) if f.lower().endswith(FACE_IMAGE_EXTS))
+        current = {e['file']: i for i, e in enumerate(self.store.entries)}
+
+        rows, entries, changed = [], [], False
+        for filename in files:
+            path = os.path.join(self.faces_dir, filename)
+            try:
+                signature = EncodingStore.signature(path)
+            except OSError:
+                continue
+            i = current.get(filename)
+            if i is not None and all(self.store.entries[i].get(k) == v for k, v in signature.items()):
+                rows.append(self.store.matrix[i])
+                entries.append(self.store.entries[i])
+                continue
+
+            changed = True
+            try:
+                # Load and encode (new or modified image only)
+                image = face_recognition.load_image_file(path)
+                encodings = face_recognition.face_encodings(image)
+                if encodings:
+                    rows.append(encodings[0])
+                    entries.append({'name': os.path.splitext(filename)[0], 'file': filename, **signature})
+                    print(f"Encoded face: {filename}")
+                else:
+                    print(f"No face found in {filename}")
+            except Exception as e:
+                print(f"Error loading face {filename}: {e}")
+
+        if changed or len(entries) != len(self.store):
+            try:
+                self.store.replace_all(rows, entries)
+            except OSError as e:
+                print(f"⚠️ Could not persist face encodings: {e}")
+                self.store.matrix = np.asarray(rows, dtype=np.float32).reshape(-1, FACE_ENCODING_DIM)
+                self.store.entries = entries
+
+        self._rebuild_index()
 
     def register_face(self, name: str, image_bytes: bytes) -> bool:
-        """Saves a new face image and reloads encodings."""
+        """Encodes the new face, saves its image and appends it to the store (other faces are untouched)."""
         try:
-            file_path = os.path.join(self.faces_dir, f"{name}.jpg")
-            
-            # Write bytes to file
-            with open(file_path, "wb") as f:
-                f.write(image_bytes)
-            
-            # Verify if it has a face
-            image = face_recognition.load_image_file(file_path)
+            # Verify it has a face before writing anything
+            image = face_recognition.load_image_file(io.BytesIO(image_bytes))
             encodings = face_recognition.face_encodings(image)
-            
             if not encodings:
-                os.remove(file_path)
                 return False
-                
-            # Reload to update memory
-            self.load_known_faces()
+
+            filename = f"{name}.jpg"
+            file_path = os.path.join(self.faces_dir, filename)
+            tmp = file_path + '.tmp'
+            with open(tmp, "wb") as f:
+                f.write(image_bytes)
+            os.replace(tmp, file_path)
+
+            # LEARN_FACE في threadpool: تسجيلان متزامنان لا يفقدان صفاً
+            with self.store.lock:
+                self.store.put({'name': name, 'file': filename, **EncodingStore.signature(file_path)}, encodings[0])
+                self._rebuild_index()
             return True
         except Exception as e:
             print(f"Failed to register face {name}: {e}")
             return False
 
+    def _rebuild_index(self):
+        """المصفوفة (N, 128) من المخزن (mmap) - بحث أقرب جار بعملية واحدة"""
+        with self.store.lock:
+            self._index = (self.store.matrix, [e['name'] for e in self.store.entries])
+
+    @property
+    def known_matrix(self) -> np.ndarray:
+        return self._index[0]
+
+    @property
+    def known_face_names(self) -> list:
+        return self._index[1]
+
+    @property
+    def known_face_encodings(self) -> np.ndarray:
+        return self._index[0]
+
+    def match_encodings(self, encodings) -> list:
+        """
+        أقرب وجه معروف لكل encoding (vectorized): مسافة إقليدية لكل الأزواج
+        دفعة واحدة بدل compare_faces + face_distance لكل وجه.
+        Returns: اسم لكل encoding أو "Unknown" (مسافة > FACE_TOLERANCE)
+        """
+        encodings = np.asarray(encodings, dtype=np.float64).reshape(-1, FACE_ENCODING_DIM)
+        known_matrix, known_names = self._index
+        if not len(encodings) or not len(known_matrix):
+            return ["Unknown"] * len(encodings)
+        distances = np.linalg.norm(encodings[:, None, :] - known_matrix[None, :, :], axis=2)
+        best = np.argmin(distances, axis=1)
+        best_distance = distances[np.arange(len(encodings)), best]
+        return [known_names[i] if d <= FACE_TOLERANCE else "Unknown"
+                for i, d in zip(best, best_distance)]
+
+    def _encode_crop(self, image_numpy: np.ndarray, box) -> list:
+        """وجه واحد (الأكبر) داخل صندوق الشخص - face_locations على القصاصة فقط"""
+        h, w = image_numpy.shape[:2]
+        x1, y1, x2, y2 = box
+        pad_x, pad_y = (x2 - x1) * FACE_CROP_PAD, (y2 - y1) * FACE_CROP_PAD
+        x1, y1 = max(0, int(x1 - pad_x)), max(0, int(y1 - pad_y))
+        x2, y2 = min(w, int(x2 + pad_x)), min(h, int(y2 + pad_y))
+        if x2 - x1 < FACE_MIN_CROP or y2 - y1 < FACE_MIN_CROP:
+            return []
+        crop = np.ascontiguousarray(image_numpy[y1:y2, x1:x2])
+        locations = face_recognition.face_locations(crop)
+        if not locations:
+            return []
+        largest = max(locations, key=lambda loc: (loc[2] - loc[0]) * (loc[1] - loc[3]))
+        return face_recognition.face_encodings(crop, [largest])
+
+    @timed('face')
+    def identify_person_boxes(self, image_numpy: np.ndarray, boxes) -> list:
+        """
+        اسم لكل صندوق شخص (xyxy بإحداثيات الصورة): اسم معروف، "Unknown"، أو None
+        (لا وجه، أو تجاوز حد FACE_MAX_CROPS). كشف الوجه داخل قصاصة الصندوق فقط، ثم
+        بحث أقرب جار دفعة واحدة. بدون حالة: ذاكرة الهوية على مسارات الجلسة (tracker)
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        names = [None] * len(boxes)
+        if not self.known_face_names or not len(boxes):
+            return names
+
+        # الأكبر (الأقرب) أولاً حتى حد FACE_MAX_CROPS
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        pending = list(np.argsort(-areas))[:FACE_MAX_CROPS]
+        encoded, encodings = [], []
+        for i in pending:
+            crop_encodings = self._encode_crop(image_numpy, boxes[i])
+            if crop_encodings:
+                encoded.append(i)
+                encodings.append(crop_encodings[0])
+        for i, name in zip(encoded, self.match_encodings(encodings)):
+            names[i] = name
+        return names
+
     def identify_faces(self, image_numpy: np.ndarray) -> list:
         """
-        Identifies faces in the provided RGB numpy image.
+        Identifies faces in the provided RGB numpy image (whole frame).
         Returns a list of names found (e.g., ['Ahmed', 'Unknown']).
         """
-        if not self.known_face_encodings:
+        if not self.known_face_names:
             return []
-
-        # Find faces in the frame
-        # We assume image_numpy is RGB. If BGR (from cv2), convert it?
-        # Typically YOLO/Detector passes RGB. We'll ensure that.
-        
         face_locations = face_recognition.face_locations(image_numpy)
         face_encodings = face_recognition.face_encodings(image_numpy, face_locations)
+        return self.match_encodings(face_encodings)
 
-        found_names = []
-        
-        for face_encoding in face_encodings:
-            # See if the face is a match for the known face(s)
-            matches = face_recognition.compare_faces(self.known_face_encodings, face_encoding, tolerance=0.6)
-            name = "Unknown"
-
-            # Use the known face with the smallest distance to the new face
-            face_distances = face_recognition.face_distance(self.known_face_encodings, face_encoding)
-            
-            if len(face_distances) > 0:
-                best_match_index = np.argmin(face_distances)
-                if matches[best_match_index]:
-                    name = self.known_face_names[best_match_index]
-
-            found_names.append(name)
-            
-        return found_names
+    def get_stats(self) -> dict:
+        return {
+            'known_faces': len(self.known_face_names),
+        }
@@ -0,0 +1,119 @@
+"""
+إطار الصورة المشترك - Decode-once Frame
+
+الصورة تُفك (imdecode) مرة واحدة فقط لكل طلب، ثم تُشتق منها العروض المطلوبة
+بشكل كسول (مرة واحدة عند أول استخدام):
+- bgr       : المصفوفة الأصلية
+- rgb       : للنماذج التي تتوقع RGB (MiDaS, face_recognition)
+- gray      : رمادي (OCR, تحليل الخطوط)
+- resized() : نسخة مصغرة للاستنتاج (تُرجع Frame بدورها)
+- thumbnail : 160x120 لتحليل الحركة
+- dhash     : بصمة إدراكية 64-bit (كاش الفريمات شبه المتطابقة)
+
+كل مكونات الرؤية تقبل Frame مباشرة (أو bytes للتوافق مع الكود القديم)
+"""
+
+from functools import cached_property
+from typing import Dict, Optional, Union
+
+import cv2
+import numpy as np
+
+THUMBNAIL_SIZE = (160, 120)
+DHASH_SIZE = 8  # 8x8 = 64 بت
+
+ImageInput = Union['Frame', bytes, bytearray, memoryview, np.ndarray, None]
+
+
+class Frame:
+    """صورة مفكوكة مرة واحدة مع عروض مشتقة كسولة"""
+
+    def __init__(self, bgr: np.ndarray, data: Optional[bytes] = None):
+        self.bgr = bgr
+        self.data = data  # البايتات الأصلية (إن وجدت) - لتجنب إعادة الترميز
+        self._resized: Dict[int, 'Frame'] = {}
+
+    # ======== Construction ========
+
+    @classmethod
+    def from_bytes(cls, image_bytes) -> Optional['Frame']:
+        """فك تشفير JPEG/PNG مرة واحدة"""
+        if image_bytes is None or len(image_bytes) == 0:
+            return None
+        arr = np.frombuffer(image_bytes, np.uint8)
+        img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
+        if img is None:
+            return None
+        return cls(img, data=image_bytes)
+
+    @classmethod
+    def ensure(cls, image: ImageInput) -> Optional['Frame']:
+        """تحويل أي مدخل (Frame / bytes / numpy BGR) إلى Frame"""
+        if image is None:
+            return None
+        if isinstance(image, Frame):
+            return image
+        if isinstance(image, np.ndarray):
+            return cls(image)
+        return cls.from_bytes(image)
+
+    # ======== Geometry ========
+
+    @property
+    def shape(self):
+        return self.bgr.shape
+
+    @property
+    def height(self) -> int:
+        return self.bgr.shape[0]
+
+    @property
+    def width(self) -> int:
+        return self.bgr.shape[1]
+
+    # ======== Lazy views ========
+
+    @cached_property
+    def rgb(self) -> np.ndarray:
+        return cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB)
+
+    @cached_property
+    def gray(self) -> np.ndarray:
+        return cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+
+    @cached_property
+    def thumbnail(self) -> np.ndarray:
+        return cv2.resize(self.bgr, THUMBNAIL_SIZE)
+
+    @cached_property
+    def thumbnail_gray(self) -> np.ndarray:
+        return cv2.cvtColor(self.thumbnail, cv2.COLOR_BGR2GRAY)
+
+    @cached_property
+    def dhash(self) -> int:
+        """difference hash: 9x8 رمادي، بت لكل بكسل أفتح من جاره الأيسر"""
+        small = cv2.resize(self.thumbnail_gray, (DHASH_SIZE + 1, DHASH_SIZE), interpolation=cv2.INTER_AREA)
+        bits = np.packbits(small[:, 1:] > small[:, :-1])
+        return int.from_bytes(bits.tobytes(), 'big')
+
+    def resized(self, max_width: int) -> 'Frame':
+        """
+        نسخة مصغرة بعرض max_width (مع الحفاظ على النسبة)
+        إذا الصورة أصغر أصلاً ترجع نفس الـ Frame
+        """
+        if self.width <= max_width:
+            return self
+        if max_width not in self._resized:
+            scale = max_width / self.width
+            new_size = (max_width, int(self.height * scale))
+            self._resized[max_width] = Frame(
+                cv2.resize(self.bgr, new_size, interpolation=cv2.INTER_LINEAR)
+            )
+        return self._resized[max_width]
+
+    def to_bytes(self, ext: str = '.jpg') -> bytes:
+        """البايتات الأصلية إن وجدت، وإلا ترميز (نادراً ما نحتاجه)"""
+        if self.data is not None:
+            return bytes(self.data)
+        ok, encoded = cv2.imencode(ext, self.bgr)
+        return encoded.tobytes() if ok else b''
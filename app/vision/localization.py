@@ -0,0 +1,223 @@
+"""
+ترجمة أسماء الفئات - Offline Localization
+
+- جداول محسوبة مسبقاً لكل فئات CUSTOM_CLASSES بالعربية والإنجليزية والدنماركية
+  (تُحمّل مرة واحدة مع الـ module - بحث dict فقط)
+- الاتجاه العكسي (to_class): اسم عربي/دنماركي من أمر البحث → فئة إنجليزية للكاشف
+- مخزن دائم على القرص للأسماء الديناميكية (أسماء الوجوه، فئات البحث الإضافية)
+  يبقى بعد إعادة التشغيل
+- localize() لا تقوم بأي اتصال شبكي أبداً: الاسم غير المعروف يُرجع كما هو
+  ويُسجل كـ "مفقود"؛ الترجمة الآلية (اختيارية LOCALIZATION_ONLINE=1) تعمل في
+  thread خلفي خارج detect() وتُحفظ في المخزن للطلبات القادمة
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+SUPPORTED_LANGS = ('ar', 'en', 'da')
+TRANSLATIONS_PATH = Path(__file__).resolve().parents[1] / 'data' / 'localization' / 'translations.json'
+
+# ترجمة آلية في الخلفية للأسماء المفقودة (deep-translator، شبكة) - معطلة افتراضياً
+LOCALIZATION_ONLINE = os.environ.get('LOCALIZATION_ONLINE', '0') == '1'
+MAX_MISSING = 1000  # حد سجل الأسماء المفقودة
+
+# Arabic Translations - Robust Mapping
+ARABIC_NAMES = {
+    'door': 'باب', 'open door': 'باب مفتوح', 'closed door': 'باب مغلق',
+    'wooden door': 'باب', 'glass door': 'باب زجاجي', 'white door': 'باب',
+    'stairs': 'درج', 'staircase': 'درج', 'steps': 'عوائق', 'elevator': 'مصعد', 'escalator': 'سلم كهربائي',
+    'hole': 'حفرة', 'hole in ground': 'حفرة', 'pothole': 'حفرة',
+    'obstacle': 'عائق',
+    'wall': 'جدار', 'brick wall': 'جدار', 'concrete wall': 'جدار', 'white wall': 'جدار',
+    'corner': 'زاوية', 'hallway': 'ممر',
+    'person': 'شخص', 'child': 'طفل', 'man': 'رجل', 'woman': 'امرأة',
+    'car': 'سيارة', 'truck': 'شاحنة', 'bus': 'باص',
+    'bicycle': 'دراجة', 'motorcycle': 'موتور',
+    'chair': 'كرسي', 'armchair': 'كرسي', 'wheelchair': 'كرسي متحرك',
+    'table': 'طاولة', 'desk': 'مكتب', 'dining table': 'طاولة طعام',
+    'couch': 'كنبة', 'sofa': 'كنبة', 'bed': 'سرير',
+    'tv': 'شاشة', 'monitor': 'شاشة', 'screen': 'شاشة',
+    'laptop': 'لابتوب', 'computer': 'كمبيوتر',
+    'trash can': 'سلة مهملات', 'bin': 'سلة',
+    'refrigerator': 'ثلاجة', 'fridge': 'ثلاجة',
+    'cabinet': 'خزانة', 'closet': 'دولاب',
+    'shelf': 'رف', 'bookcase': 'مكتبة',
+    'sink': 'مغسلة', 'toilet': 'حمام', 'mirror': 'مرآة',
+    'keys': 'مفاتيح', 'wallet': 'محفظة', 'phone': 'جوال',
+    'bottle': 'قارورة', 'cup': 'كوب', 'glass': 'كأس', 'remote': 'ريموت',
+    'lamp': 'مصباح', 'light': 'إضاءة', 'ceiling fan': 'مروحة سقف',
+    # أشياء يبحث عنها المستخدم (FIND) خارج المفردات الأساسية
+    'window': 'نافذة', 'glasses': 'نظارة', 'bag': 'حقيبة', 'backpack': 'شنطة ظهر',
+    'umbrella': 'مظلة', 'watch': 'ساعة', 'charger': 'شاحن', 'headphones': 'سماعات',
+    'medicine': 'دواء', 'pen': 'قلم', 'book': 'كتاب', 'shoes': 'حذاء', 'hat': 'قبعة',
+    'jacket': 'جاكيت', 'plate': 'صحن', 'spoon': 'ملعقة', 'towel': 'منشفة', 'cane': 'عصا'
+}
+
+# مرادفات (لهجات، مفرد/جمع) تُستخدم في الاتجاه العكسي فقط: نص المستخدم → الفئة
+ARABIC_SYNONYMS = {
+    'مفتاح': 'keys', 'موبايل': 'phone', 'تلفون': 'phone', 'هاتف': 'phone',
+    'نظارات': 'glasses', 'شنطة': 'bag', 'كباية': 'cup', 'فنجان': 'cup',
+    'قزازة': 'bottle', 'زجاجة': 'bottle', 'جزمة': 'shoes', 'شباك': 'window',
+}
+
+# Danish Translations
+DANISH_NAMES = {
+    'door': 'dør', 'open door': 'åben dør', 'closed door': 'lukket dør',
+    'wooden door': 'trædør', 'glass door': 'glasdør', 'white door': 'hvid dør',
+    'stairs': 'trappe', 'staircase': 'trappe', 'steps': 'trin', 'elevator': 'elevator', 'escalator': 'rulletrappe',
+    'hole': 'hul', 'hole in ground': 'hul i jorden', 'pothole': 'hul i vejen',
+    'obstacle': 'forhindring',
+    'wall': 'væg', 'brick wall': 'murstensvæg', 'concrete wall': 'betonvæg', 'white wall': 'hvid væg',
+    'corner': 'hjørne', 'hallway': 'gang',
+    'person': 'person', 'child': 'barn', 'man': 'mand', 'woman': 'kvinde',
+    'car': 'bil', 'truck': 'lastbil', 'bus': 'bus',
+    'bicycle': 'cykel', 'motorcycle': 'motorcykel',
+    'chair': 'stol', 'armchair': 'lænestol', 'wheelchair': 'kørestol',
+    'table': 'bord', 'desk': 'skrivebord', 'dining table': 'spisebord',
+    'couch': 'sofa', 'sofa': 'sofa', 'bed': 'seng',
+    'tv': 'tv', 'monitor': 'skærm', 'screen': 'skærm',
+    'laptop': 'bærbar', 'computer': 'computer',
+    'trash can': 'skraldespand', 'bin': 'spand',
+    'refrigerator': 'køleskab', 'fridge': 'køleskab',
+    'cabinet': 'skab', 'closet': 'klædeskab',
+    'shelf': 'hylde', 'bookcase': 'reol',
+    'sink': 'vask', 'toilet': 'toilet', 'mirror': 'spejl',
+    'keys': 'nøgler', 'wallet': 'pung', 'phone': 'telefon',
+    'bottle': 'flaske', 'cup': 'kop', 'glass': 'glas', 'remote': 'fjernbetjening',
+    'lamp': 'lampe', 'light': 'lys', 'ceiling fan': 'loftsventilator',
+    'window': 'vindue', 'glasses': 'briller', 'bag': 'taske', 'backpack': 'rygsæk',
+    'umbrella': 'paraply', 'watch': 'ur', 'charger': 'oplader', 'headphones': 'høretelefoner',
+    'medicine': 'medicin', 'pen': 'pen', 'book': 'bog', 'shoes': 'sko', 'hat': 'hat',
+    'jacket': 'jakke', 'plate': 'tallerken', 'spoon': 'ske', 'towel': 'håndklæde', 'cane': 'stok'
+}
+
+# الجداول الثابتة (الإنجليزية = اسم الفئة نفسه)
+CLASS_NAMES: Dict[str, Dict[str, str]] = {
+    'ar': ARABIC_NAMES,
+    'da': DANISH_NAMES,
+}
+
+# الاتجاه العكسي: {الاسم المحلي: الفئة} - أول فئة تحمل الاسم تكسب ('باب' → 'door')
+CLASS_BY_NAME: Dict[str, str] = dict(ARABIC_SYNONYMS)
+for _names in CLASS_NAMES.values():
+    for _cls, _text in _names.items():
+        CLASS_BY_NAME.setdefault(_text.lower(), _cls)
+
+
+class TranslationStore:
+    """ترجمات الأسماء الديناميكية: {lang: {name: text}} في ملف JSON واحد"""
+
+    def __init__(self, path: Path = TRANSLATIONS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, str]] = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._data = json.load(f)
+        except FileNotFoundError:
+            self._data = {}
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Translation store unreadable ({e}), starting empty")
+            self._data = {}
+
+    def get(self, name: str, lang: str) -> Optional[str]:
+        return self._data.get(lang, {}).get(name)
+
+    def set(self, name: str, lang: str, text: str):
+        """حفظ ترجمة (كتابة ذرية: ملف مؤقت ثم rename)"""
+        with self._lock:
+            if self._data.get(lang, {}).get(name) == text:
+                return
+            self._data.setdefault(lang, {})[name] = text
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix('.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+
+    def __len__(self) -> int:
+        return sum(len(names) for names in self._data.values())
+
+
+class Localizer:
+    """اسم الفئة بلغة المستخدم - جداول ثابتة ثم المخزن ثم الاسم الأصلي"""
+
+    def __init__(self, store: Optional[TranslationStore] = None, online: bool = LOCALIZATION_ONLINE):
+        self.store = store or TranslationStore()
+        self.online = online
+        self.missing: Dict[tuple, int] = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def localize(self, name: str, lang: str = 'ar') -> str:
+        """بدون شبكة أبداً - آمنة داخل detect()"""
+        if lang == 'en' or not name:
+            return name
+        text = CLASS_NAMES.get(lang, {}).get(name) or self.store.get(name, lang)
+        if text is not None:
+            self.hits += 1
+            return text
+
+        self.misses += 1
+        key = (name, lang)
+        with self._lock:
+            if key in self.missing or len(self.missing) < MAX_MISSING:
+                self.missing[key] = self.missing.get(key, 0) + 1
+            schedule = self.online and key not in self._pending
+            if schedule:
+                self._pending.add(key)
+        if schedule:
+            threading.Thread(target=self._translate_online, args=key, daemon=True).start()
+        return name
+
+    def to_class(self, text: str) -> Optional[str]:
+        """اسم بلغة المستخدم → اسم الفئة الإنجليزي (لمفردات الكاشف عند البحث)"""
+        text = (text or '').strip().lower()
+        if not text:
+            return None
+        if text in CLASS_BY_NAME:
+            return CLASS_BY_NAME[text]
+        if text.startswith('ال') and text[2:] in CLASS_BY_NAME:
+            return CLASS_BY_NAME[text[2:]]
+        return None
+
+    def add(self, name: str, lang: str, text: str):
+        """ترجمة يدوية (مثل الاسم العربي لوجه مسجل)"""
+        self.store.set(name, lang, text)
+        with self._lock:
+            self.missing.pop((name, lang), None)
+
+    def _translate_online(self, name: str, lang: str):
+        """ترجمة آلية في الخلفية - النتيجة تُستخدم من الطلب التالي"""
+        try:
+            from deep_translator import GoogleTranslator
+            text = GoogleTranslator(source='en', target=lang).translate(name)
+        except Exception as e:
+            # يبقى في _pending: لا إعادة محاولة في هذه العملية
+            print(f"⚠️ Background translation failed for '{name}' ({lang}): {e}")
+            return
+        if text:
+            self.add(name, lang, text)
+        with self._lock:
+            self._pending.discard((name, lang))
+
+    def get_stats(self) -> Dict:
+        return {
+            'languages': list(SUPPORTED_LANGS),
+            'stored': len(self.store),
+            'hits': self.hits,
+            'misses': self.misses,
+            'online': self.online,
+            'missing': [f"{name}:{lang}" for name, lang in list(self.missing)[:20]],
+        }
+
+
+localizer = Localizer()
@@ -1,11 +1,21 @@
 # YOLO-World v2 - Open Vocabulary Detection
 # This model allows defining ANY object class dynamically!
+import functools
 import os
 from pathlib import Path
 import cv2
 import numpy as np
+import threading
 import traceback
-from deep_translator import GoogleTranslator
+from .batching import MicroBatcher
+from .frame import Frame
+from .localization import ARABIC_NAMES, localizer  # noqa: F401 (ARABIC_NAMES: re-export)
+from .export_backend import load_exported_detector
+from app.utils.caching import perceptual_cache
+from app.utils.metrics import timed
+from app.utils.model_registry import model_registry
+from app.utils.sessions import DEFAULT_SESSION_ID
+from .tracker import object_tracker  # noqa: F401 (registers the per-session 'tracker' component)
 
 MODELDIR = Path(__file__).resolve().parents[1] / 'models'
 MODELDIR.mkdir(parents=True, exist_ok=True)
@@ -19,14 +29,6 @@ except Exception as e:
     depth_estimator = None
     DEPTH_AVAILABLE = False
 
-# Import new FaceRecognizer
-try:
-    from .face_recognizer import FaceRecognizer
-    FACE_REC_AVAILABLE = True
-except ImportError:
-    print("⚠️ FaceRecognizer module could not be imported.")
-    FACE_REC_AVAILABLE = False
-
 # Minimum confidence - PHASE 1: Increased to 0.35 for better accuracy
 MIN_CONFIDENCE = 0.35  # تم رفعه من 0.25 إلى 0.35 للدقة العالية
 
@@ -43,6 +45,14 @@ CLASS_THRESHOLDS = {
 TARGET_IMAGE_SIZE = (320, 240)  # تصغير الصور للسرعة (640×480 → 320×240)
 MAX_IMAGE_SIZE = 640  # الحد الأقصى قبل التصغير
 
+# Micro-batching: الطلبات المتزامنة تُجمع في تمرير أمامي واحد
+DETECT_BATCH_SIZE = int(os.environ.get('DETECT_BATCH_SIZE', '4'))  # 1 = تعطيل التجميع
+DETECT_BATCH_WAIT_MS = float(os.environ.get('DETECT_BATCH_WAIT_MS', '5'))
+
+# CPU backend: auto (تصدير موجود وإلا .pt) | onnx | openvino (تصدير عند أول تشغيل) | torch
+DETECTOR_BACKEND = os.environ.get('DETECTOR_BACKEND', 'auto')
+DETECTOR_INT8 = os.environ.get('DETECTOR_INT8', '0') == '1'
+
 # PHASE 1: Context-based filtering - منع الأخطاء الواضحة
 CONTEXT_FILTERS = {
     'car': ['bedroom', 'bathroom', 'kitchen'],
@@ -79,32 +89,21 @@ CUSTOM_CLASSES = [
     'keys', 'wallet', 'phone', 'bottle', 'cup', 'glass', 'remote'
 ]
 
-# Arabic Translations - Robust Mapping
-ARABIC_NAMES = {
-    'door': 'باب', 'open door': 'باب مفتوح', 'closed door': 'باب مغلق',
-    'wooden door': 'باب', 'glass door': 'باب زجاجي', 'white door': 'باب',
-    'stairs': 'درج', 'staircase': 'درج', 'steps': 'عوائق', 'elevator': 'مصعد', 'escalator': 'سلم كهربائي',
-    'hole': 'حفرة', 'hole in ground': 'حفرة', 'pothole': 'حفرة',
-    'obstacle': 'عائق',
-    'wall': 'جدار', 'brick wall': 'جدار', 'concrete wall': 'جدار', 'white wall': 'جدار',
-    'corner': 'زاوية', 'hallway': 'ممر',
-    'person': 'شخص', 'child': 'طفل', 'man': 'رجل', 'woman': 'امرأة',
-    'car': 'سيارة', 'truck': 'شاحنة', 'bus': 'باص',
-    'bicycle': 'دراجة', 'motorcycle': 'موتور',
-    'chair': 'كرسي', 'armchair': 'كرسي', 'wheelchair': 'كرسي متحرك',
-    'table': 'طاولة', 'desk': 'مكتب', 'dining table': 'طاولة طعام',
-    'couch': 'كنبة', 'sofa': 'كنبة', 'bed': 'سرير',
-    'tv': 'شاشة', 'monitor': 'شاشة', 'screen': 'شاشة',
-    'laptop': 'لابتوب', 'computer': 'كمبيوتر',
-    'trash can': 'سلة مهملات', 'bin': 'سلة',
-    'refrigerator': 'ثلاجة', 'fridge': 'ثلاجة',
-    'cabinet': 'خزانة', 'closet': 'دولاب',
-    'shelf': 'رف', 'bookcase': 'مكتبة',
-    'sink': 'مغسلة', 'toilet': 'حمام', 'mirror': 'مرآة',
-    'keys': 'مفاتيح', 'wallet': 'محفظة', 'phone': 'جوال',
-    'bottle': 'قارورة', 'cup': 'كوب', 'glass': 'كأس', 'remote': 'ريموت',
-    'lamp': 'مصباح', 'light': 'إضاءة', 'ceiling fan': 'مروحة سقف'
+# غرفة كل كائن (لاستنتاج السياق)
+ROOM_OBJECTS = {
+    'bedroom': ('bed', 'pillow', 'blanket'),
+    'bathroom': ('toilet', 'sink', 'bathtub', 'shower'),
+    'kitchen': ('refrigerator', 'stove', 'oven', 'kitchen table'),
+    'living_room': ('tv', 'sofa', 'couch', 'armchair'),
+    'office': ('desk', 'computer', 'laptop', 'bookcase'),
+    'outdoor': ('car', 'tree', 'grass', 'sky'),
 }
+ROOMS = tuple(ROOM_OBJECTS)
+OBJECT_ROOM = {obj: room for room, objs in ROOM_OBJECTS.items() for obj in objs}
+
+PERSON_CLASSES = ('person', 'man', 'woman', 'child')  # تشغيل التعرف على الوجوه
+FACE_CLASSES = ('person', 'man', 'woman')  # تُستبدل باسم الوجه المعروف
+DETECTION_TOP_K = 5  # أقرب الكائنات فقط تُرجع
 
 # PHASE 1: Helper functions for filtering
 def infer_room_context(detections):
@@ -112,21 +111,9 @@ def infer_room_context(detections):
     room_scores = {}
     
     for det in detections:
-        obj_class = det['class'].lower()
-        
-        # تعيين الكائنات للغرف
-        if obj_class in ['bed', 'pillow', 'blanket']:
-            room_scores['bedroom'] = room_scores.get('bedroom', 0) + det['conf']
-        elif obj_class in ['toilet', 'sink', 'bathtub', 'shower']:
-            room_scores['bathroom'] = room_scores.get('bathroom', 0) + det['conf']
-        elif obj_class in ['refrigerator', 'stove', 'oven', 'kitchen table']:
-            room_scores['kitchen'] = room_scores.get('kitchen', 0) + det['conf']
-        elif obj_class in ['tv', 'sofa', 'couch', 'armchair']:
-            room_scores['living_room'] = room_scores.get('living_room', 0) + det['conf']
-        elif obj_class in ['desk', 'computer', 'laptop', 'bookcase']:
-            room_scores['office'] = room_scores.get('office', 0) + det['conf']
-        elif obj_class in ['car', 'tree', 'grass', 'sky']:
-            room_scores['outdoor'] = room_scores.get('outdoor', 0) + det['conf']
+        room = OBJECT_ROOM.get(det['class'].lower())
+        if room:
+            room_scores[room] = room_scores.get(room, 0) + det['conf']
     
     if not room_scores:
         return None
@@ -176,160 +163,322 @@ def resize_image_for_inference(image):
     
     return resized
 
+@functools.lru_cache(maxsize=16)
+def _class_tables(names):
+    """
+    جداول بحث لكل فئة في المفردات (تُبنى مرة لكل مفردات):
+    العتبة، الغرفة، الغرف الممنوعة، شخص/وجه. الفهرس الأخير = 'unknown'
+    """
+    names = tuple(names) + ('unknown',)
+    lower = [n.lower() for n in names]
+    forbidden = np.zeros((len(names), len(ROOMS)), dtype=bool)
+    for i, n in enumerate(lower):
+        for room in CONTEXT_FILTERS.get(n, ()):
+            if room in ROOMS:
+                forbidden[i, ROOMS.index(room)] = True
+    return {
+        'names': names,
+        'threshold': np.array([CLASS_THRESHOLDS.get(n, 0.0) for n in names]),
+        'room': np.array([ROOMS.index(OBJECT_ROOM[n]) if n in OBJECT_ROOM else -1 for n in lower], dtype=np.int64),
+        'forbidden': forbidden,
+        'person': np.array([n in PERSON_CLASSES for n in names]),
+        'face': np.array([n in FACE_CLASSES for n in names]),
+    }
+
+def _class_index(cls_ids, names):
+    idx = np.asarray(cls_ids, dtype=np.int64).ravel()
+    return np.where((idx >= 0) & (idx < len(names)), idx, len(names))
+
+def has_person_class(cls_ids, names):
+    """هل بين الاكتشافات شخص؟ (قبل العتبات)"""
+    return bool(_class_tables(tuple(names))['person'][_class_index(cls_ids, names)].any())
+
+def face_box_mask(cls_ids, names):
+    """الصناديق التي قد تحمل وجهاً معروفاً (FACE_CLASSES) - قصاصات التعرف على الوجوه"""
+    return _class_tables(tuple(names))['face'][_class_index(cls_ids, names)]
+
+def heuristic_distances(boxes, img_h):
+    """مسافة تقريبية من ارتفاع الصندوق نسبة للصورة (بدون خريطة عمق)"""
+    ratio = (boxes[:, 3] - boxes[:, 1]) / img_h
+    return np.select([ratio > 0.8, ratio > 0.6, ratio > 0.4, ratio > 0.2],
+                     [0.5, 1.0, 2.0, 3.5], default=6.0)
+
+def postprocess_detections(cls_ids, confs, boxes, names, img_h, distances=None,
+                           box_names=None, target_lang='ar', top_k=DETECTION_TOP_K):
+    """
+    تمرير NumPy واحد على كل صناديق النتيجة:
+    عتبات الفئات → ربط الوجوه → تصفية السياق → المسافات → أقرب top_k
+    فقط الناجون النهائيون يتحولون إلى dicts.
+
+    cls_ids, confs: (N,)  boxes: (N, 4) xyxy  names: أسماء المفردات بالترتيب
+    distances: (N,) من خريطة العمق (NaN = غير صالحة) أو None
+    box_names: (N,) اسم الوجه المعروف لكل صندوق شخص (None/"Unknown" = بدون تغيير)
+    """
+    tables = _class_tables(tuple(names))
+    cls_ids = np.asarray(cls_ids, dtype=np.int64).ravel()
+    confs = np.asarray(confs, dtype=np.float64).ravel()
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    if len(cls_ids) == 0:
+        return []
+
+    idx = _class_index(cls_ids, names)
+
+    # Dynamic Thresholding
+    keep = confs >= tables['threshold'][idx]
+
+    # PHASE 1: تصفية الأخطاء الواضحة (سيارة في غرفة النوم)
+    rooms = tables['room'][idx]
+    in_room = keep & (rooms >= 0)
+    if in_room.any():
+        # نفس الثقة المقربة التي يراها infer_room_context
+        scores = np.bincount(rooms[in_room], weights=np.round(confs[in_room], 2), minlength=len(ROOMS))
+        keep &= ~tables['forbidden'][idx, int(np.argmax(scores))]
+
+    # المسافة: خريطة العمق، وإلا التقدير من ارتفاع الصندوق
+    dist = np.zeros(len(cls_ids), dtype=np.float64)
+    if distances is not None:
+        distances = np.asarray(distances, dtype=np.float64).ravel()
+        dist = np.where(np.isnan(distances), 0.0, distances)
+    dist = np.where(dist == 0.0, heuristic_distances(boxes, img_h), dist)
+
+    survivors = np.flatnonzero(keep)
+    survivors = survivors[np.argsort(dist[survivors], kind='stable')][:top_k]
+
+    detections = []
+    for i in survivors:
+        cls_name = tables['names'][idx[i]]
+        det = {}
+        face_name = box_names[i] if box_names is not None and tables['face'][idx[i]] else None
+        if face_name and face_name != "Unknown":
+            det['base_class'] = str(cls_name)  # فئة الكاشف (للتتبع) - class = اسم الشخص
+            cls_name = face_name
+        det.update({
+            'class': str(cls_name),
+            'class_ar': str(localizer.localize(cls_name, target_lang)),
+            'conf': float(round(float(confs[i]), 2)),
+            'bbox': [float(x) for x in boxes[i]],
+            'distance_m': float(dist[i])
+        })
+        detections.append(det)
+    return detections
+
 class DummyDetector:
-    def detect(self, image_bytes, target_lang='ar'): return []
+    def detect(self, image_bytes, target_lang='ar', extra_classes=None, session=None, use_cache=True): return []
+    def get_stats(self): return {'backend': 'dummy'}
 
-detector = DummyDetector()
+class WorldDetector:
+    def __init__(self, model, backend='torch', vocab_cache=None):
+        self.model = model
+        self.backend = backend
+        # المفردات الديناميكية تتطلب نموذج .pt (المصدر ثابت المفردات)
+        self.vocab_cache = vocab_cache
+        self.active_vocabulary = tuple(CUSTOM_CLASSES)
+        self._vocab_lock = threading.Lock()
+        self.face_recognizer = face_recognizer  # LazyModel - يُحمّل عند أول شخص
+        self.batcher = MicroBatcher(
+            self._predict_batch,
+            max_batch_size=DETECT_BATCH_SIZE,
+            max_wait_ms=DETECT_BATCH_WAIT_MS,
+            name='yolo-world',
+            # فريمات بمفردات مختلفة لا تُجمع في نفس الدفعة
+            group_key=lambda item: item[1]
+        )
 
-try:
-    from ultralytics import YOLO
-    
-    # Check for YOLO-World model
-    world_path = MODELDIR / 'yolov8s-worldv2.pt'
-    
-    if world_path.exists():
-        model = YOLO(str(world_path))
+    def _vocabulary_for(self, extra_classes):
+        """المفردات الأساسية + الإضافية للطلب (إن كانت مدعومة)"""
+        if not extra_classes or self.vocab_cache is None:
+            return tuple(CUSTOM_CLASSES)
+        extra = [c.strip().lower() for c in extra_classes if c and c.strip()]
+        extra = [c for c in dict.fromkeys(extra) if c not in CUSTOM_CLASSES]
+        return tuple(CUSTOM_CLASSES) + tuple(extra)
+
+    def _set_vocabulary(self, vocabulary):
+        if vocabulary != self.active_vocabulary:
+            from .vocab_cache import apply_vocabulary
+            apply_vocabulary(self.model, list(vocabulary), self.vocab_cache)
+            self.active_vocabulary = vocabulary
+
+    @timed('yolo')
+    def _predict_batch(self, items):
+        """تمرير أمامي واحد لعدة فريمات (بنفس المفردات) - نتيجة لكل فريم"""
+        with self._vocab_lock:
+            self._set_vocabulary(items[0][1])
+            return self.model([img for img, _ in items], conf=MIN_CONFIDENCE, verbose=False)
+
+    def _predict(self, img, vocabulary):
+        """استنتاج فريم واحد (عبر خادم الدفعات إذا مفعّل)"""
+        if DETECT_BATCH_SIZE > 1:
+            return [self.batcher.submit((img, vocabulary))]
+        return self._predict_batch([(img, vocabulary)])
+
+    def get_stats(self):
+        stats = {
+            'backend': self.backend,
+            'batching': self.batcher.get_stats(),
+            'frame_cache': perceptual_cache.get_stats(),
+            'localization': localizer.get_stats(),
+        }
+        if self.vocab_cache is not None:
+            stats['text_embeddings'] = self.vocab_cache.get_stats()
+        if DEPTH_AVAILABLE and depth_estimator:
+            stats['depth'] = depth_estimator.get_stats()
+        if model_registry.is_loaded('face') and self.face_recognizer:
+            stats['faces'] = self.face_recognizer.get_stats()
+        return stats
+
+    def _name_people(self, small, detections, tracker, target_lang):
+        """
+        اسم الوجه المعروف بدل فئة الشخص (class = الاسم، base_class = فئة الكاشف).
+        الهوية محفوظة على مسار الجلسة (track_id): الشخص المتتبع لا يُعاد تشفيره،
+        وشخص جديد لا يرث اسم شخص آخر لمجرد وقوفه في نفس المكان
+        """
+        people = [det for det in detections if det['class'] in FACE_CLASSES]
+        if not people or not self.face_recognizer:
+            return
+        found = {}
+        pending = []
+        for det in people:
+            name = tracker.identity(det.get('track_id')) if tracker is not None else None
+            if name is None:
+                pending.append(det)
+            else:
+                found[id(det)] = name
+        if pending:
+            # RGB view for face_recognition (computed once, lazily)
+            boxes = [det['bbox'] for det in pending]
+            for det, name in zip(pending, self.face_recognizer.identify_person_boxes(small.rgb, boxes)):
+                if name is None:
+                    continue  # لا وجه (أو تجاوز حد القصاصات) - يُعاد المحاولة في الفريم التالي
+                found[id(det)] = name
+                if tracker is not None:
+                    tracker.set_identity(det.get('track_id'), name)
+        for det in people:
+            name = found.get(id(det))
+            if name and name != "Unknown":
+                det['base_class'] = det['class']
+                det['class'] = name
+                det['class_ar'] = localizer.localize(name, target_lang)
+
+    @timed('detect')
+    def detect(self, image_bytes, target_lang='ar', extra_classes=None, session=None, use_cache=True):
+        """
+        image_bytes: Frame (مفضل) أو bytes أو numpy BGR
+        extra_classes: فئات إضافية لهذا الطلب فقط (مثل 'keys' لأمر البحث)
+        session: جلسة المستخدم - حالة ما بين الفريمات (keyframes العمق، كاش الفريمات،
+            المسارات وهويات الوجوه) خاصة بها؛ الاكتشافات تُرجع مع track_id
+        use_cache: كاش الفريمات شبه المتطابقة - False لمسار تنبيهات الأمان
+            (عائق ظهر للتو لا يجوز أن يختفي خلف نتيجة فريم سابق)
+        """
+        try:
+            # الصورة تُفك مرة واحدة فقط (أو تصل مفكوكة من الطلب)
+            frame = Frame.ensure(image_bytes)
+            if frame is None: return []
+
+            # PHASE 1: تصغير الصور للسرعة
+            small = frame.resized(TARGET_IMAGE_SIZE[0])
+            img = small.bgr
+
+            # مشهد شبه مطابق لفريم حديث لنفس الجلسة (مستخدم ثابت) → نفس مخرجات
+            # YOLO والعمق بدون استنتاج. الكاش يحفظ الصناديق الخام فقط: أسماء الوجوه
+            # والترجمة تُحسب لكل طلب، ولا يُشارك أبداً بين المستخدمين
+            vocabulary = self._vocabulary_for(extra_classes)
+            session_id = session.id if session is not None else DEFAULT_SESSION_ID
+            cache_prefix = f"detect:{session_id}:{'|'.join(vocabulary[len(CUSTOM_CLASSES):])}"
+            raw = perceptual_cache.get(frame.dhash, prefix=cache_prefix) if use_cache else None
+
+            if raw is None:
+                # 1. Estimate depth map if available (same resized frame - no re-encode)
+                depth_map = None
+                if DEPTH_AVAILABLE and depth_estimator:
+                    # MiDaS فقط على keyframes - المشهد الثابت يعيد استخدام الخريطة السابقة
+                    keyframes = session.depth if session is not None else None
+                    depth_map = depth_estimator.estimate_depth_keyframed(small, keyframes)
+
+                # 2. Run YOLO-World Inference
+                results = self._predict(img, vocabulary)
+
+                # كل الصناديق كمصفوفات (بدون .item() لكل صندوق)
+                names = [results[0].names[i] for i in range(len(results[0].names))]
+                cls_ids = np.concatenate([r.boxes.cls.cpu().numpy().ravel() for r in results])
+                confs = np.concatenate([r.boxes.conf.cpu().numpy().ravel() for r in results])
+                all_boxes = np.concatenate([r.boxes.xyxy.cpu().numpy().reshape(-1, 4) for r in results])
+
+                # مسافات كل الصناديق من خريطة العمق دفعة واحدة (بدقة الخريطة الأصلية)
+                box_distances = None
+                if depth_map is not None and DEPTH_AVAILABLE and len(all_boxes):
+                    box_distances = depth_estimator.get_object_distances(depth_map, all_boxes, img.shape[:2])
+
+                raw = (names, cls_ids, confs, all_boxes, box_distances)
+                if use_cache:
+                    perceptual_cache.set(frame.dhash, raw, prefix=cache_prefix)
+            names, cls_ids, confs, all_boxes, box_distances = raw
+
+            detections = postprocess_detections(
+                cls_ids, confs, all_boxes, names, img.shape[0],
+                distances=box_distances, target_lang=target_lang
+            )
+
+            # 3. التتبع (track_id) ثم Face Recognition داخل صناديق الأشخاص فقط
+            tracker = session.tracker if session is not None else None
+            if tracker is not None:
+                tracker.update(detections, frame=frame)
+            self._name_people(small, detections, tracker, target_lang)
+            return detections
+
+        except Exception as e:
+            print(f"🔥 CRITICAL INFERENCE ERROR: {e}")
+            traceback.print_exc()
+            return []
+
+
+def _load_face_recognizer():
+    """face_recognition (dlib) يُستورد عند أول شخص يُكتشف فقط"""
+    try:
+        from .face_recognizer import FaceRecognizer
+    except ImportError:
+        print("⚠️ FaceRecognizer module could not be imported.")
+        return None
+    return FaceRecognizer()
+
+
+def _load_detector():
+    """تحميل YOLO-World (أو DummyDetector إذا لم يتوفر النموذج)"""
+    try:
+        from ultralytics import YOLO
         
-        # Set custom classes!
-        model.set_classes(CUSTOM_CLASSES)
+        # Check for YOLO-World model
+        world_path = MODELDIR / 'yolov8s-worldv2.pt'
         
-        class WorldDetector:
-            def __init__(self, model):
-                self.model = model
-                self.face_recognizer = FaceRecognizer() if FACE_REC_AVAILABLE else None
-
-            def detect(self, image_bytes, target_lang='ar'):
-                # Simple cache for translations to avoid latency
-                if not hasattr(self, 'translation_cache'):
-                    self.translation_cache = {}
-
-                def get_localized_name(text, lang):
-                    key = f"{text}_{lang}"
-                    if lang == 'ar' and text in ARABIC_NAMES:
-                        return ARABIC_NAMES[text]
-                    if key in self.translation_cache:
-                        return self.translation_cache[key]
-                    try:
-                        translated = GoogleTranslator(source='auto', target=lang).translate(text)
-                        self.translation_cache[key] = translated
-                        return translated
-                    except Exception as e:
-                        return text
-
+        if world_path.exists():
+            # CPU backend: كاشف ثابت مصدر (ONNX Runtime / OpenVINO) مع الرجوع التلقائي لـ .pt
+            model, backend = None, 'torch'
+            if DETECTOR_BACKEND != 'torch':
+                model, backend = load_exported_detector(world_path, CUSTOM_CLASSES, DETECTOR_BACKEND, DETECTOR_INT8)
+            
+            vocab_cache = None
+            if model is None:
+                from .vocab_cache import TextEmbeddingCache, apply_vocabulary
+                model = YOLO(str(world_path))
+                
+                # Set custom classes! (تضمينات النصوص من الكاش - CLIP فقط للأسماء الجديدة)
+                vocab_cache = TextEmbeddingCache(MODELDIR / f'{world_path.stem}_text_embeddings.pt')
                 try:
-                    if not image_bytes or len(image_bytes) == 0:
-                        return []
-                    
-                    arr = np.frombuffer(image_bytes, np.uint8)
-                    if arr.size == 0: return []
-                    
-                    img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-                    if img is None: return []
-
-                    # PHASE 1: تصغير الصور للسرعة
-                    img = resize_image_for_inference(img)
-                    
-                    # 1. Estimate depth map if available
-                    depth_map = None
-                    if DEPTH_AVAILABLE and depth_estimator:
-                        # Depth estimator expects raw bytes, but we resized the image.
-                        # Ideally we should pass the resized image bytes or update logic.
-                        # For simplicity, we pass original bytes but this might cause mismatch in coordinates.
-                        # Actually, better to skip resize IF depth is critical, or handle scaling coords.
-                        # To keep it safe, let's use the original bytes for depth for now or re-encode.
-                        # Optimization: We already resized `img`. Let's allow depth estimator to take numpy?
-                        # `depth_estimator.estimate_depth` takes bytes.
-                        _, encoded_resized = cv2.imencode('.jpg', img)
-                        depth_map = depth_estimator.estimate_depth(encoded_resized.tobytes())
-                    
-                    # 2. Run YOLO-World Inference
-                    results = self.model(img, conf=MIN_CONFIDENCE, verbose=False)
-                    
-                    # 2. Check if we need Face Recognition (if 'person' is detected)
-                    has_person = False
-                    for r in results:
-                        for cls_id in r.boxes.cls:
-                            if self.model.names[int(cls_id)] in ['person', 'man', 'woman', 'child']:
-                                has_person = True
-                                break
-                    
-                    identified_names = []
-                    if has_person and self.face_recognizer:
-                        # Convert to RGB for face_recognition
-                        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                        identified_names = self.face_recognizer.identify_faces(img_rgb)
-                    
-                    detections = []
-                    for r in results:
-                        for box in r.boxes:
-                            try:
-                                cls_id = int(box.cls[0].item())
-                                conf = float(box.conf[0].item())
-                                
-                                if hasattr(self.model, 'names') and cls_id in self.model.names:
-                                    cls_name = self.model.names[cls_id]
-                                else:
-                                    cls_name = 'unknown'
-
-                                # Dynamic Thresholding
-                                if cls_name in CLASS_THRESHOLDS:
-                                    if conf < CLASS_THRESHOLDS[cls_name]:
-                                        continue
-
-                                # Face Association (Greedy)
-                                if cls_name in ['person', 'man', 'woman'] and len(identified_names) > 0:
-                                    # Pick the first one
-                                    name = identified_names.pop(0)
-                                    if name != "Unknown":
-                                        cls_name = name
-
-                                localized = get_localized_name(cls_name, target_lang)
-                                xyxy = box.xyxy[0].tolist()
-                                
-                                # Calculate distance
-                                dist = 0.0
-                                if depth_map is not None and DEPTH_AVAILABLE:
-                                    real_dist = depth_estimator.get_object_distance(depth_map, xyxy)
-                                    if real_dist:
-                                        dist = real_dist
-                                
-                                if dist == 0.0:
-                                    # Heuristic distance estimation
-                                    h, w = img.shape[:2]
-                                    box_h = xyxy[3] - xyxy[1]
-                                    ratio = box_h / h
-                                    if ratio > 0.8: dist = 0.5
-                                    elif ratio > 0.6: dist = 1.0
-                                    elif ratio > 0.4: dist = 2.0
-                                    elif ratio > 0.2: dist = 3.5
-                                    else: dist = 6.0
-                                
-                                detections.append({
-                                    'class': str(cls_name),
-                                    'class_ar': str(localized),
-                                    'conf': float(round(conf, 2)),
-                                    'bbox': [float(x) for x in xyxy],
-                                    'distance_m': float(dist)
-                                })
-                            except Exception as inner_e:
-                                continue
-                    
-                    # PHASE 1: تصفية الأخطاء الواضحة
-                    detections = filter_impossible_detections(detections)
-                    
-                    detections.sort(key=lambda x: x['distance_m'])
-                    return detections[:5]
-
+                    apply_vocabulary(model, CUSTOM_CLASSES, vocab_cache)
                 except Exception as e:
-                    print(f"🔥 CRITICAL INFERENCE ERROR: {e}")
-                    traceback.print_exc()
-                    return []
-        
-        detector = WorldDetector(model)
-        print(f'✅ YOLO-World loaded classes.')
-    else:
-        print('⚠️ YOLO-World model not found')
+                    print(f"⚠️ Vocabulary cache unavailable, using set_classes: {e}")
+                    vocab_cache = None
+                    model.set_classes(CUSTOM_CLASSES)
+            
+            print(f'✅ YOLO-World loaded classes ({backend} backend).')
+            return WorldDetector(model, backend, vocab_cache)
+        else:
+            print('⚠️ YOLO-World model not found')
+
+    except Exception as e:
+        print(f'⚠️ YOLO Error: {e}')
+    return DummyDetector()
 
-except Exception as e:
-    print(f'⚠️ YOLO Error: {e}')
 
+# النماذج تُحمّل عند أول استخدام (أو في الخلفية عند بدء التشغيل) - ليس عند الاستيراد
+face_recognizer = model_registry.register('face', _load_face_recognizer)
+detector = model_registry.register('detector', _load_detector, required=True)
@@ -1,30 +1,59 @@
 """
 قراءة النصوص من الصور باستخدام EasyOCR
-يدعم العربية والإنجليزية
+يدعم العربية والإنجليزية والدنماركية
+
+خط المعالجة (بدل 4 تمريرات OCR كاملة لفريم بدون نص):
+1. فحص سريع لوجود نص (كثافة الحواف) - مشهد فارغ ينتهي هنا
+2. كشف مناطق النص (CRAFT) مرة واحدة مشتركة بين القارئين؛ CLAHE فقط إذا لم يُكشف شيء
+3. التعرف: قارئ ar+en وقارئ da+en على نفس المناطق بالتوازي (thread pool)
+4. لكل منطقة: النتيجة العربية إذا كانت بالخط العربي، وإلا الأعلى ثقة
+مع ذاكرة الصفحة للجلسة (page=session.ocr): المناطق المقروءة سابقاً لا تُعاد قراءتها
+(ocr_session.py)، والنتائج دائماً بترتيب القراءة
+زمن كل مرحلة: sba_operation_duration_seconds{operation="ocr_*"}
 """
 
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import cv2
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+from app.utils.metrics import operation_histogram, timed
+from app.utils.model_registry import model_registry
+
+from .frame import Frame
+from .ocr_session import OCRPage, reading_order, region_rect, region_signature
+
+READER_LANGS = (('ar', ['ar', 'en']), ('da', ['da', 'en']))
+OCR_MIN_CONFIDENCE = 0.3
+# نسبة بكسلات الحواف في أكثف خلية تحت هذا = لا نص (0 = تعطيل الفحص المبكر)
+OCR_MIN_EDGE_DENSITY = float(os.environ.get('OCR_MIN_EDGE_DENSITY', '0.01'))
+OCR_PRESENCE_WIDTH = 320  # عرض الصورة المصغرة لفحص الحواف
+# شبكة الخلايا: لافتة صغيرة على جدار تملأ خلية لا الإطار كله
+OCR_PRESENCE_GRID = int(os.environ.get('OCR_PRESENCE_GRID', '4'))
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', '2'))  # 1 = التعرف بالتتابع
+
+_pool = ThreadPoolExecutor(max_workers=max(1, OCR_WORKERS), thread_name_prefix='ocr')
+
 
 class OCRReader:
     def __init__(self):
         self.reader = None
-        self.load_model()
+        self.readers = []
+        self.last_passes: Dict[str, float] = {}
     
     def load_model(self):
-        """تحميل نموذج EasyOCR"""
+        """تحميل نموذج EasyOCR - عبر model_registry عند أول استخدام"""
         self.readers = []
         try:
             import easyocr
             
-            # قارئ 1: العربية والإنجليزية
-            print("⏳ Loading OCR Reader 1 (Arabic + English)...")
-            self.readers.append(easyocr.Reader(['ar', 'en'], gpu=False))
-            
-            # قارئ 2: الدنماركية والإنجليزية
-            print("⏳ Loading OCR Reader 2 (Danish + English)...")
-            self.readers.append(easyocr.Reader(['da', 'en'], gpu=False))
+            # قارئ 1: العربية والإنجليزية / قارئ 2: الدنماركية والإنجليزية
+            for group, langs in READER_LANGS:
+                print(f"⏳ Loading OCR Reader ({'+'.join(langs)})...")
+                self.readers.append(easyocr.Reader(langs, gpu=False))
             
             print("✅ OCR Readers loaded successfully")
             
@@ -33,63 +62,205 @@ class OCRReader:
             print("   OCR features will not be available")
         except Exception as e:
             print(f"⚠️ OCR Reader error: {e}")
+        return self.readers or None
     
-    def _preprocess_image(self, img):
+    def _preprocess_image(self, frame: Frame):
         """معالجة الصورة لتحسين القراءة"""
         try:
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            gray = frame.gray
             clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
             enhanced = clahe.apply(gray)
             return enhanced
         except:
-            return img
+            return frame.gray
+
+    def _timed_pass(self, name: str, func, *args):
+        """تشغيل مرحلة وتسجيل زمنها (histogram + last_passes)"""
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            operation_histogram(f'ocr_{name}').observe(elapsed)
+            self.last_passes[name] = round(elapsed * 1000, 1)
+
+    def has_text_signal(self, frame: Frame) -> bool:
+        """
+        مصنف مبكر رخيص: النص = حواف كثيفة. الكثافة تُقاس لكل خلية في شبكة
+        OCR_PRESENCE_GRID×OCR_PRESENCE_GRID ويُؤخذ أعلاها - النسبة على الإطار كله
+        تُسقط لافتة صغيرة على جدار فارغ. مشهد بلا خلية كثيفة الحواف
+        (جدار، سقف، صورة مظلمة) لا يستحق تمرير CRAFT.
+        """
+        if OCR_MIN_EDGE_DENSITY <= 0:
+            return True
+        gray = frame.gray
+        h, w = gray.shape[:2]
+        if w > OCR_PRESENCE_WIDTH:
+            gray = cv2.resize(gray, (OCR_PRESENCE_WIDTH, max(1, int(h * OCR_PRESENCE_WIDTH / w))),
+                              interpolation=cv2.INTER_AREA)
+        edges = cv2.Canny(gray, 100, 200) > 0
+        grid = max(1, OCR_PRESENCE_GRID)
+        th, tw = edges.shape[0] // grid, edges.shape[1] // grid
+        if th == 0 or tw == 0:
+            return edges.mean() >= OCR_MIN_EDGE_DENSITY
+        tiles = edges[:th * grid, :tw * grid].reshape(grid, th, grid, tw)
+        return tiles.mean(axis=(1, 3)).max() >= OCR_MIN_EDGE_DENSITY
+
+    def _detect_regions(self, image):
+        """مناطق النص (CRAFT) بقارئ واحد - نفس الكاشف لكل اللغات"""
+        horizontal, free = self.readers[0].detect(image)
+        return horizontal[0], free[0]
+
+    def _recognize(self, reader, gray, regions):
+        horizontal, free = regions
+        return reader.recognize(gray, horizontal_list=horizontal, free_list=free, detail=1)
+
+    def _recognize_all(self, gray, regions) -> List[List]:
+        """كل قارئ على نفس المناطق - بالتوازي (EasyOCR/torch يحرر الـ GIL)"""
+        jobs = [(group, reader) for (group, _), reader in zip(READER_LANGS, self.readers)]
+        if OCR_WORKERS > 1 and len(jobs) > 1:
+            futures = [_pool.submit(self._timed_pass, f'recognize_{group}', self._recognize, reader, gray, regions)
+                       for group, reader in jobs]
+            return [f.result() for f in futures]
+        return [self._timed_pass(f'recognize_{group}', self._recognize, reader, gray, regions)
+                for group, reader in jobs]
+
+    def _merge(self, per_reader: List[List]) -> List[Dict]:
+        """
+        توجيه حسب الخط لكل منطقة: نتيجة قارئ ar+en إذا كانت بالعربية،
+        وإلا الأعلى ثقة (قارئ da+en يقرأ æ ø å)
+        """
+        by_region: Dict[tuple, List[Dict]] = {}
+        for (group, _), results in zip(READER_LANGS, per_reader):
+            for bbox, text, confidence in results:
+                key = tuple(map(tuple, np.asarray(bbox, dtype=int).tolist()))
+                by_region.setdefault(key, []).append({
+                    'bbox': bbox, 'text': text, 'confidence': confidence,
+                    'group': group, 'is_arabic': self._is_arabic(text)
+                })
 
-    def read_text(self, image_bytes) -> List[Dict]:
-        """قراءة النصوص من صورة باستخدام كل القارئات"""
-        if not self.readers:
+        candidates = []
+        for options in by_region.values():
+            arabic = [o for o in options if o['group'] == 'ar' and o['is_arabic']]
+            candidates.append(arabic[0] if arabic else max(options, key=lambda o: o['confidence']))
+
+        combined_results, seen_texts = [], set()
+        for c in candidates:
+            if c['confidence'] > OCR_MIN_CONFIDENCE and c['text'] not in seen_texts:
+                seen_texts.add(c['text'])
+                combined_results.append({
+                    'text': c['text'],
+                    'confidence': round(c['confidence'], 2),
+                    'bbox': c['bbox'],
+                    'language': 'ar' if c['is_arabic'] else c['group']
+                })
+        return combined_results
+
+    def _read_incremental(self, gray, regions, page: OCRPage) -> tuple:
+        """
+        المناطق المقروءة سابقاً في الصفحة تُعاد من الذاكرة؛ فقط الجديدة/المتغيرة تذهب للتعرف.
+        Returns: (النتائج، المناطق الجديدة للحفظ)
+        """
+        horizontal, free = regions
+        items = []  # (region, kind, rect)
+        for kind, region_list in (('h', horizontal), ('f', free)):
+            for region in region_list:
+                rect = region_rect(region, gray.shape)
+                if rect is not None:
+                    items.append((region, kind, rect))
+        keys = [(region_signature(gray, rect), rect) for _, _, rect in items]
+        matches = page.match_regions(keys)
+
+        results = []
+        for (_, _, (x1, y1, x2, y2)), match in zip(items, matches):
+            if match is not None and match['result'] is not None:
+                # نفس النص، بموقعه في هذا الفريم (لترتيب القراءة)
+                results.append(dict(match['result'], bbox=[[x1, y1], [x2, y1], [x2, y2], [x1, y2]]))
+
+        pending = [(item, key) for item, key, match in zip(items, keys, matches) if match is None]
+        if not pending:
+            return results, []
+        new_regions = ([region for (region, kind, _), _ in pending if kind == 'h'],
+                       [region for (region, kind, _), _ in pending if kind == 'f'])
+        recognized = self._merge(self._recognize_all(gray, new_regions))
+
+        # كل نتيجة جديدة لمنطقتها (مركز صندوقها داخل مستطيل المنطقة)
+        stored = []
+        for (_, _, (x1, y1, x2, y2)), (signature, rect) in pending:
+            result = None
+            for r in recognized:
+                cx, cy = np.asarray(r['bbox'], dtype=float).reshape(-1, 2).mean(axis=0)
+                if x1 <= cx <= x2 and y1 <= cy <= y2:
+                    result = r
+                    break
+            stored.append({'signature': signature, 'rect': rect, 'result': result})
+        return results + recognized, stored
+
+    @timed('ocr')
+    def read_text(self, image_bytes, page: Optional[OCRPage] = None) -> List[Dict]:
+        """
+        قراءة النصوص من صورة (Frame أو bytes أو numpy BGR) باستخدام كل القارئات
+        page: ذاكرة الصفحة للجلسة (session.ocr) - إعادة استخدام المناطق المقروءة
+        Returns: النتائج بترتيب القراءة
+        """
+        if not model_registry.get('ocr'):
             return []
         
         try:
-            arr = np.frombuffer(image_bytes, np.uint8)
-            img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
+            frame = Frame.ensure(image_bytes)
             
-            if img is None:
+            if frame is None:
                 return []
-            
-            # قائمة لتجميع النتائج الفريدة
-            combined_results = []
-            seen_texts = set()
+            self.last_passes = {}
+            if page is not None:
+                cached = page.lookup_frame(frame.dhash)
+                if cached is not None:
+                    return cached
 
-            # دالة مساعدة لتشغيل القراءة
-            def run_ocr(reader, image, lang_group):
-                results = reader.readtext(image)
-                for (bbox, text, confidence) in results:
-                    if confidence > 0.3 and text not in seen_texts:
-                        seen_texts.add(text)
-                        combined_results.append({
-                            'text': text,
-                            'confidence': round(confidence, 2),
-                            'bbox': bbox,
-                            'language': 'ar' if self._is_arabic(text) else lang_group
-                        })
-
-            # المحاولة 1: الصورة الأصلية
-            for i, reader in enumerate(self.readers):
-                lang_group = 'ar' if i == 0 else 'da' # تقريب بسيط، سيتم فحصه بالدالة _is_arabic
-                run_ocr(reader, img, lang_group)
-
-            # المحاولة 2: تحسين التباين (إذا النتائج قليلة)
-            if len(combined_results) == 0:
-                processed_img = self._preprocess_image(img)
-                for i, reader in enumerate(self.readers):
-                    lang_group = 'ar' if i == 0 else 'da'
-                    run_ocr(reader, processed_img, lang_group)
-            
-            return combined_results
+            # 1. خروج مبكر: لا نص محتمل
+            if not self._timed_pass('presence', self.has_text_signal, frame):
+                return []
+
+            # 2. كشف مشترك؛ تحسين التباين فقط إذا لم تُكشف أي منطقة
+            gray = frame.gray
+            regions = self._timed_pass('detect', self._detect_regions, frame.rgb)
+            if not any(regions):
+                gray = self._preprocess_image(frame)
+                regions = self._timed_pass('detect_enhanced', self._detect_regions, gray)
+                if not any(regions):
+                    if page is not None:
+                        page.store(frame.dhash, [], [])
+                    return []
+
+            # 3-4. التعرف بالتوازي ثم الدمج حسب الخط
+            if page is None:
+                results = self._merge(self._recognize_all(gray, regions))
+            else:
+                results, new_regions = self._read_incremental(gray, regions, page)
+
+            seen_texts = set()
+            ordered = []
+            for line in reading_order(results):
+                for r in line:
+                    if r['text'] not in seen_texts:
+                        seen_texts.add(r['text'])
+                        ordered.append(r)
+            if page is not None:
+                page.store(frame.dhash, ordered, new_regions)
+            return ordered
             
         except Exception as e:
             print(f"⚠️ OCR error: {e}")
             return []
+
+    def get_stats(self) -> Dict:
+        return {
+            'readers': [group for (group, _), _ in zip(READER_LANGS, self.readers)],
+            'workers': OCR_WORKERS,
+            'min_edge_density': OCR_MIN_EDGE_DENSITY,
+            'presence_grid': OCR_PRESENCE_GRID,
+            'last_passes_ms': dict(self.last_passes),
+        }
     
     def _is_arabic(self, text: str) -> bool:
         """كشف إذا كان النص عربي"""
@@ -99,6 +270,10 @@ class OCRReader:
         arabic_chars = sum(1 for c in text if '\u0600' <= c <= '\u06FF')
         return arabic_chars > len(text) / 2
     
+    def get_text_lines(self, texts: List[Dict]) -> List[str]:
+        """النصوص سطراً بسطر بترتيب القراءة"""
+        return [' '.join(t['text'] for t in line) for line in reading_order(texts)]
+
     def get_combined_text(self, texts: List[Dict]) -> str:
         """دمج جميع النصوص المكتشفة"""
         if not texts:
@@ -108,3 +283,4 @@ class OCRReader:
 
 # إنشاء instance عام
 ocr_reader = OCRReader()
+model_registry.register('ocr', ocr_reader.load_model)
@@ -0,0 +1,229 @@
+"""
+ذاكرة OCR لكل جلسة - قراءة المستندات واللافتات بشكل تدريجي
+
+المستخدم يوجه الكاميرا لنفس الصفحة عدة ثوانٍ ويكرر أمر القراءة:
+- فريم شبه مطابق للفريم السابق (dHash) → نفس النتيجة بدون أي OCR
+- غير ذلك: الكشف (CRAFT) يعمل، لكن كل منطقة نص تُطابق بالمحتوى
+  (بصمة ثنائية لحبر قصاصتها - مستقلة عن موقعها، فتحريك الصفحة لا يبطل الذاكرة)
+  مع المناطق المقروءة سابقاً؛ فقط المناطق الجديدة أو المتغيرة تذهب للتعرف.
+  المقارنة محلية (أسوأ نافذة بعرض حرف) فتغيير حرف واحد في سطر طويل يُعاد قراءته،
+  وإزاحة المنطقة يجب أن توافق إزاحة باقي الصفحة
+- النتائج المدمجة مرتبة بترتيب القراءة (أسطر من الأعلى، العربي من اليمين)
+
+    page = session.ocr                       # مكون جلسة
+    ocr_reader.read_text(frame, page=page)
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from app.utils.caching import hamming_distance
+from app.utils.sessions import session_registry
+
+# بصمة القصاصة: الحبر (Otsu) مقصوصاً لحدوده ومصغراً لارتفاع ثابت
+REGION_SIGNATURE_HEIGHT = 24
+REGION_SIGNATURE_MAX_WIDTH = 960
+# أقصى نسبة بكسلات مختلفة في أسوأ نافذة بعرض حرف (~الارتفاع)
+OCR_REGION_MAX_DIFF = float(os.environ.get('OCR_REGION_MAX_DIFF', '0.05'))
+OCR_REGION_MAX_ASPECT_DIFF = 0.2  # فرق نسبة العرض/الارتفاع المسموح
+# الفريم كاملاً (dHash 64 بت) خشن: يُعاد فقط لمشهد شبه ثابت ولفترة قصيرة،
+# والتغييرات الصغيرة (رقم على شاشة) تلتقطها مطابقة المناطق بعد ذلك
+OCR_FRAME_MAX_DISTANCE = 2
+OCR_FRAME_TTL_S = float(os.environ.get('OCR_FRAME_TTL_S', '3'))
+OCR_PAGE_TTL_S = float(os.environ.get('OCR_PAGE_TTL_S', '30'))
+OCR_PAGE_MAX_REGIONS = 128
+
+
+def region_rect(region, shape) -> Optional[tuple]:
+    """مستطيل (x1, y1, x2, y2) لمنطقة EasyOCR: أفقية [x_min, x_max, y_min, y_max] أو مضلع 4 نقاط"""
+    h, w = shape[:2]
+    if len(region) == 4 and not hasattr(region[0], '__len__'):
+        x1, x2, y1, y2 = region
+    else:
+        points = np.asarray(region, dtype=float).reshape(-1, 2)
+        x1, y1 = points.min(axis=0)
+        x2, y2 = points.max(axis=0)
+    x1, y1 = max(0, int(x1)), max(0, int(y1))
+    x2, y2 = min(w, int(x2)), min(h, int(y2))
+    if x2 - x1 < 2 or y2 - y1 < 2:
+        return None
+    return x1, y1, x2, y2
+
+
+def region_signature(gray: np.ndarray, rect: tuple) -> np.ndarray:
+    """
+    بصمة محتوى منطقة النص: قناع الحبر (الفئة الأقل بعد Otsu - يعمل للنص الفاتح
+    على خلفية داكنة أيضاً) مقصوصاً لحدود الحبر، فاهتزاز صندوق CRAFT لا يغيرها
+    """
+    x1, y1, x2, y2 = rect
+    crop = gray[y1:y2, x1:x2]
+    _, ink = cv2.threshold(crop, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    if ink.mean() > 0.5:
+        ink = 1 - ink
+    ys, xs = np.nonzero(ink)
+    if len(xs):
+        crop = crop[ys.min():ys.max() + 1, xs.min():xs.max() + 1]
+        ink = ink[ys.min():ys.max() + 1, xs.min():xs.max() + 1]
+    height = REGION_SIGNATURE_HEIGHT
+    width = min(REGION_SIGNATURE_MAX_WIDTH, max(1, round(height * crop.shape[1] / crop.shape[0])))
+    return cv2.resize(ink, (width, height), interpolation=cv2.INTER_NEAREST).astype(np.uint8)
+
+
+def region_difference(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    اختلاف بصمتين: بكسل حبر بلا حبر مقابل في جواره (1 بكسل) في الأخرى،
+    في أسوأ نافذة بعرض حرف - لا يتخفف الفرق بطول السطر
+    """
+    if b.shape != a.shape:
+        b = cv2.resize(b, (a.shape[1], a.shape[0]), interpolation=cv2.INTER_NEAREST)
+    kernel = np.ones((3, 3), np.uint8)
+    mismatch = (a & (1 - cv2.dilate(b, kernel))) | (b & (1 - cv2.dilate(a, kernel)))
+    columns = mismatch.sum(axis=0).astype(float)
+    window = min(len(columns), a.shape[0])
+    worst = np.convolve(columns, np.ones(window), 'valid').max()
+    return float(worst) / (window * a.shape[0])
+
+
+def _is_arabic(text: str) -> bool:
+    return bool(text) and sum(1 for c in text if '\u0600' <= c <= '\u06FF') > len(text) / 2
+
+
+def reading_order(results: List[Dict]) -> List[List[Dict]]:
+    """
+    أسطر بترتيب القراءة: من الأعلى للأسفل، وداخل السطر من اليسار لليمين
+    (أو من اليمين لليسار إذا كان أغلب السطر عربياً)
+    """
+    if not results:
+        return []
+    boxes = [np.asarray(r['bbox'], dtype=float).reshape(-1, 2) for r in results]
+    centers = [b[:, 1].mean() for b in boxes]
+    heights = [max(b[:, 1].max() - b[:, 1].min(), 1.0) for b in boxes]
+    tolerance = float(np.median(heights)) / 2
+
+    lines: List[List[int]] = []
+    for i in sorted(range(len(results)), key=lambda i: centers[i]):
+        if lines and abs(centers[i] - np.mean([centers[j] for j in lines[-1]])) <= tolerance:
+            lines[-1].append(i)
+        else:
+            lines.append([i])
+
+    ordered = []
+    for line in lines:
+        rtl = sum(_is_arabic(results[i]['text']) for i in line) > len(line) / 2
+        line.sort(key=lambda i: boxes[i][:, 0].min(), reverse=rtl)
+        ordered.append([results[i] for i in line])
+    return ordered
+
+
+def _center_shift(rect: tuple, previous: tuple) -> np.ndarray:
+    """إزاحة مركز المنطقة (dx, dy) عن موقعها المخزن"""
+    return np.array([(rect[0] + rect[2] - previous[0] - previous[2]) / 2,
+                     (rect[1] + rect[3] - previous[1] - previous[3]) / 2])
+
+
+class OCRPage:
+    """الصفحة الحالية لجلسة: آخر فريم ونتيجته + المناطق المقروءة (hash → نتيجة)"""
+
+    def __init__(self, ttl: float = OCR_PAGE_TTL_S, max_regions: int = OCR_PAGE_MAX_REGIONS):
+        self.ttl = ttl
+        self.max_regions = max_regions
+        self.frame_hash: Optional[int] = None
+        self.frame_results: List[Dict] = []
+        self.frame_ts = 0.0
+        # كل منطقة: {'signature', 'rect', 'result' (None = لا نص), 'ts'}
+        self.regions: List[Dict] = []
+        self._lock = threading.Lock()
+        self.frame_hits = 0
+        self.region_hits = 0
+        self.region_misses = 0
+
+    def _expire(self, now: float):
+        self.regions = [r for r in self.regions if now - r['ts'] <= self.ttl]
+
+    def lookup_frame(self, frame_hash: int) -> Optional[List[Dict]]:
+        """نفس المشهد تقريباً → النتيجة السابقة كما هي"""
+        with self._lock:
+            if (self.frame_hash is None or time.monotonic() - self.frame_ts > OCR_FRAME_TTL_S
+                    or hamming_distance(frame_hash, self.frame_hash) > OCR_FRAME_MAX_DISTANCE):
+                return None
+            self.frame_hits += 1
+            return [dict(r) for r in self.frame_results]
+
+    def match_regions(self, keys: List[tuple]) -> List[Optional[Dict]]:
+        """
+        keys: (signature, rect) لكل منطقة في الفريم الحالي
+        Returns: المنطقة المخزنة المطابقة لكل مفتاح (أو None) - كل منطقة مخزنة تُستخدم مرة.
+        المطابقة بالمحتوى أولاً، ثم تُرفض أي مطابقة تخالف إزاحتها إزاحة الصفحة
+        (الوسيط) بأكثر من ارتفاع السطر - سطران متشابهان لا يتبادلان نتيجتيهما
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            used, candidates = set(), []
+            for signature, _ in keys:
+                aspect = signature.shape[1] / signature.shape[0]
+                best, best_difference = None, OCR_REGION_MAX_DIFF
+                for i, region in enumerate(self.regions):
+                    stored = region['signature']
+                    if i in used or abs(stored.shape[1] / stored.shape[0] - aspect) > OCR_REGION_MAX_ASPECT_DIFF * aspect:
+                        continue
+                    difference = region_difference(signature, stored)
+                    if difference <= best_difference:
+                        best, best_difference = i, difference
+                if best is not None:
+                    used.add(best)
+                candidates.append(best)
+
+            shifts = [_center_shift(rect, self.regions[i]['rect'])
+                      for (_, rect), i in zip(keys, candidates) if i is not None]
+            page_shift = np.median(shifts, axis=0) if shifts else None
+            matches = []
+            for (_, rect), i in zip(keys, candidates):
+                if i is not None:
+                    line_height = max(rect[3] - rect[1], self.regions[i]['rect'][3] - self.regions[i]['rect'][1])
+                    if np.abs(_center_shift(rect, self.regions[i]['rect']) - page_shift).max() > line_height:
+                        i = None
+                if i is None:
+                    matches.append(None)
+                    self.region_misses += 1
+                else:
+                    self.regions[i]['ts'] = now
+                    matches.append(self.regions[i])
+                    self.region_hits += 1
+            return matches
+
+    def store(self, frame_hash: int, results: List[Dict], new_regions: List[Dict]):
+        """حفظ نتيجة الفريم والمناطق المقروءة حديثاً (الأقدم يُحذف عند الامتلاء)"""
+        now = time.monotonic()
+        with self._lock:
+            self.frame_hash, self.frame_results, self.frame_ts = frame_hash, [dict(r) for r in results], now
+            for region in new_regions:
+                region['ts'] = now
+            self.regions.extend(new_regions)
+            if len(self.regions) > self.max_regions:
+                self.regions.sort(key=lambda r: r['ts'])
+                self.regions = self.regions[-self.max_regions:]
+
+    def reset(self):
+        with self._lock:
+            self.frame_hash, self.frame_results, self.regions = None, [], []
+
+    def get_stats(self) -> Dict:
+        total = self.region_hits + self.region_misses
+        return {
+            'regions': len(self.regions),
+            'frame_hits': self.frame_hits,
+            'region_hits': self.region_hits,
+            'region_misses': self.region_misses,
+            'region_hit_rate': self.region_hits / total if total else 0.0,
+        }
+
+
+# Instance عام (الجلسة الافتراضية)
+ocr_page = OCRPage()
+session_registry.register('ocr', lambda session_id: OCRPage(), default=ocr_page)
@@ -1,19 +1,31 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from .model import detector
 from .ttc import estimate_ttc
 from .ocr_reader import ocr_reader
+from .localization import SUPPORTED_LANGS, localizer
+from pydantic import BaseModel
+from app.utils.ingest import read_image_payload
 import io
 
 router = APIRouter()
 
+class Translation(BaseModel):
+    name: str
+    lang: str
+    text: str
+
 @router.post('/detect')
-async def detect(file: UploadFile = File(...)):
-    """Accepts an image file (jpeg/png) and returns detections."""
-    content = await file.read()
-    # In a real system, you'd convert bytes to image and run detector.
-    detections = detector.detect(content)
+async def detect(request: Request):
+    """Accepts an image (raw image/jpeg body, multipart `file` or `image_b64` JSON) and returns detections."""
+    payload = await read_image_payload(request)
+    detections = detector.detect(payload.image)
     return {'detections': detections}
 
+@router.get('/stats')
+async def detector_stats():
+    """Detector backend and micro-batching throughput counters."""
+    return detector.get_stats()
+
 @router.post('/estimate_ttc')
 async def ttc(distance_m: float, relative_speed_m_s: float):
     """Estimate TTC given distance and relative speed."""
@@ -21,11 +33,11 @@ async def ttc(distance_m: float, relative_speed_m_s: float):
     return {'ttc_seconds': t}
 
 @router.post('/read_text')
-async def read_text(file: UploadFile = File(...)):
+async def read_text(request: Request):
     """قراءة النصوص من صورة (OCR) - يدعم العربية والإنجليزية"""
-    content = await file.read()
+    payload = await read_image_payload(request)
     
-    texts = ocr_reader.read_text(content)
+    texts = ocr_reader.read_text(payload.image)
     combined_text = ocr_reader.get_combined_text(texts)
     
     return {
@@ -34,3 +46,16 @@ async def read_text(file: UploadFile = File(...)):
         'count': len(texts),
         'has_text': len(texts) > 0
     }
+
+@router.get('/translations')
+async def translation_stats():
+    """Localization tables, stored dynamic names and names still missing a translation."""
+    return localizer.get_stats()
+
+@router.post('/translations')
+async def add_translation(t: Translation):
+    """Store a translation for a dynamic name (e.g. a registered face) - persisted on disk."""
+    if t.lang not in SUPPORTED_LANGS:
+        raise HTTPException(status_code=400, detail=f"Unsupported language: {t.lang}")
+    localizer.add(t.name, t.lang, t.text)
+    return {'success': True, 'name': t.name, 'lang': t.lang, 'text': t.text}
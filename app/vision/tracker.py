@@ -0,0 +1,279 @@
+"""
+تتبع الكائنات - Multi-Object Tracker (SORT)
+
+كل كشف من WorldDetector.detect يُربط بمسار ثابت الهوية عبر الفريمات:
+- مرشح Kalman بسرعة ثابتة لكل مسار: مركز الصندوق، مساحته، نسبته، والمسافة
+  (بالأمتار) - مع dt حقيقي بين الفريمات (الفريمات تصل بفترات غير منتظمة)
+- الربط: IoU بين الصناديق المتوقعة والاكتشافات الجديدة (نفس الفئة)، جشع بالأعلى أولاً
+- كل كشف يحصل على: track_id، track_hits، velocity_px_s، approach_speed_m_s (موجب = يقترب)
+
+المسارات لكل جلسة (session.tracker) - مستخدمان مختلفان لا يتشاركان المسارات.
+WorldDetector.detect(frame, session=...) يحدّث مسارات الجلسة بنفسه، وهوية الوجه
+تُحفظ على المسار (identity/set_identity) فلا تنتقل لشخص آخر أو لمستخدم آخر.
+الاتجاه (DynamicAlertSystem)، التهدئة (SmartAlertManager) و"كائن جديد"
+(EnvironmentBaseline) تستخدم track_id بدل اسم الفئة، فشخصان = مساران.
+
+TRACKER_DETECT_INTERVAL > 1: الكاشف يعمل كل N فريم فقط، وبينها تُرجع
+المسارات المتوقعة (predict) بدون استنتاج.
+"""
+
+import os
+import threading
+import time
+import weakref
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.utils.sessions import session_registry
+
+TRACKER_IOU = float(os.environ.get('TRACKER_IOU', '0.3'))  # أدنى تداخل للربط
+TRACKER_MAX_AGE_S = float(os.environ.get('TRACKER_MAX_AGE_S', '1.5'))  # مسار بدون كشف يُحذف بعدها
+# ...أو بعد هذا العدد من فترات الكشف المرصودة، أيهما أطول: عميل يرسل فريماً كل 4 ثوانٍ
+# (الاستطلاع الاحتياطي) يحتفظ بمساراته بدل مسار جديد لكل فريم
+TRACKER_MAX_AGE_FRAMES = float(os.environ.get('TRACKER_MAX_AGE_FRAMES', '3'))
+TRACKER_MAX_INTERVAL_S = 10.0  # فجوة أطول (توقف العميل) لا تُحتسب في فترة الفريمات
+TRACKER_DETECT_INTERVAL = int(os.environ.get('TRACKER_DETECT_INTERVAL', '1'))  # 1 = الكشف كل فريم
+TRACKER_MAX_TRACKS = 64
+
+# هوية الوجه لكل مسار: شخص معروف لا يُعاد تشفيره كل فريم
+FACE_KNOWN_TTL = float(os.environ.get('FACE_KNOWN_TTL', '5'))  # ثواني قبل إعادة التحقق
+FACE_UNKNOWN_TTL = float(os.environ.get('FACE_UNKNOWN_TTL', '1'))  # المجهول يُعاد فحصه أسرع
+
+# الحالة: [cx, cy, s, r, d, vcx, vcy, vs, vd] - القياس: [cx, cy, s, r, d]
+_DIM_X, _DIM_Z = 9, 5
+_VELOCITY_OF = {0: 5, 1: 6, 2: 7, 4: 8}  # موضع → سرعته (النسبة r ثابتة)
+_H = np.eye(_DIM_Z, _DIM_X)
+_R = np.diag([1.0, 1.0, 10.0, 10.0, 0.25])
+_Q_BASE = np.diag([1.0, 1.0, 1.0, 1e-2, 0.05, 1e-2, 1e-2, 1e-4, 1e-2])
+
+
+def bbox_to_z(bbox, distance: float) -> np.ndarray:
+    x1, y1, x2, y2 = bbox
+    w, h = max(x2 - x1, 1e-3), max(y2 - y1, 1e-3)
+    return np.array([x1 + w / 2, y1 + h / 2, w * h, w / h, distance])
+
+
+def x_to_bbox(x: np.ndarray) -> List[float]:
+    s, r = max(x[2], 1e-3), max(x[3], 1e-3)
+    w = np.sqrt(s * r)
+    h = s / w
+    return [float(x[0] - w / 2), float(x[1] - h / 2), float(x[0] + w / 2), float(x[1] + h / 2)]
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """IoU لكل زوج: a (N, 4) × b (M, 4) → (N, M)"""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+class Track:
+    """مسار واحد: مرشح Kalman + آخر كشف"""
+
+    def __init__(self, track_id: int, det: Dict, now: float):
+        self.id = track_id
+        self.cls = det.get('base_class', det['class'])
+        self.x = np.zeros(_DIM_X)
+        self.x[:_DIM_Z] = bbox_to_z(det['bbox'], det.get('distance_m', 0.0))
+        self.P = np.diag([10.0, 10.0, 10.0, 10.0, 1.0, 1e4, 1e4, 1e4, 1e2])
+        self.det = det
+        self.hits = 1
+        self.first_seen = now
+        self.last_update = now
+        self.last_predict = now
+        self.identity: Optional[str] = None  # اسم الوجه ("Unknown" = وجه غير معروف)
+        self.identity_expires = 0.0
+
+    def predict(self, now: float) -> np.ndarray:
+        dt = max(now - self.last_predict, 0.0)
+        if dt > 0:
+            if self.x[2] + self.x[7] * dt <= 0:
+                self.x[7] = 0.0  # المساحة لا تصبح سالبة
+            F = np.eye(_DIM_X)
+            for pos, vel in _VELOCITY_OF.items():
+                F[pos, vel] = dt
+            self.x = F @ self.x
+            self.P = F @ self.P @ F.T + _Q_BASE * dt
+            self.last_predict = now
+        return np.array(x_to_bbox(self.x))
+
+    def update(self, det: Dict, now: float, count_hit: bool = True):
+        z = bbox_to_z(det['bbox'], det.get('distance_m', self.x[4]))
+        S = _H @ self.P @ _H.T + _R
+        K = self.P @ _H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ (z - _H @ self.x)
+        self.P = (np.eye(_DIM_X) - K @ _H) @ self.P
+        self.det = det
+        self.hits += count_hit
+        self.last_update = now
+
+    def annotate(self, det: Dict) -> Dict:
+        det['track_id'] = self.id
+        det['track_hits'] = self.hits
+        det['velocity_px_s'] = [round(float(self.x[5]), 1), round(float(self.x[6]), 1)]
+        det['approach_speed_m_s'] = round(float(-self.x[8]), 2) + 0.0  # بدون -0.0
+        return det
+
+
+class ObjectTracker:
+    """مسارات جلسة واحدة"""
+
+    def __init__(self, iou: float = TRACKER_IOU, max_age: float = TRACKER_MAX_AGE_S,
+                 detect_interval: int = TRACKER_DETECT_INTERVAL):
+        self.iou = iou
+        self.max_age = max_age
+        self.detect_interval = max(1, detect_interval)
+        self.tracks: List[Track] = []
+        self._next_id = 1
+        self._frames = 0
+        self._last_time: Optional[float] = None
+        self.frame_interval: Optional[float] = None  # متوسط متحرك للزمن بين فريمات الكشف
+        self._last_frame = None  # weakref لآخر Frame (كشف ثانٍ لنفس الفريم لا يُحسب فريماً جديداً)
+        self._lock = threading.Lock()
+        self.created = 0
+        self.predicted_frames = 0
+
+    @property
+    def effective_max_age(self) -> float:
+        """عمر المسار بدون كشف: max_age أو TRACKER_MAX_AGE_FRAMES فترات فريم، أيهما أطول"""
+        return max(self.max_age, TRACKER_MAX_AGE_FRAMES * (self.frame_interval or 0.0))
+
+    def _observe_interval(self, now: float):
+        if self._last_time is not None and 0 < now - self._last_time <= TRACKER_MAX_INTERVAL_S:
+            gap = now - self._last_time
+            self.frame_interval = gap if self.frame_interval is None else 0.7 * self.frame_interval + 0.3 * gap
+        self._last_time = now
+
+    def _match(self, predicted: np.ndarray, dets: List[Dict]) -> Dict[int, int]:
+        """{فهرس الكشف: فهرس المسار} - أعلى IoU أولاً، نفس الفئة فقط"""
+        if not self.tracks or not dets:
+            return {}
+        boxes = np.asarray([d['bbox'] for d in dets], dtype=float).reshape(-1, 4)
+        iou = iou_matrix(boxes, predicted)
+        classes = [d.get('base_class', d['class']) for d in dets]
+        same = np.array([[c == t.cls for t in self.tracks] for c in classes])
+        iou = np.where(same, iou, 0.0)
+
+        matches, used = {}, set()
+        for flat in np.argsort(-iou, axis=None):
+            i, j = divmod(int(flat), len(self.tracks))
+            if iou[i, j] < self.iou:
+                break
+            if i not in matches and j not in used:
+                matches[i] = j
+                used.add(j)
+        return matches
+
+    def update(self, detections: List[Dict], now: Optional[float] = None, frame=None) -> List[Dict]:
+        """
+        ربط اكتشافات الفريم بالمسارات - يضيف track_id والسرعات لكل كشف (في مكانه)
+
+        frame: الـ Frame المكشوف - كشف ثانٍ لنفس الفريم (مثل أمر البحث بمفردات إضافية)
+        يُربط بنفس المسارات بدون زيادة track_hits
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            repeat = frame is not None and self._last_frame is not None and self._last_frame() is frame
+            self._last_frame = weakref.ref(frame) if frame is not None else None
+            observed = False
+            if not repeat:
+                self._frames += 1
+                # الفجوة الحالية لا تطيل عمر المسارات بنفسها - إلا الأولى (لا معدل سابق)
+                if self.frame_interval is None:
+                    self._observe_interval(now)
+                    observed = True
+            max_age = self.effective_max_age
+            self.tracks = [t for t in self.tracks if now - t.last_update <= max_age]
+            if not repeat and not observed:
+                self._observe_interval(now)
+            predicted = np.array([t.predict(now) for t in self.tracks]).reshape(-1, 4)
+            matches = self._match(predicted, detections)
+
+            for i, det in enumerate(detections):
+                j = matches.get(i)
+                if j is not None:
+                    track = self.tracks[j]
+                    track.update(det, now, count_hit=not repeat)
+                else:
+                    track = Track(self._next_id, det, now)
+                    self._next_id += 1
+                    self.created += 1
+                    self.tracks.append(track)
+                track.annotate(det)
+
+            self.tracks = self.tracks[-TRACKER_MAX_TRACKS:]
+        return detections
+
+    def _track(self, track_id: int) -> Optional[Track]:
+        for track in self.tracks:
+            if track.id == track_id:
+                return track
+        return None
+
+    def identity(self, track_id: Optional[int], now: Optional[float] = None) -> Optional[str]:
+        """هوية الوجه المخزنة لمسار (None = غير معروفة أو انتهت صلاحيتها)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            track = self._track(track_id)
+            if track is None or track.identity_expires <= now:
+                return None
+            return track.identity
+
+    def set_identity(self, track_id: Optional[int], name: str, now: Optional[float] = None):
+        """حفظ نتيجة التعرف على الوجه للمسار (المعروف FACE_KNOWN_TTL، المجهول FACE_UNKNOWN_TTL)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            track = self._track(track_id)
+            if track is not None:
+                ttl = FACE_KNOWN_TTL if name != "Unknown" else FACE_UNKNOWN_TTL
+                track.identity, track.identity_expires = name, now + ttl
+
+    def should_detect(self) -> bool:
+        """هل يحتاج هذا الفريم للكاشف؟ (وإلا predict يكفي)"""
+        with self._lock:
+            return self.detect_interval <= 1 or not self.tracks or self._frames % self.detect_interval == 0
+
+    def predict(self, now: Optional[float] = None) -> List[Dict]:
+        """فريم بدون كشف: المسارات الحية بمواقعها ومسافاتها المتوقعة"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._frames += 1
+            self.predicted_frames += 1
+            out = []
+            max_age = self.effective_max_age
+            for t in self.tracks:
+                if now - t.last_update > max_age:
+                    continue
+                bbox = t.predict(now)
+                det = dict(t.det, bbox=[float(v) for v in bbox],
+                           distance_m=round(max(float(t.x[4]), 0.0), 2), predicted=True)
+                out.append(t.annotate(det))
+            out.sort(key=lambda d: d['distance_m'])
+            return out
+
+    def reset(self):
+        with self._lock:
+            self.tracks = []
+            self._frames = 0
+            self._last_time, self.frame_interval = None, None
+
+    def get_stats(self) -> Dict:
+        return {
+            'active_tracks': len(self.tracks),
+            'created': self.created,
+            'frames': self._frames,
+            'predicted_frames': self.predicted_frames,
+            'detect_interval': self.detect_interval,
+            'max_age_s': round(self.effective_max_age, 2),
+        }
+
+
+# Instance عام (الجلسة الافتراضية)
+object_tracker = ObjectTracker()
+session_registry.register('tracker', lambda session_id: ObjectTracker(), default=object_tracker)
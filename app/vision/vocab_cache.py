@@ -0,0 +1,108 @@
+"""
+كاش تضمينات النصوص لمفردات YOLO-World - Vocabulary Embedding Cache
+
+model.set_classes() يشغل مشفر نصوص CLIP على كل الفئات في كل مرة.
+هنا نحفظ تضمين كل اسم فئة مرة واحدة (LRU + حفظ على القرص)، فدمج مفردات
+إضافية لطلب معين (مثل "find my keys") يتم بالملي ثانية:
+فقط الأسماء الجديدة تمر على CLIP، والباقي من الكاش.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+import torch
+
+
+class TextEmbeddingCache:
+    """LRU لتضمينات أسماء الفئات (اسم → متجه) مع حفظ دائم"""
+
+    def __init__(self, path: Optional[Path] = None, max_entries: int = 2048):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, torch.Tensor]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        if not self.path or not self.path.exists():
+            return
+        try:
+            data = torch.load(str(self.path), map_location='cpu')
+            for name, emb in data.items():
+                self._entries[name] = emb
+            print(f"✅ Loaded {len(self._entries)} cached text embeddings")
+        except Exception as e:
+            print(f"⚠️ Could not load text embedding cache: {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            tmp = self.path.with_suffix('.tmp')
+            torch.save(dict(self._entries), str(tmp))
+            os.replace(tmp, self.path)  # استبدال ذري
+        except Exception as e:
+            print(f"⚠️ Could not save text embedding cache: {e}")
+
+    @staticmethod
+    def _encode(world_model, names: List[str]) -> torch.Tensor:
+        """تشغيل مشفر النصوص على الأسماء الناقصة فقط → (N, D)"""
+        with torch.no_grad():
+            if hasattr(world_model, 'get_text_pe'):
+                feats = world_model.get_text_pe(names)
+            else:
+                # إصدارات ultralytics الأقدم: set_classes تحسب txt_feats مباشرة
+                world_model.set_classes(names)
+                feats = world_model.txt_feats
+        return feats.reshape(len(names), -1).detach().float().cpu()
+
+    def get_embeddings(self, world_model, names: List[str]) -> torch.Tensor:
+        """تضمينات الأسماء بالترتيب → (1, N, D)"""
+        with self._lock:
+            missing = [n for n in dict.fromkeys(names) if n not in self._entries]
+            self.hits += len(names) - len(missing)
+            self.misses += len(missing)
+
+            if missing:
+                feats = self._encode(world_model, missing)
+                for name, emb in zip(missing, feats):
+                    self._entries[name] = emb.clone()
+
+            for name in names:
+                self._entries.move_to_end(name)
+            rows = [self._entries[n] for n in names]
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+            if missing:
+                self._save()
+
+        return torch.stack(rows).unsqueeze(0)
+
+    def get_stats(self) -> dict:
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+def apply_vocabulary(yolo_model, names: List[str], cache: TextEmbeddingCache):
+    """
+    تبديل مفردات نموذج YOLO-World (بديل سريع لـ model.set_classes)
+    يجب أن يتم تحت قفل/من thread واحد - النموذج مشترك
+    """
+    inner = yolo_model.model
+    feats = cache.get_embeddings(inner, names)
+
+    current = getattr(inner, 'txt_feats', None)
+    if isinstance(current, torch.Tensor):
+        feats = feats.to(device=current.device, dtype=current.dtype)
+
+    inner.txt_feats = feats
+    inner.model[-1].nc = len(names)
+    inner.names = list(names)
+    if getattr(yolo_model, 'predictor', None) is not None:
+        yolo_model.predictor.model.names = list(names)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+مقارنة زمن ودقة YOLO-World: PyTorch (.pt) مقابل الكاشف المصدر (ONNX Runtime / OpenVINO)
+
+الاستخدام:
+    python benchmarks/bench_detector_backends.py --images ./samples --backend onnx [--int8] [--runs 20]
+
+الدقة تقاس كاتفاق مع نموذج .pt (المرجع): نفس الفئة و IoU >= 0.5
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.vision.model import CUSTOM_CLASSES, MIN_CONFIDENCE, MODELDIR, TARGET_IMAGE_SIZE  # noqa: E402
+from app.vision.frame import Frame  # noqa: E402
+from app.vision.export_backend import load_exported_detector  # noqa: E402
+
+
+def load_images(folder: str, limit: int):
+    paths = sorted(p for p in Path(folder).glob('*') if p.suffix.lower() in ('.jpg', '.jpeg', '.png'))[:limit]
+    images = [cv2.imread(str(p)) for p in paths]
+    images = [img for img in images if img is not None]
+    if not images:
+        print("⚠️ No images found - using random noise (latency only, accuracy is meaningless)")
+        rng = np.random.default_rng(0)
+        images = [rng.integers(0, 255, (480, 640, 3), dtype=np.uint8) for _ in range(limit)]
+    # نفس التصغير المستخدم في WorldDetector
+    return [Frame(img).resized(TARGET_IMAGE_SIZE[0]).bgr for img in images]
+
+
+def run(model, images, runs: int):
+    """زمن كل استدعاء + نتائج آخر تشغيل لكل صورة"""
+    model(images[0], conf=MIN_CONFIDENCE, verbose=False)  # warm-up
+    latencies, outputs = [], []
+    for _ in range(runs):
+        outputs = []
+        for img in images:
+            start = time.perf_counter()
+            r = model(img, conf=MIN_CONFIDENCE, verbose=False)[0]
+            latencies.append((time.perf_counter() - start) * 1000)
+            outputs.append((
+                r.boxes.cls.cpu().numpy().astype(int),
+                r.boxes.conf.cpu().numpy(),
+                r.boxes.xyxy.cpu().numpy(),
+            ))
+    return latencies, outputs
+
+
+def iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def agreement(reference, candidate, thr: float = 0.5):
+    """recall/precision للمرشح مقابل المرجع + فرق الثقة للأزواج المتطابقة"""
+    matched, ref_total, cand_total, conf_deltas = 0, 0, 0, []
+    for (rc, rs, rb), (cc, cs, cb) in zip(reference, candidate):
+        ref_total += len(rc)
+        cand_total += len(cc)
+        used = set()
+        for i in range(len(rc)):
+            best, best_j = 0.0, None
+            for j in range(len(cc)):
+                if j in used or cc[j] != rc[i]:
+                    continue
+                v = iou(rb[i], cb[j])
+                if v > best:
+                    best, best_j = v, j
+            if best_j is not None and best >= thr:
+                used.add(best_j)
+                matched += 1
+                conf_deltas.append(abs(float(rs[i]) - float(cs[best_j])))
+    return {
+        'recall': matched / ref_total if ref_total else 1.0,
+        'precision': matched / cand_total if cand_total else 1.0,
+        'mean_conf_delta': statistics.mean(conf_deltas) if conf_deltas else 0.0,
+    }
+
+
+def summarize(name, latencies):
+    lat = sorted(latencies)
+    p95 = lat[int(len(lat) * 0.95) - 1] if len(lat) >= 20 else lat[-1]
+    print(f"{name:>10}: mean {statistics.mean(lat):7.1f} ms | p50 {statistics.median(lat):7.1f} ms | p95 {p95:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--images', default='samples')
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--backend', choices=('onnx', 'openvino'), default='onnx')
+    parser.add_argument('--int8', action='store_true')
+    parser.add_argument('--weights', default=str(MODELDIR / 'yolov8s-worldv2.pt'))
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+
+    images = load_images(args.images, args.limit)
+    weights = Path(args.weights)
+
+    torch_model = YOLO(str(weights))
+    torch_model.set_classes(CUSTOM_CLASSES)
+    exported, backend = load_exported_detector(weights, CUSTOM_CLASSES, args.backend, args.int8)
+    if exported is None:
+        sys.exit(f"❌ Could not load/export the {args.backend} backend")
+
+    torch_lat, torch_out = run(torch_model, images, args.runs)
+    exp_lat, exp_out = run(exported, images, args.runs)
+
+    label = backend + ('-int8' if args.int8 else '')
+    print(f"\n{len(images)} images x {args.runs} runs")
+    summarize('torch', torch_lat)
+    summarize(label, exp_lat)
+    print(f"   speedup: {statistics.mean(torch_lat) / statistics.mean(exp_lat):.2f}x")
+
+    acc = agreement(torch_out, exp_out)
+    print(f"agreement vs torch: recall {acc['recall']:.3f} | precision {acc['precision']:.3f} | "
+          f"mean |Δconf| {acc['mean_conf_delta']:.3f}")
+
+
+if __name__ == '__main__':
+    main()
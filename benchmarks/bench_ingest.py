@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+مقارنة استقبال الصور: base64 داخل JSON مقابل image/jpeg خام و multipart
+
+لكل صيغة نقيس:
+- حجم الطلب (بايت/فريم)
+- زمن CPU على الخادم: read_image_payload عبر Request حقيقي من Starlette
+  (قراءة الجسم + JSON/multipart + فك base64) حتى الحصول على بايتات JPEG
+- زمن CPU على العميل لتجهيز الطلب (base64 + json.dumps)
+
+الاستخدام:
+    python benchmarks/bench_ingest.py [--image samples/frame.jpg] [--runs 2000]
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from starlette.requests import Request  # noqa: E402
+
+from app.utils.ingest import read_image_payload  # noqa: E402
+
+BOUNDARY = 'benchboundary7MA4YWxkTrZu0gW'
+
+
+def load_jpeg(path: str) -> bytes:
+    img = cv2.imread(path) if path else None
+    if img is None:
+        # نفس الفريم الذي يرسله العميل: 640x480 بجودة 0.7
+        rng = np.random.default_rng(0)
+        img = cv2.GaussianBlur(rng.integers(0, 255, (480, 640, 3), dtype=np.uint8), (9, 9), 0)
+    ok, encoded = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 70])
+    return encoded.tobytes()
+
+
+def build_json(jpeg: bytes) -> bytes:
+    data_url = 'data:image/jpeg;base64,' + base64.b64encode(jpeg).decode('ascii')
+    return json.dumps({'image_b64': data_url, 'check_motion': True}).encode()
+
+
+def build_multipart(jpeg: bytes) -> bytes:
+    return (
+        f'--{BOUNDARY}\r\n'
+        'Content-Disposition: form-data; name="check_motion"\r\n\r\ntrue\r\n'
+        f'--{BOUNDARY}\r\n'
+        'Content-Disposition: form-data; name="image"; filename="frame.jpg"\r\n'
+        'Content-Type: image/jpeg\r\n\r\n'
+    ).encode() + jpeg + f'\r\n--{BOUNDARY}--\r\n'.encode()
+
+
+def make_request(body: bytes, content_type: str) -> Request:
+    scope = {
+        'type': 'http', 'method': 'POST', 'path': '/assistant/analyze', 'query_string': b'',
+        'headers': [(b'content-type', content_type.encode()), (b'content-length', str(len(body)).encode())],
+    }
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    return Request(scope, receive)
+
+
+async def time_ingest(body: bytes, content_type: str, runs: int):
+    timings = []
+    for _ in range(runs):
+        request = make_request(body, content_type)
+        start = time.perf_counter()
+        payload = await read_image_payload(request)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings, payload
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--image', default='')
+    parser.add_argument('--runs', type=int, default=2000)
+    args = parser.parse_args()
+
+    jpeg = load_jpeg(args.image)
+
+    start = time.perf_counter()
+    for _ in range(args.runs):
+        build_json(jpeg)
+    client_json_us = (time.perf_counter() - start) / args.runs * 1e6
+
+    formats = [
+        ('json+base64', build_json(jpeg), 'application/json'),
+        ('multipart', build_multipart(jpeg), f'multipart/form-data; boundary={BOUNDARY}'),
+        ('image/jpeg', jpeg, 'image/jpeg'),
+    ]
+
+    print(f"JPEG frame: {len(jpeg)} bytes, {args.runs} runs\n")
+    print(f"{'format':>12} | {'bytes/frame':>11} | {'overhead':>8} | {'server p50 µs':>13} | {'server mean µs':>14}")
+    baseline = None
+    for name, body, content_type in formats:
+        timings, payload = asyncio.run(time_ingest(body, content_type, args.runs))
+        assert bytes(payload.image) == jpeg, name
+        overhead = (len(body) / len(jpeg) - 1) * 100
+        mean = statistics.mean(timings)
+        baseline = baseline or (len(body), mean)
+        print(f"{name:>12} | {len(body):>11} | {overhead:>7.1f}% | {statistics.median(timings):>13.1f} | {mean:>14.1f}")
+
+    raw_mean = statistics.mean(asyncio.run(time_ingest(jpeg, 'image/jpeg', args.runs))[0])
+    print(f"\nsaved per frame vs json+base64: {baseline[0] - len(jpeg)} bytes, "
+          f"{baseline[1] - raw_mean:.1f} µs server CPU + {client_json_us:.1f} µs client encode")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+المعالجة اللاحقة لصناديق YOLO-World: الحلقة القديمة (صندوق بصندوق) مقابل
+postprocess_detections (تمرير NumPy واحد)
+
+نتائج اصطناعية بعدد كبير من الاكتشافات (مشهد مزدحم) بنفس واجهة ultralytics
+(r.boxes.cls / conf / xyxy و r.names). يتحقق أيضاً من تطابق المخرجات.
+
+الاستخدام:
+    python benchmarks/bench_postprocess.py [--boxes 50,200,1000] [--runs 200]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.vision.model import (  # noqa: E402
+    CLASS_THRESHOLDS, CUSTOM_CLASSES, DETECTION_TOP_K, TARGET_IMAGE_SIZE,
+    face_box_mask, filter_impossible_detections, has_person_class, postprocess_detections,
+)
+from app.vision.localization import localizer  # noqa: E402
+
+
+class FakeTensor:
+    """الحد الأدنى من واجهة torch.Tensor المستخدمة في الحلقة القديمة"""
+
+    def __init__(self, array):
+        self.array = np.asarray(array)
+
+    def __getitem__(self, i):
+        return FakeTensor(self.array[i])
+
+    def __iter__(self):
+        return (FakeTensor(a) for a in self.array)
+
+    def __int__(self):
+        return int(self.array)
+
+    def item(self):
+        return self.array.item()
+
+    def tolist(self):
+        return self.array.tolist()
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+
+class FakeBoxes:
+    def __init__(self, cls, conf, xyxy):
+        self.cls, self.conf, self.xyxy = FakeTensor(cls), FakeTensor(conf), FakeTensor(xyxy)
+
+    def __iter__(self):
+        for i in range(len(self.cls.array)):
+            yield FakeBoxes(self.cls.array[i:i + 1], self.conf.array[i:i + 1], self.xyxy.array[i:i + 1])
+
+
+class FakeResult:
+    def __init__(self, n, rng):
+        h, w = TARGET_IMAGE_SIZE[1], TARGET_IMAGE_SIZE[0]
+        x1 = rng.uniform(0, w - 10, n)
+        y1 = rng.uniform(0, h - 10, n)
+        xyxy = np.stack([x1, y1, x1 + rng.uniform(5, w, n).clip(max=w - x1),
+                         y1 + rng.uniform(5, h, n).clip(max=h - y1)], axis=1).astype(np.float32)
+        self.boxes = FakeBoxes(rng.integers(0, len(CUSTOM_CLASSES), n).astype(np.float32),
+                               rng.uniform(0.35, 1.0, n).astype(np.float32), xyxy)
+        self.names = dict(enumerate(CUSTOM_CLASSES))
+
+
+def legacy(results, img_h, box_distances, identified_names, target_lang='ar'):
+    """الحلقة القديمة كما كانت في WorldDetector.detect"""
+    identified_names = list(identified_names)
+    has_person = False
+    for r in results:
+        for cls_id in r.boxes.cls:
+            if r.names[int(cls_id)] in ['person', 'man', 'woman', 'child']:
+                has_person = True
+                break
+
+    detections = []
+    box_index = -1
+    for r in results:
+        for box in r.boxes:
+            box_index += 1
+            cls_id = int(box.cls[0].item())
+            conf = float(box.conf[0].item())
+            cls_name = r.names[cls_id] if cls_id < len(r.names) else 'unknown'
+            if cls_name in CLASS_THRESHOLDS and conf < CLASS_THRESHOLDS[cls_name]:
+                continue
+            if cls_name in ['person', 'man', 'woman'] and len(identified_names) > 0:
+                name = identified_names.pop(0)
+                if name != "Unknown":
+                    cls_name = name
+            localized = localizer.localize(cls_name, target_lang)
+            xyxy = box.xyxy[0].tolist()
+            dist = 0.0
+            if box_distances is not None and not np.isnan(box_distances[box_index]):
+                dist = float(box_distances[box_index])
+            if dist == 0.0:
+                ratio = (xyxy[3] - xyxy[1]) / img_h
+                if ratio > 0.8: dist = 0.5
+                elif ratio > 0.6: dist = 1.0
+                elif ratio > 0.4: dist = 2.0
+                elif ratio > 0.2: dist = 3.5
+                else: dist = 6.0
+            detections.append({
+                'class': str(cls_name),
+                'class_ar': str(localized),
+                'conf': float(round(conf, 2)),
+                'bbox': [float(x) for x in xyxy],
+                'distance_m': float(dist)
+            })
+    detections = filter_impossible_detections(detections)
+    detections.sort(key=lambda x: x['distance_m'])
+    return has_person, detections[:DETECTION_TOP_K]
+
+
+def vectorized(results, img_h, box_distances, identified_names, target_lang='ar'):
+    names = [results[0].names[i] for i in range(len(results[0].names))]
+    cls_ids = np.concatenate([r.boxes.cls.cpu().numpy().ravel() for r in results])
+    confs = np.concatenate([r.boxes.conf.cpu().numpy().ravel() for r in results])
+    boxes = np.concatenate([r.boxes.xyxy.cpu().numpy().reshape(-1, 4) for r in results])
+    has_person = has_person_class(cls_ids, names)
+    # نفس الربط الجشع القديم (الوجه i → صندوق الشخص i) لمقارنة المخرجات
+    box_names = [None] * len(cls_ids)
+    for i, name in zip(np.flatnonzero(face_box_mask(cls_ids, names)), identified_names):
+        box_names[i] = name
+    detections = postprocess_detections(cls_ids, confs, boxes, names, img_h, distances=box_distances,
+                                        box_names=box_names, target_lang=target_lang)
+    # base_class (فئة الكاشف للوجوه المعروفة) حقل إضافي لم يكن في المخرجات القديمة
+    return has_person, [{k: v for k, v in d.items() if k != 'base_class'} for d in detections]
+
+
+def time_it(func, args, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--boxes', default='10,50,200,1000')
+    parser.add_argument('--runs', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    img_h = TARGET_IMAGE_SIZE[1]
+    print(f"{'boxes':>6} | {'loop ms':>8} | {'numpy ms':>8} | {'speedup':>7} | same output")
+    for n in (int(x) for x in args.boxes.split(',')):
+        results = [FakeResult(n, rng)]
+        distances = rng.uniform(0.3, 8.0, n)
+        distances[rng.random(n) < 0.2] = np.nan  # صناديق بدون عمق صالح → التقدير
+        call = (results, img_h, distances, ['Ahmed', 'Unknown', 'Sara'])
+
+        same = legacy(*call) == vectorized(*call)
+        loop_ms = time_it(legacy, call, args.runs)
+        numpy_ms = time_it(vectorized, call, args.runs)
+        print(f"{n:>6} | {loop_ms:>8.3f} | {numpy_ms:>8.3f} | {loop_ms / numpy_ms:>6.1f}x | {same}")
+
+
+if __name__ == '__main__':
+    main()
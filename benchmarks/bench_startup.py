@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+زمن بدء التشغيل: استيراد app.main (كسول) مقابل تحميل كل النماذج (السلوك القديم)
+
+كل قياس في عملية Python جديدة (cold start حقيقي):
+- lazy : import app.main فقط - لا نموذج يُحمّل
+- eager: import app.main + model_registry.warm_up(background=False)
+         (ما كان يحدث عند الاستيراد قبل سجل النماذج)
+
+لكل وضع: الزمن، ذاكرة RSS القصوى، والمكتبات الثقيلة المستوردة.
+
+الاستخدام:
+    python benchmarks/bench_startup.py [--runs 3] [--modes lazy,eager]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+HEAVY_MODULES = ('torch', 'ultralytics', 'easyocr', 'face_recognition', 'librosa', 'faster_whisper')
+
+CHILD = r'''
+import json, resource, sys, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter() - start
+if sys.argv[1] == 'eager':
+    from app.utils.model_registry import model_registry
+    model_registry.warm_up(background=False)
+total = time.perf_counter() - start
+from app.utils.model_registry import model_registry
+print(json.dumps({
+    'import_s': imported,
+    'total_s': total,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'heavy': [m for m in %r if m in sys.modules],
+    'models': {k: v['state'] for k, v in model_registry.get_stats().items()},
+}))
+''' % (HEAVY_MODULES,)
+
+
+def run_once(mode: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, '-c', CHILD, mode],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr else 'failed')
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--modes', default='lazy,eager')
+    args = parser.parse_args()
+
+    print(f"{'mode':>6} | {'import s':>8} | {'ready s':>8} | {'max RSS MB':>10} | heavy modules")
+    for mode in args.modes.split(','):
+        results = [run_once(mode) for _ in range(args.runs)]
+        last = results[-1]
+        print(f"{mode:>6} | {statistics.median(r['import_s'] for r in results):>8.2f} | "
+              f"{statistics.median(r['total_s'] for r in results):>8.2f} | "
+              f"{statistics.median(r['max_rss_mb'] for r in results):>10.0f} | "
+              f"{','.join(last['heavy']) or '-'}")
+        print(f"{'':>6}   models: {last['models']}")
+
+
+if __name__ == '__main__':
+    main()
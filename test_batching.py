@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار تجميع الطلبات (MicroBatcher)
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.vision.batching import MicroBatcher  # noqa: E402
+
+
+def _recording_batcher(**kwargs):
+    batches = []
+
+    def run_batch(items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+
+    return MicroBatcher(run_batch, **kwargs), batches
+
+
+def test_concurrent_requests_share_one_forward_pass():
+    batcher, batches = _recording_batcher(max_batch_size=8, max_wait_ms=200)
+    futures = [batcher.submit_async(i) for i in range(5)]
+    assert [f.result(timeout=2) for f in futures] == [0, 10, 20, 30, 40]
+    assert batches == [[0, 1, 2, 3, 4]]
+    assert batcher.get_stats()['avg_batch_size'] == 5
+
+
+def test_batch_size_is_capped():
+    gate = threading.Event()
+    batches = []
+
+    def run_batch(items):
+        gate.wait(2)  # أول دفعة تنتظر حتى تصل كل الطلبات
+        batches.append(list(items))
+        return items
+
+    batcher = MicroBatcher(run_batch, max_batch_size=3, max_wait_ms=0)
+    futures = [batcher.submit_async(0)]
+    futures += [batcher.submit_async(i) for i in range(1, 8)]
+    gate.set()
+    assert [f.result(timeout=2) for f in futures] == list(range(8))
+    assert all(len(batch) <= 3 for batch in batches)
+    assert sum(batches, []) == list(range(8))
+
+
+def test_group_key_keeps_groups_apart():
+    batcher, batches = _recording_batcher(max_batch_size=8, max_wait_ms=200, group_key=lambda item: item % 2)
+    futures = [batcher.submit_async(i) for i in range(6)]
+    assert [f.result(timeout=2) for f in futures] == [0, 10, 20, 30, 40, 50]
+    assert sorted(batches) == [[0, 2, 4], [1, 3, 5]]
+
+
+def test_errors_reach_every_caller_and_worker_survives():
+    calls = []
+
+    def run_batch(items):
+        calls.append(items)
+        if len(calls) == 1:
+            raise ValueError('forward failed')
+        return items
+
+    batcher = MicroBatcher(run_batch, max_batch_size=4, max_wait_ms=200)
+    futures = [batcher.submit_async(i) for i in range(2)]
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=2)
+    assert batcher.submit(7, timeout=2) == 7
+    assert batcher.get_stats()['errors'] == 1
+
+
+def test_result_count_mismatch_is_an_error():
+    batcher = MicroBatcher(lambda items: items[:-1], max_batch_size=4, max_wait_ms=200)
+    with pytest.raises(RuntimeError):
+        batcher.submit(1, timeout=2)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار محرك الكاش: LRU، TTL بوقت monotonic، ميزانية البايتات، طبقة القرص، ومفاتيح cached
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.utils import caching  # noqa: E402
+from app.utils.caching import CacheManager, cached  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_lru_evicts_least_recently_used():
+    size = caching._entry_size('x' * 10)
+    cache = CacheManager(ttl=60, max_bytes=3 * size)
+    for key in ('a', 'b', 'c'):
+        cache.set_key(key, 'x' * 10)
+    assert cache.get_key('a') is not None  # a أحدث استخداماً من b
+    cache.set_key('d', 'x' * 10)
+    assert list(cache.memory_cache) == ['c', 'a', 'd']
+    assert cache.get_key('b') is None
+    assert cache.evictions == 1
+
+
+def test_ttl_uses_monotonic_time(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(caching.time, 'monotonic', clock)
+    cache = CacheManager(ttl=30)
+    cache.set_key('k', {'v': 1})
+    clock.now += 29
+    assert cache.get_key('k') == {'v': 1}
+    clock.now += 2
+    assert cache.get_key('k') is None
+    assert cache.expirations == 1
+    assert 'k' not in cache.memory_cache
+
+
+def test_byte_budget_evicts_until_under_budget():
+    cache = CacheManager(ttl=60, max_bytes=1000)
+    for i in range(10):
+        cache.set_key(f'k{i}', 'x' * 200)
+    assert cache.current_bytes <= 1000
+    assert cache.current_bytes == sum(size for _, size, _ in cache.memory_cache.values())
+    assert list(cache.memory_cache) == ['k6', 'k7', 'k8', 'k9']
+    # مدخل أكبر من الميزانية كلها لا يُخزن ولا يطرد الباقي
+    cache.set_key('huge', 'x' * 5000)
+    assert 'huge' not in cache.memory_cache
+    assert len(cache.memory_cache) == 4
+
+
+def test_disk_tier_round_trip(tmp_path):
+    CacheManager(ttl=60, cache_dir=tmp_path).set_key('k', {'objects': [1, 2, 3]})
+    # نسخة جديدة (إعادة تشغيل): الذاكرة فارغة، القرص يحمل المدخل
+    cache = CacheManager(ttl=60, cache_dir=tmp_path)
+    assert cache.get_key('k') == {'objects': [1, 2, 3]}
+    assert cache.disk_hits == 1
+    assert cache.get_key('k') == {'objects': [1, 2, 3]}
+    assert cache.hits == 1  # رُفع للذاكرة
+
+
+def test_disk_tier_expired_entries(tmp_path):
+    cache = CacheManager(ttl=60, cache_dir=tmp_path)
+    cache.set_key('old', 1, ttl=-1)
+    cache.set_key('new', 2)
+    assert CacheManager(ttl=60, cache_dir=tmp_path).get_key('old') is None
+    assert cache.clear_expired() >= 1
+    assert len(cache.disk) == 1
+
+
+def test_cached_key_is_stable():
+    calls = []
+
+    @cached(prefix='t', ttl=60)
+    def describe(image: bytes, lang: str = 'ar', detail: bool = False):
+        calls.append((image, lang, detail))
+        return {'n': len(calls)}
+
+    first = describe(b'jpeg', lang='en', detail=True)
+    # بايتات مساوية بكائن مختلف، وترتيب kwargs مختلف = نفس المفتاح
+    assert describe(bytes(bytearray(b'jpeg')), detail=True, lang='en') == first
+    assert len(calls) == 1
+    describe(b'jpeg', lang='ar', detail=True)
+    describe(b'other', lang='en', detail=True)
+    assert len(calls) == 3
+    assert caching._call_key('t', (b'jpeg',), {'lang': 'en'}) == caching._call_key('t', (b'jpeg',), {'lang': 'en'})
+
+
+def test_cached_async_function():
+    import asyncio
+    calls = []
+
+    @cached(prefix='a', ttl=60)
+    async def lookup(text: str):
+        calls.append(text)
+        return text.upper()
+
+    async def run():
+        return [await lookup('x'), await lookup('x'), await lookup('y')]
+
+    assert asyncio.run(run()) == ['X', 'X', 'Y']
+    assert calls == ['x', 'y']
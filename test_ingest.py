@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار استقبال الصور الموحد (read_image_payload): خام، multipart، JSON base64
+"""
+
+import base64
+import sys
+from pathlib import Path
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.utils.ingest import read_image_payload  # noqa: E402
+
+IMAGE = b'\xff\xd8\xff\xe0fake-jpeg-bytes\xff\xd9'
+
+
+class Options(BaseModel):
+    check_motion: bool = True
+    lang: str = 'ar'
+
+
+app = FastAPI()
+
+
+@app.post('/analyze')
+async def analyze(request: Request):
+    payload = await read_image_payload(request)
+    options = payload.parse(Options)
+    return {
+        'source': payload.source,
+        'image': base64.b64encode(payload.image).decode('ascii'),
+        'check_motion': options.check_motion,
+        'lang': options.lang,
+    }
+
+
+@app.post('/command')
+async def command(request: Request):
+    payload = await read_image_payload(request, required=False)
+    return {'source': payload.source, 'fields': payload.fields}
+
+
+client = TestClient(app)
+
+
+def _image(response):
+    assert response.status_code == 200, response.text
+    return base64.b64decode(response.json()['image'])
+
+
+def test_raw_body_with_query_fields():
+    response = client.post('/analyze?check_motion=false', content=IMAGE, headers={'Content-Type': 'image/jpeg'})
+    assert _image(response) == IMAGE
+    assert response.json()['source'] == 'raw'
+    assert response.json()['check_motion'] is False
+
+
+def test_multipart_file_and_text_fields():
+    response = client.post('/analyze', files={'image': ('frame.jpg', IMAGE, 'image/jpeg')}, data={'lang': 'da'})
+    assert _image(response) == IMAGE
+    assert response.json()['source'] == 'multipart'
+    assert response.json()['lang'] == 'da'
+
+
+def test_multipart_base64_field():
+    response = client.post('/analyze', data={'image_b64': base64.b64encode(IMAGE).decode()},
+                           files={'unused': ('x.txt', b'', 'text/plain')})
+    assert _image(response) == IMAGE
+
+
+def test_json_base64_with_data_url_prefix():
+    image_b64 = 'data:image/jpeg;base64,' + base64.b64encode(IMAGE).decode()
+    response = client.post('/analyze', json={'image_b64': image_b64, 'check_motion': False})
+    assert _image(response) == IMAGE
+    assert response.json()['source'] == 'json'
+    assert response.json()['check_motion'] is False
+
+
+def test_invalid_base64_is_400():
+    for image_b64 in ('not base64!!', '====', 'data:image/jpeg;base64,'):
+        response = client.post('/analyze', json={'image_b64': image_b64})
+        assert response.status_code == 400, image_b64
+
+
+def test_missing_image():
+    assert client.post('/analyze', json={'lang': 'en'}).status_code == 400
+    response = client.post('/command', json={'text': 'hello'})
+    assert response.json() == {'source': 'none', 'fields': {'text': 'hello'}}
+
+
+def test_invalid_json_and_fields():
+    assert client.post('/analyze', content=b'{oops', headers={'Content-Type': 'application/json'}).status_code == 400
+    assert client.post('/analyze', json=[1, 2]).status_code == 400
+    response = client.post('/analyze?check_motion=maybe', content=IMAGE, headers={'Content-Type': 'image/jpeg'})
+    assert response.status_code == 422
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار بث رد LLM جملة بجملة (astream_sentences) على استجابة Ollama NDJSON
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.assistant.llm_client import LLMClient  # noqa: E402
+
+
+def _client(tokens, status=200):
+    """LLMClient على استجابة /api/generate مسجلة (بدون Ollama)"""
+    def handler(request):
+        assert request.url.path == '/api/generate'
+        assert json.loads(request.content)['stream'] is True
+        lines = [json.dumps({'response': t, 'done': False}) for t in tokens]
+        lines.append(json.dumps({'response': '', 'done': True}))
+        return httpx.Response(status, content='\n'.join(lines).encode('utf-8'))
+
+    client = LLMClient(host='http://ollama.test')
+    client.is_ready = True
+    client._async_client = httpx.AsyncClient(base_url=client.host, transport=httpx.MockTransport(handler))
+    return client
+
+
+def _sentences(tokens):
+    async def run():
+        return [s async for s in _client(tokens).astream_sentences('prompt')]
+    return asyncio.run(run())
+
+
+def test_sentences_are_split_across_token_boundaries():
+    tokens = ['Hello th', 'ere. How a', 're you', '? I am fine']
+    assert _sentences(tokens) == ['Hello there.', 'How are you?', 'I am fine']
+
+
+def test_short_fragments_are_merged_with_the_next_sentence():
+    assert _sentences(['Yes. ', 'I can see a chair.']) == ['Yes. I can see a chair.']
+
+
+def test_decimals_and_arabic_punctuation():
+    tokens = ['الكرسي على بعد 3.5 متر. ', 'هل تريد المساعدة؟', ' نعم']
+    assert _sentences(tokens) == ['الكرسي على بعد 3.5 متر.', 'هل تريد المساعدة؟', 'نعم']
+
+
+def test_empty_reply_yields_nothing():
+    assert _sentences([]) == []
+
+
+def test_http_error_is_one_sentence():
+    async def run():
+        return [s async for s in _client(['x'], status=500).astream_sentences('prompt')]
+    sentences = asyncio.run(run())
+    assert len(sentences) == 1 and sentences[0].startswith('Error:')
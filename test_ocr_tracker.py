@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار ذاكرة صفحة OCR (إعادة استخدام المناطق)
+"""
+
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.vision.ocr_session import OCRPage, region_rect, region_signature  # noqa: E402
+
+
+def _render(lines, noise=4, offset=(0, 0), seed=0):
+    """صورة رمادية لسطور نص على خلفية فاتحة مع ضجيج المستشعر"""
+    gray = np.full((360, 640), 235, np.uint8)
+    for i, text in enumerate(lines):
+        cv2.putText(gray, text, (40 + offset[0], 70 + 80 * i + offset[1]),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.2, 20, 2)
+    rng = np.random.default_rng(seed)
+    return np.clip(gray + rng.normal(0, noise, gray.shape), 0, 255).astype(np.uint8)
+
+
+def _regions(gray, count, offset=(0, 0)):
+    """مناطق أفقية كما يعيدها CRAFT: [x_min, x_max, y_min, y_max]"""
+    return [[30 + offset[0], 600 + offset[0], 35 + 80 * i + offset[1], 85 + 80 * i + offset[1]]
+            for i in range(count)]
+
+
+def _keys(gray, regions):
+    rects = [region_rect(region, gray.shape) for region in regions]
+    return [(region_signature(gray, rect), rect) for rect in rects]
+
+
+def _page(lines):
+    page = OCRPage()
+    gray = _render(lines)
+    page.store(0, [], [{'signature': signature, 'rect': rect, 'result': {'text': text}}
+                       for (signature, rect), text in zip(_keys(gray, _regions(gray, len(lines))), lines)])
+    return page
+
+
+def test_same_page_reuses_regions():
+    lines = ['Platform 3 to Aarhus', 'Departure 08:15']
+    page = _page(lines)
+    gray = _render(lines, noise=8, offset=(25, 10), seed=1)
+    matches = page.match_regions(_keys(gray, _regions(gray, 2, offset=(25, 10))))
+    assert [m['result']['text'] for m in matches] == lines
+
+
+def test_one_character_change_is_read_again():
+    page = _page(['Platform 3 to Aarhus', 'Departure 08:15'])
+    gray = _render(['Platform 8 to Aarhus', 'Departure 08:15'], seed=2)
+    matches = page.match_regions(_keys(gray, _regions(gray, 2)))
+    assert matches[0] is None
+    assert matches[1]['result']['text'] == 'Departure 08:15'
+
+
+def test_region_moved_against_the_page_is_read_again():
+    page = _page(['Gate 12', 'Exit B', 'Room 204'])
+    # الصفحة ثابتة، لكن نص السطر الأول ظهر الآن في سطر رابع
+    gray = _render(['', 'Exit B', 'Room 204', 'Gate 12'], seed=3)
+    matches = page.match_regions(_keys(gray, _regions(gray, 4)[1:]))
+    assert [m and m['result']['text'] for m in matches] == ['Exit B', 'Room 204', None]
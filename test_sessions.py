@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار سجل الجلسات: المكونات لكل جلسة، إخلاء الخاملة، حد LRU لكل shard
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.utils import sessions  # noqa: E402
+from app.utils.sessions import DEFAULT_SESSION_ID, SessionRegistry  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _registry(**kwargs):
+    registry = SessionRegistry(**kwargs)
+    registry.register('state', lambda session_id: {'owner': session_id}, default={'owner': 'global'})
+    return registry
+
+
+def test_components_are_per_session_and_lazy():
+    registry = _registry()
+    a, b = registry.get('a'), registry.get('b')
+    assert a.get_stats()['components'] == []
+    assert a.state == {'owner': 'a'} and b.state == {'owner': 'b'}
+    assert a.state is registry.get('a').state
+    assert registry.get(None).state == {'owner': 'global'}
+    assert registry.get(DEFAULT_SESSION_ID) is registry.default
+
+
+def test_idle_sessions_are_evicted(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(sessions.time, 'monotonic', clock)
+    registry = _registry(num_shards=4, idle_timeout=60)
+    registry.get('old')
+    clock.now += 50
+    registry.get('recent')
+    clock.now += 20  # old: 70 ثانية خمول، recent: 20
+    assert registry.evict_idle() == 1
+    assert registry.remove('recent') and not registry.remove('old')
+    assert registry.evicted == 1
+
+
+def test_idle_sweep_runs_from_get(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(sessions.time, 'monotonic', clock)
+    registry = _registry(num_shards=1, idle_timeout=60)
+    registry.get('old')
+    clock.now += sessions.SESSION_SWEEP_S + 61
+    registry.get('new')
+    assert len(registry) == 1 and registry.evicted == 1
+
+
+def test_lru_cap_per_shard():
+    registry = _registry(num_shards=1, max_sessions=2)
+    registry.get('a')
+    registry.get('b')
+    registry.get('a')  # a أحدث استخداماً
+    registry.get('c')
+    assert len(registry) == 2
+    assert not registry.remove('b')
+    assert registry.get_stats()['evicted'] == 1
+
+
+def test_default_session_is_never_evicted(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(sessions.time, 'monotonic', clock)
+    registry = _registry(num_shards=1, max_sessions=1, idle_timeout=1)
+    default = registry.get(None)
+    clock.now += 100
+    registry.get('a')
+    registry.get('b')
+    registry.evict_idle()
+    assert registry.get(None) is default
+    assert default.state == {'owner': 'global'}
+
+
+def test_session_ids_are_sanitized():
+    registry = _registry()
+    session = registry.get('../../etc/passwd' + 'x' * 500)
+    assert '/' not in session.id
+    assert len(session.id) == sessions.MAX_SESSION_ID_LEN